@@ -18,6 +18,12 @@ def create_app():
     # DÒNG 3: Cấu hình CORS
     CORS(app)
 
+    # DÒNG 4: Trả connection của mỗi request về pool khi request kết thúc
+    from backend.database import close_db_connection, check_pool_size
+
+    app.teardown_appcontext(close_db_connection)
+    check_pool_size()
+
     # 1. Đăng ký Blueprint
     from backend.routes.auth_routes import auth_bp
 
@@ -41,4 +47,16 @@ def create_app():
     from backend.routes.submission_routes import submission_bp
 
     app.register_blueprint(submission_bp)
+
+    from backend.routes.rejudge_routes import rejudge_bp
+
+    app.register_blueprint(rejudge_bp)
+
+    # DÒNG 5: Judge worker + recovery submission / rejudge job bị bỏ dở khi
+    # process trước dừng
+    from backend.services.judge_queue import start_judge_workers
+    from backend.services.rejudge_service import recover_rejudge_jobs
+
+    start_judge_workers()
+    recover_rejudge_jobs()
     return app
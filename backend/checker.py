@@ -0,0 +1,303 @@
+"""
+Output checker - so sánh output của code với expected output.
+
+Không tạo bản copy đã chuẩn hóa của output (replace/strip/split): hai string
+được duyệt song song theo vị trí (index), chỉ so sánh từng đoạn nhỏ, và dừng
+ngay ở chỗ sai đầu tiên (báo dòng / cột hoặc token).
+
+Các chế độ (problems.checker_mode):
+    exact      - giống hệt, bỏ qua khoảng trắng đầu/cuối output và \\r\\n vs \\n
+    whitespace - so sánh từng token, khoảng trắng / xuống dòng không quan trọng
+    lines      - so sánh từng dòng, bỏ qua khoảng trắng cuối dòng và dòng trống cuối
+    float      - như whitespace, token số được so sánh với sai số tuyệt đối
+                 hoặc tương đối epsilon (problems.checker_epsilon)
+    special    - checker program của problem (problems.checker_code), chạy qua
+                 executor như code của user - xem build_special_judge_input
+
+Special judge protocol - checker đọc từ stdin:
+    dòng 1: ba số nguyên - số dòng của input, expected output, actual output
+    sau đó lần lượt các dòng của input, expected output, actual output
+Checker in ra "AC" nếu output đúng, hoặc "WA <thông báo>" nếu sai. Exit code
+khác 0, timeout hay output khác AC/WA được coi là lỗi của checker (System Error).
+"""
+
+import hashlib
+import math
+import re
+from backend.constants import (
+    CHECKER_EXACT,
+    CHECKER_WHITESPACE,
+    CHECKER_LINES,
+    CHECKER_FLOAT,
+    CHECKER_SPECIAL,
+    CHECKER_MODES,
+    DEFAULT_CHECKER_EPSILON,
+)
+from config import JUDGE_CONFIG
+
+TOKEN_PATTERN = re.compile(r"\S+")
+CHUNK_SIZE = 4096  # So sánh đoạn dài theo từng chunk để giới hạn bộ nhớ tạm
+SNIPPET_LENGTH = 40  # Độ dài tối đa của đoạn text hiển thị trong thông báo lỗi
+
+
+def checker_from_problem(problem):
+    """Cấu hình checker của problem (dict), mặc định exact"""
+    problem = problem or {}
+    mode = problem.get("checker_mode")
+    epsilon = problem.get("checker_epsilon")
+    checker = {
+        "mode": mode if mode in CHECKER_MODES else CHECKER_EXACT,
+        "epsilon": float(epsilon) if epsilon is not None else DEFAULT_CHECKER_EPSILON,
+    }
+    if checker["mode"] == CHECKER_SPECIAL:
+        if not problem.get("checker_code"):
+            checker["mode"] = CHECKER_EXACT  # Chưa có checker program
+        else:
+            checker["code"] = problem["checker_code"]
+            checker["language"] = problem.get("checker_language") or "cpp"
+            checker["time_limit"] = JUDGE_CONFIG["checker_time_limit"]
+    return checker
+
+
+def is_special_judge(checker):
+    return bool(checker) and checker.get("mode") == CHECKER_SPECIAL
+
+
+def _section(text):
+    text = (text or "").replace("\r\n", "\n")
+    if text.endswith("\n"):
+        text = text[:-1]
+    return text.count("\n") + 1, text
+
+
+def build_special_judge_input(input_data, expected, actual):
+    """stdin cho checker program (xem special judge protocol ở đầu module)"""
+    sections = [_section(input_data), _section(expected), _section(actual)]
+    header = " ".join(str(count) for count, _ in sections)
+    return "\n".join([header] + [text for _, text in sections]) + "\n"
+
+
+def parse_special_judge_result(result):
+    """
+    Kết quả chạy checker program (result dict của executor).
+    Returns: (is_accepted, mismatch) như check_output; is_accepted = None nếu checker lỗi
+    """
+    if not result.get("success"):
+        error = result.get("error") or result.get("status_label") or "unknown error"
+        return None, {"message": f"Checker error: {error}"}
+
+    output = (result.get("output") or "").strip()
+    verdict, _, message = output.partition(" ")
+    verdict = verdict.split("\n", 1)[0].upper()
+    if verdict == "AC":
+        return True, None
+    if verdict == "WA":
+        return False, {"message": message.strip() or "Rejected by checker"}
+    return None, {"message": f"Checker error: unexpected output {output[:SNIPPET_LENGTH]!r}"}
+
+
+def canonical_output(text):
+    """
+    Dạng chuẩn của output theo chế độ exact (bỏ khoảng trắng đầu/cuối, \r\n -> \n):
+    hai output đúng theo exact khi và chỉ khi có cùng dạng chuẩn
+    """
+    return (text or "").strip().replace("\r\n", "\n")
+
+
+def normalized_output_hash(text):
+    """sha256 hex của dạng chuẩn - lưu cho expected output (test_cases.output_norm_hash)"""
+    data = canonical_output(text).encode("utf-8", "surrogatepass")
+    return hashlib.sha256(data).hexdigest()
+
+
+def matches_output_hash(actual, expected_hash, checker=None):
+    """
+    Fast path không cần đọc expected output: True nếu actual giống expected theo
+    exact - khi đó đúng với mọi chế độ (trừ special). False nghĩa là phải so
+    sánh đầy đủ bằng check_output (có thể vẫn đúng theo whitespace / lines / float).
+    """
+    if not expected_hash or is_special_judge(checker):
+        return False
+    return normalized_output_hash(actual) == expected_hash
+
+
+def check_output(actual, expected, checker=None):
+    """
+    So sánh output.
+
+    Args:
+        actual: stdout của code
+        expected: expected output của test case
+        checker: dict {"mode", "epsilon"} (checker_from_problem), None = exact
+
+    Returns:
+        tuple: (is_accepted, mismatch) - mismatch là dict mô tả chỗ sai đầu tiên
+        ({"line", "column" hoặc "token", "expected", "actual", "message"}), None nếu đúng
+    """
+    checker = checker or {}
+    mode = checker.get("mode", CHECKER_EXACT)
+    if mode == CHECKER_SPECIAL:
+        raise ValueError("Special judge output is checked by run_special_judge")
+    actual = actual or ""
+    expected = expected or ""
+
+    if mode == CHECKER_WHITESPACE:
+        return _check_tokens(actual, expected, None)
+    if mode == CHECKER_FLOAT:
+        return _check_tokens(
+            actual, expected, checker.get("epsilon", DEFAULT_CHECKER_EPSILON)
+        )
+    if mode == CHECKER_LINES:
+        return _check_lines(actual, expected, trim_lines=True)
+    return _check_lines(actual, expected, trim_lines=False)
+
+
+# ==================== Helpers (duyệt theo index) ====================
+
+
+def _trim_bounds(text):
+    """
+    (start, end) của text sau khi bỏ khoảng trắng đầu/cuối - không tạo string mới.
+    Khoảng trắng như str.strip() (gồm cả Unicode: \xa0, \u3000...)
+    """
+    start, end = 0, len(text)
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _iter_lines(text, start, end, trim_lines):
+    """Yield (line_start, line_end) của từng dòng trong text[start:end], bỏ \\r cuối dòng"""
+    pos = start
+    while pos <= end:
+        newline = text.find("\n", pos, end)
+        line_end = end if newline == -1 else newline
+        if trim_lines:
+            while line_end > pos and text[line_end - 1].isspace():
+                line_end -= 1
+        elif line_end > pos and text[line_end - 1] == "\r":
+            line_end -= 1
+        yield pos, line_end
+        if newline == -1:
+            return
+        pos = newline + 1
+
+
+def _first_difference(a, a_start, a_end, b, b_start, b_end):
+    """Offset đầu tiên hai đoạn khác nhau, None nếu giống hệt"""
+    length = min(a_end - a_start, b_end - b_start)
+    for offset in range(0, length, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, length - offset)
+        if a[a_start + offset : a_start + offset + size] != b[
+            b_start + offset : b_start + offset + size
+        ]:
+            for i in range(offset, offset + size):
+                if a[a_start + i] != b[b_start + i]:
+                    return i
+    if a_end - a_start != b_end - b_start:
+        return length
+    return None
+
+
+def _snippet(text, start, end):
+    if end - start > SNIPPET_LENGTH:
+        return text[start : start + SNIPPET_LENGTH] + "..."
+    return text[start:end]
+
+
+def _check_lines(actual, expected, trim_lines):
+    a_start, a_end = _trim_bounds(actual)
+    e_start, e_end = _trim_bounds(expected)
+    actual_lines = _iter_lines(actual, a_start, a_end, trim_lines)
+    expected_lines = _iter_lines(expected, e_start, e_end, trim_lines)
+
+    line_number = 0
+    for expected_span in expected_lines:
+        line_number += 1
+        actual_span = next(actual_lines, None)
+        if actual_span is None:
+            return False, {
+                "line": line_number,
+                "expected": _snippet(expected, *expected_span),
+                "actual": "",
+                "message": f"Line {line_number}: output ended too early",
+            }
+
+        offset = _first_difference(actual, *actual_span, expected, *expected_span)
+        if offset is not None:
+            return False, {
+                "line": line_number,
+                "column": offset + 1,
+                "expected": _snippet(expected, expected_span[0] + offset, expected_span[1]),
+                "actual": _snippet(actual, actual_span[0] + offset, actual_span[1]),
+                "message": f"Line {line_number}, column {offset + 1}: output differs",
+            }
+
+    extra = next(actual_lines, None)
+    if extra is not None:
+        return False, {
+            "line": line_number + 1,
+            "expected": "",
+            "actual": _snippet(actual, *extra),
+            "message": f"Line {line_number + 1}: unexpected extra output",
+        }
+    return True, None
+
+
+def _numbers_match(actual_token, expected_token, epsilon):
+    try:
+        actual_value = float(actual_token)
+        expected_value = float(expected_token)
+    except ValueError:
+        return False
+    if math.isnan(expected_value) or math.isnan(actual_value):
+        return math.isnan(expected_value) and math.isnan(actual_value)
+    if math.isinf(expected_value) or math.isinf(actual_value):
+        return actual_value == expected_value
+    diff = abs(actual_value - expected_value)
+    return diff <= epsilon or diff <= epsilon * abs(expected_value)
+
+
+def _check_tokens(actual, expected, epsilon):
+    """So sánh từng token; epsilon != None -> token số được so với sai số"""
+    actual_tokens = TOKEN_PATTERN.finditer(actual)
+    token_number = 0
+
+    for expected_match in TOKEN_PATTERN.finditer(expected):
+        token_number += 1
+        actual_match = next(actual_tokens, None)
+        if actual_match is None:
+            return False, {
+                "token": token_number,
+                "expected": _snippet(expected, *expected_match.span()),
+                "actual": "",
+                "message": f"Token {token_number}: output ended too early",
+            }
+
+        same = (
+            _first_difference(actual, *actual_match.span(), expected, *expected_match.span())
+            is None
+        )
+        if not same and epsilon is not None:
+            same = _numbers_match(actual_match.group(), expected_match.group(), epsilon)
+        if not same:
+            line = actual.count("\n", 0, actual_match.start()) + 1
+            return False, {
+                "token": token_number,
+                "line": line,
+                "expected": _snippet(expected, *expected_match.span()),
+                "actual": _snippet(actual, *actual_match.span()),
+                "message": f"Token {token_number} (line {line}): output differs",
+            }
+
+    extra = next(actual_tokens, None)
+    if extra is not None:
+        return False, {
+            "token": token_number + 1,
+            "expected": "",
+            "actual": _snippet(actual, *extra.span()),
+            "message": f"Token {token_number + 1}: unexpected extra output",
+        }
+    return True, None
@@ -0,0 +1,54 @@
+"""
+Nén text lưu trong DB (test_cases.input / expected_output, submissions.code).
+
+Text dài từ min_bytes trở lên được nén zlib và lưu vào cột BLOB đi kèm
+(*_compressed), cột text để NULL. Text ngắn, hoặc nén không giảm được ít nhất
+max_ratio, vẫn lưu nguyên trong cột text. Row cũ chưa nén vẫn đọc được bình thường;
+compress_data.py nén dần các row cũ.
+
+Giải nén chỉ khi thật sự cần nội dung: test case giữ CompressedText (đọc qua
+StoredTestCase), submission chỉ giải nén code khi hiển thị / chấm lại.
+"""
+
+import zlib
+from config import COMPRESSION_CONFIG
+
+
+def compress_text(text):
+    """
+    Cách lưu một giá trị text.
+    Returns: (text, None) nếu lưu nguyên, (None, bytes zlib) nếu nén
+    """
+    if text is None or not COMPRESSION_CONFIG["enabled"]:
+        return text, None
+    raw = text.encode("utf-8")
+    if len(raw) < COMPRESSION_CONFIG["min_bytes"]:
+        return text, None
+    data = zlib.compress(raw, COMPRESSION_CONFIG["level"])
+    if len(data) > len(raw) * COMPRESSION_CONFIG["max_ratio"]:
+        return text, None  # Nén không đáng (data ngẫu nhiên / đã nén)
+    return None, data
+
+
+def decompress_text(data):
+    return zlib.decompress(data).decode("utf-8")
+
+
+def read_text(text, compressed):
+    """Giá trị của cặp cột (text, *_compressed)"""
+    return decompress_text(compressed) if compressed is not None else text
+
+
+class CompressedText:
+    """Text đã nén, chỉ giải nén khi read() (không cache bản giải nén)"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = bytes(data)
+
+    def read(self):
+        return decompress_text(self.data)
+
+    def __repr__(self):
+        return f"CompressedText({len(self.data)} bytes)"
@@ -18,6 +18,9 @@ MIN_PAGE_NUMBER = 1
 PISTON_API_URL = "https://emkc.org/api/v2/piston/execute"
 PISTON_TIMEOUT = 5  # seconds
 CODE_RUN_TIMEOUT = 3  # seconds
+# run_timeout tối đa Piston chấp nhận cho một request (public API: 3s).
+# Batch harness chạy nhiều input trong một request nên bị giới hạn bởi giá trị này
+PISTON_MAX_RUN_TIMEOUT = 3  # seconds
 
 # Supported languages
 LANGUAGE_CONFIG = {
@@ -29,6 +32,51 @@ LANGUAGE_CONFIG = {
     "js": {"language": "javascript", "version": "18.15.0"},
 }
 
+# Local executor: lệnh compile / run cho từng ngôn ngữ (key = tên ngôn ngữ Piston)
+# {build} = thư mục chứa source/binary, {main_class} = class public của Java
+LOCAL_RUNTIME_CONFIG = {
+    "python": {
+        "source": "main.py",
+        "compile": None,
+        "run": ["python3", "-B", "{build}/main.py"],
+        "limit_address_space": True,
+        # Fork server giữ sẵn interpreter đã import các module mà wrapper hay dùng
+        "warm_pool": "python",
+        "warm_preload": [
+            "json",
+            "collections",
+            "heapq",
+            "bisect",
+            "itertools",
+            "functools",
+            "math",
+            "re",
+            "typing",
+        ],
+    },
+    "javascript": {
+        "source": "main.js",
+        "compile": None,
+        "run": ["node", "{build}/main.js"],
+        # V8 reserve rất nhiều virtual memory, RLIMIT_AS sẽ làm node crash
+        "limit_address_space": False,
+        "warm_pool": "node",
+    },
+    "cpp": {
+        "source": "main.cpp",
+        "compile": ["g++", "-O2", "-std=c++17", "-o", "main", "main.cpp"],
+        "run": ["{build}/main"],
+        "limit_address_space": True,
+    },
+    "java": {
+        "source": "{main_class}.java",
+        "compile": ["javac", "-encoding", "UTF-8", "{main_class}.java"],
+        "run": ["java", "-Xss64m", "-cp", "{build}", "{main_class}"],
+        # JVM reserve heap bằng virtual memory, giới hạn bằng -Xmx thay cho RLIMIT_AS
+        "limit_address_space": False,
+    },
+}
+
 # ==================== VALIDATION LIMITS ====================
 # Username
 MIN_USERNAME_LENGTH = 3
@@ -57,6 +105,39 @@ MAX_PROBLEM_DESCRIPTION_LENGTH = 10000
 DEFAULT_TIME_LIMIT = 1000  # milliseconds
 DEFAULT_MEMORY_LIMIT = 256  # MB
 
+# Chế độ chấm của problem (cột problems.judge_mode, NULL = JUDGE_CONFIG["default_mode"])
+JUDGE_MODE_ICPC = "icpc"  # Dừng ở test case fail đầu tiên, bỏ qua các test còn lại
+JUDGE_MODE_PARTIAL = "partial"  # Chạy hết test case để đếm số test pass
+JUDGE_MODES = [JUDGE_MODE_ICPC, JUDGE_MODE_PARTIAL]
+
+# Cách so sánh output của problem (cột problems.checker_mode, NULL = exact) - xem backend/checker.py
+CHECKER_EXACT = "exact"
+CHECKER_WHITESPACE = "whitespace"
+CHECKER_LINES = "lines"
+CHECKER_FLOAT = "float"
+CHECKER_SPECIAL = "special"  # Checker program do admin viết (problems.checker_code)
+CHECKER_MODES = [
+    CHECKER_EXACT,
+    CHECKER_WHITESPACE,
+    CHECKER_LINES,
+    CHECKER_FLOAT,
+    CHECKER_SPECIAL,
+]
+DEFAULT_CHECKER_EPSILON = 1e-6  # Sai số tuyệt đối / tương đối cho chế độ float
+
+# Mã verdict của từng test case (cột submission_case_results.verdict)
+VERDICT_CODES = {
+    "Accepted": 0,
+    "Wrong Answer": 1,
+    "Time Limit Exceeded": 2,
+    "Memory Limit Exceeded": 3,
+    "Runtime Error": 4,
+    "Compilation Error": 5,
+    "System Error": 6,
+    "Skipped": 7,  # Không được chạy (ICPC: đã có test fail trước đó)
+}
+VERDICT_LABELS = {code: label for label, code in VERDICT_CODES.items()}
+
 # ==================== HTTP STATUS CODES ====================
 HTTP_OK = 200
 HTTP_CREATED = 201
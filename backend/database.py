@@ -1,16 +1,126 @@
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
 import sys
 import os
+import threading
+import time
+from flask import g, has_app_context
 
 # Add parent directory to path to find config.py
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from config import DB_CONFIG
+from config import DB_CONFIG, DB_POOL_CONFIG, JUDGE_CONFIG, RATE_LIMIT_CONFIG
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Create the shared connection pool on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=DB_POOL_CONFIG["pool_name"],
+                    pool_size=DB_POOL_CONFIG["pool_size"],
+                    pool_reset_session=True,
+                    **DB_CONFIG,
+                )
+    return _pool
+
+
+def check_pool_size():
+    """
+    Cảnh báo khi pool nhỏ hơn số connection có thể bị giữ cùng lúc: mỗi judge queue
+    worker lưu verdict và mỗi lần Run đang chạy đọc problem / test case.
+    Returns: True nếu pool đủ lớn
+    """
+    max_runs = RATE_LIMIT_CONFIG["max_inflight_runs"]
+    if max_runs <= 0:
+        return True  # Run không giới hạn - không ước lượng được
+    needed = JUDGE_CONFIG["queue_workers"] + max_runs
+    if DB_POOL_CONFIG["pool_size"] >= needed:
+        return True
+    print(
+        f"Warning: DB_POOL_SIZE={DB_POOL_CONFIG['pool_size']} is smaller than "
+        f"JUDGE_QUEUE_WORKERS + RATE_LIMIT_MAX_INFLIGHT_RUNS ({needed}), "
+        f"requests may fail to get a connection under load"
+    )
+    return False
+
+
+def _checkout_connection():
+    """
+    Lấy một connection từ pool, chờ tối đa acquire_timeout giây nếu pool đang hết.
+    Connection được ping trước khi trả về (liveness check) - nếu MySQL đã đóng
+    kết nối (wait_timeout, restart...) thì reconnect ngay tại đây.
+    """
+    pool = _get_pool()
+    deadline = time.monotonic() + DB_POOL_CONFIG["acquire_timeout"]
+
+    while True:
+        try:
+            conn = pool.get_connection()
+            break
+        except PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+    try:
+        conn.ping(reconnect=True, attempts=2, delay=0)
+    except mysql.connector.Error:
+        conn.close()  # Trả lại pool, connection hỏng sẽ được reset khi dùng lại
+        raise
+    return conn
+
+
+class _RequestConnection:
+    """
+    Proxy cho connection dùng chung trong một Flask request.
+    Các service vẫn gọi conn.close() như cũ, nhưng close() ở đây không làm gì -
+    connection chỉ được trả về pool khi request kết thúc (close_db_connection).
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        pass
 
 
 def get_db_connection():
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn
+        # Ngoài request (background thread, script...) -> mỗi lần gọi là một
+        # connection riêng từ pool, close() sẽ trả connection về pool
+        if not has_app_context():
+            return _checkout_connection()
+
+        # Trong request -> dùng lại một connection cho mọi service call
+        if "db_conn" not in g:
+            g.db_conn = _RequestConnection(_checkout_connection())
+        return g.db_conn
     except mysql.connector.Error as err:
         print(f"Database connection failed: {err}")
         return None
+
+
+def close_db_connection(exception=None):
+    """Trả connection của request về pool (đăng ký bằng app.teardown_appcontext)"""
+    request_conn = g.pop("db_conn", None)
+    if request_conn is None:
+        return
+
+    conn = request_conn._conn
+    try:
+        # Bỏ transaction đang mở (nếu service nào quên commit) trước khi trả về pool
+        if conn.in_transaction:
+            conn.rollback()
+    except mysql.connector.Error as err:
+        print(f"Error rolling back request connection: {err}")
+    finally:
+        conn.close()
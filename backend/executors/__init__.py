@@ -0,0 +1,32 @@
+"""
+Các backend chạy code (executor). Backend được chọn bằng EXECUTOR_BACKEND:
+    - piston: gửi code tới Piston API (mặc định)
+    - local:  chạy subprocess có giới hạn tài nguyên ngay trên máy chấm
+"""
+
+import threading
+from config import EXECUTOR_CONFIG
+from backend.executors.base import BaseExecutor
+from backend.executors.piston import PistonExecutor
+from backend.executors.local import LocalExecutor
+
+EXECUTORS = {
+    PistonExecutor.name: PistonExecutor,
+    LocalExecutor.name: LocalExecutor,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Executor dùng chung cho toàn bộ app (tạo lần đầu khi được gọi)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                backend = EXECUTOR_CONFIG["backend"]
+                if backend not in EXECUTORS:
+                    raise ValueError(f"Unknown executor backend: {backend}")
+                _executor = EXECUTORS[backend]()
+    return _executor
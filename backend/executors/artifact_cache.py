@@ -0,0 +1,194 @@
+"""
+Cache kết quả compile (C++/Java) theo nội dung - key = hash(language, version,
+lệnh compile, source đã wrap). Resubmit code y hệt, hay /api/run rồi /api/submit
+cùng một code, sẽ không phải compile lại.
+
+Mỗi entry là một thư mục trong cache_dir:
+    <key>/            - binary / class files sau khi compile thành công
+    <key>/.compile_error - stderr nếu compile lỗi (submission lỗi giống hệt fail ngay)
+
+Tổng dung lượng bị giới hạn bởi max_bytes, entry ít dùng nhất bị xóa trước (LRU).
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from config import EXECUTOR_CONFIG
+
+COMPILE_ERROR_FILE = ".compile_error"
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _link_or_copy(src_dir, dst_dir):
+    """Hard link artifact vào workspace (fallback copy) - entry bị evict giữa chừng cũng không sao"""
+    for root, dirs, files in os.walk(src_dir):
+        rel = os.path.relpath(root, src_dir)
+        target_root = os.path.join(dst_dir, rel) if rel != "." else dst_dir
+        for name in dirs:
+            os.makedirs(os.path.join(target_root, name), exist_ok=True)
+        for name in files:
+            if name == COMPILE_ERROR_FILE:
+                continue
+            src = os.path.join(root, name)
+            dst = os.path.join(target_root, name)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+
+class ArtifactCache:
+    """Cache artifact compile trên disk, có giới hạn dung lượng và LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size (bytes), cũ nhất ở đầu
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(language, version, compile_cmd, source):
+        digest = hashlib.sha256()
+        for part in (language, version, " ".join(compile_cmd or [])):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _load_index(self):
+        """Dựng lại index từ disk (sau khi restart), sắp xếp theo thời gian dùng gần nhất"""
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, key)
+            if key.startswith(".") or not os.path.isdir(path):
+                continue
+            entries.append((os.path.getmtime(path), key, _dir_size(path)))
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _touch(self, key):
+        self._entries.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def get_compile_error(self, key):
+        """Trả về stderr nếu source này đã từng compile lỗi, ngược lại None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            error_path = os.path.join(self._path(key), COMPILE_ERROR_FILE)
+            if not os.path.exists(error_path):
+                return None
+            self._touch(key)
+        with open(error_path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def checkout(self, key, dest_dir):
+        """
+        Link artifact đã compile vào dest_dir.
+        Returns: True nếu cache hit (artifact thành công), False nếu miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            path = self._path(key)
+            if not os.path.isdir(path) or os.path.exists(
+                os.path.join(path, COMPILE_ERROR_FILE)
+            ):
+                return False
+            self._touch(key)
+
+        try:
+            _link_or_copy(path, dest_dir)
+            return True
+        except OSError:
+            return False  # Entry vừa bị evict - compile lại
+
+    def store_build(self, key, build_dir, exclude=()):
+        """Lưu toàn bộ build_dir (trừ các file trong exclude) vào cache"""
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+        try:
+            for name in os.listdir(build_dir):
+                if name in exclude:
+                    continue
+                src = os.path.join(build_dir, name)
+                dst = os.path.join(staging, name)
+                if os.path.isdir(src):
+                    shutil.copytree(src, dst)
+                else:
+                    shutil.copy2(src, dst)
+            self._commit(key, staging)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def store_compile_error(self, key, stderr):
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+        try:
+            with open(os.path.join(staging, COMPILE_ERROR_FILE), "w", encoding="utf-8") as f:
+                f.write(stderr or "")
+            self._commit(key, staging)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _commit(self, key, staging):
+        """Đưa entry từ staging vào cache (rename atomic), sau đó evict nếu quá dung lượng"""
+        size = _dir_size(staging)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return  # Thread khác vừa lưu cùng key
+            try:
+                os.rename(staging, self._path(key))
+            except OSError:
+                return
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            shutil.rmtree(self._path(key), ignore_errors=True)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache():
+    """Artifact cache dùng chung cho các executor (tạo lần đầu khi được gọi)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ArtifactCache(
+                    EXECUTOR_CONFIG["artifact_cache_dir"],
+                    EXECUTOR_CONFIG["artifact_cache_mb"] * 1024 * 1024,
+                )
+    return _cache
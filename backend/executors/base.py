@@ -0,0 +1,139 @@
+"""
+Executor interface - mọi backend chạy code (Piston, local sandbox...) đều trả về
+cùng một result dict để judge_service không cần biết code chạy ở đâu:
+
+    {
+        "success": bool,
+        "output": str,                 # stdout (khi success)
+        "error": str,                  # thông báo lỗi (khi không success)
+        "status_label": str,           # Accepted / Runtime Error / Compilation Error / ...
+        "is_timeout": bool,            # chỉ có khi bị kill do quá thời gian
+        "execution_time": int,         # ms - tổng thời gian (wall, gồm cả network)
+        "code_execution_time": int,    # ms - CPU time (user + sys) của code, dùng cho TLE
+        "memory_used": int,            # KB - peak RSS, dùng cho MLE
+    }
+
+code_execution_time / memory_used là None nếu backend không đo được.
+"""
+
+from backend.constants import LANGUAGE_CONFIG
+
+# Signal báo hiệu process bị kill do quá thời gian
+TIMEOUT_SIGNALS = ["SIGKILL", "SIGTERM", "SIGALRM", "SIGXCPU", 9, 14, 15, 24]
+
+
+def resolve_language(language):
+    """Trả về config (language + version) của ngôn ngữ, None nếu không hỗ trợ"""
+    lang_key = language.lower() if language else ""
+    return LANGUAGE_CONFIG.get(lang_key)
+
+
+def unsupported_language_result(language):
+    return {
+        "success": False,
+        "error": f"Language {language} is not supported",
+    }
+
+
+def system_error_result(error):
+    return {
+        "success": False,
+        "error": f"System Error: {error}",
+        "status_label": "System Error",
+    }
+
+
+def compile_error_result(stderr):
+    return {
+        "success": False,
+        "error": stderr or "Compilation Error",
+        "status_label": "Compilation Error",
+    }
+
+
+def build_run_result(run_stage, execution_time_ms, code_execution_time, memory_used):
+    """
+    Chuyển run stage (stdout, stderr, code, signal) thành result dict.
+
+    Args:
+        run_stage: dict kết quả chạy - format giống "run" của Piston
+        execution_time_ms: Tổng thời gian (ms)
+        code_execution_time: CPU time user + sys (ms), None nếu không đo được
+        memory_used: Peak RSS (KB), None nếu không đo được
+    """
+    # 1. Kiểm tra Timeout trước (kiểm tra signal trước code)
+    signal = run_stage.get("signal", None)
+    stderr = run_stage.get("stderr", "") or ""
+
+    # Signal SIGKILL/SIGTERM = Timeout (sandbox kills process)
+    # SIGALRM/SIGXCPU = vượt giới hạn wall time / CPU time
+    if (
+        signal in TIMEOUT_SIGNALS
+        or "Killed" in stderr
+        or "timed out" in stderr.lower()
+    ):
+        return {
+            "success": False,
+            "error": "Time Limit Exceeded (Code execution timed out)",
+            "status_label": "Time Limit Exceeded",
+            "is_timeout": True,
+        }
+
+    # 2. Kiểm tra lỗi Runtime/Syntax (exit code != 0 hoặc bị kill bởi signal khác)
+    # Note: code có thể là None khi timeout, phải check signal trước
+    if run_stage.get("code") not in [None, 0] or signal:
+        # Check if it's a syntax error (Python: SyntaxError, IndentationError)
+        if stderr and any(
+            err in stderr for err in ["SyntaxError", "IndentationError", "TabError"]
+        ):
+            return {
+                "success": False,
+                "error": stderr or "Syntax Error",
+                "status_label": "Compilation Error",  # Treat as compilation error
+            }
+
+        # Real runtime error
+        return {
+            "success": False,
+            "error": stderr or (f"Runtime Error ({signal})" if signal else "Runtime Error"),
+            "status_label": "Runtime Error",
+        }
+
+    # 3. Thành công
+    return {
+        "success": True,
+        "output": (run_stage.get("stdout") or "").strip(),
+        "status_label": "Accepted",
+        "execution_time": execution_time_ms,  # Total time
+        "code_execution_time": code_execution_time,  # CPU time (cho display / TLE)
+        "memory_used": memory_used,  # Peak RSS (KB)
+    }
+
+
+class BaseExecutor:
+    """Interface chung cho các backend chạy code"""
+
+    name = "base"
+
+    def run(self, code, language, input_data, time_limit=None):
+        """
+        Chạy code với một input, trả về result dict.
+        time_limit: giới hạn thời gian (giây) cho lần chạy này, None = mặc định của backend
+        """
+        raise NotImplementedError
+
+    def supports_batch(self, language, code=None):
+        """Backend có chạy được nhiều input trong một lần (compile một lần) không"""
+        return False
+
+    def max_batch_inputs(self, language, time_limit=None):
+        """Số input tối đa trong một lần run_batch(), None = không giới hạn"""
+        return None
+
+    def run_batch(self, code, language, inputs, time_limit=None):
+        """
+        Chạy code với nhiều input. Mặc định: gọi run() cho từng input.
+        Backend có thể trả về None cho input không chạy được trong batch (VD: bị
+        kill do vượt giới hạn tổng) - caller chạy lại riêng các input đó.
+        """
+        return [self.run(code, language, data, time_limit) for data in inputs]
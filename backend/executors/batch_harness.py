@@ -0,0 +1,450 @@
+"""
+Batch harness - chạy nhiều input trong MỘT lần gọi sandbox.
+
+Thay vì gửi lại toàn bộ chương trình cho từng test case (Piston phải compile
+lại C++ và khởi động lại interpreter mỗi lần), code của user được bọc trong một
+harness theo từng ngôn ngữ:
+    - Harness nhận tất cả input qua stdin (đóng khung theo độ dài) và đọc lần
+      lượt từng input thẳng vào file riêng của input đó trước khi fork - process
+      con không thừa hưởng data của các input khác (ru_maxrss không bị tính sai)
+    - Chương trình chỉ compile / parse MỘT lần
+    - Mỗi input được chạy trong một process con riêng (fork, fork + exec với
+      C++, spawn với Node) nên state toàn cục không bị rò rỉ giữa các test case
+    - Kết quả từng input được in ra thành một dòng JSON có prefix ngẫu nhiên
+      (stdout/stderr mã hóa base64, exit code, signal, thời gian, memory)
+
+Ngôn ngữ không có harness (VD: Java) sẽ tự động chạy từng test case như cũ.
+"""
+
+import base64
+import json
+import secrets
+
+# Signal số -> tên (harness Python/C++ trả về số, Node trả về tên)
+SIGNAL_NAMES = {9: "SIGKILL", 14: "SIGALRM", 15: "SIGTERM", 24: "SIGXCPU"}
+
+
+PYTHON_HARNESS = r'''
+import base64, io, json, os, resource, signal, sys, time, traceback
+
+NONCE = __JUDGE_NONCE__
+TIMEOUT = __JUDGE_TIMEOUT__
+SOURCE = __JUDGE_SOURCE__
+
+
+def emit(record):
+    sys.__stdout__.write(NONCE + " " + json.dumps(record) + "\n")
+    sys.__stdout__.flush()
+
+
+def iter_inputs():
+    """Yield (i, path) - chép từng input từ stdin vào file theo chunk, không giữ cả batch"""
+    stream = sys.stdin.buffer
+    for i in range(int(stream.readline())):
+        size = int(stream.readline())
+        in_path = "__judge_in_%d" % i
+        with open(in_path, "wb") as f:
+            while size > 0:
+                chunk = stream.read(min(size, 65536))
+                if not chunk:
+                    break
+                f.write(chunk)
+                size -= len(chunk)
+        yield i, in_path
+
+
+def redirect(fd, path, flags):
+    target = os.open(path, flags, 0o600)
+    os.dup2(target, fd)
+    os.close(target)
+
+
+def run_child(compiled, in_path, out_path, err_path):
+    redirect(0, in_path, os.O_RDONLY)
+    redirect(1, out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    redirect(2, err_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+    resource.setrlimit(resource.RLIMIT_CPU, (TIMEOUT, TIMEOUT + 1))
+    signal.alarm(TIMEOUT)
+
+    status = 0
+    try:
+        exec(compiled, {"__name__": "__main__", "__builtins__": __builtins__})
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            status = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        exc_type, exc, tb = sys.exc_info()
+        traceback.print_exception(exc_type, exc, tb.tb_next)  # Bỏ frame của harness
+        status = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        status = status or 1
+    os._exit(status)
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def main():
+    try:
+        compiled = compile(SOURCE, "solution.py", "exec")
+    except (SyntaxError, ValueError):
+        emit({"compile_error": "".join(traceback.format_exception_only(*sys.exc_info()[:2]))})
+        return
+
+    for i, in_path in iter_inputs():
+        out_path, err_path = ("__judge_%s_%d" % (k, i) for k in ("out", "err"))
+
+        start = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            run_child(compiled, in_path, out_path, err_path)
+        _, status, usage = os.wait4(pid, 0)
+        wall_ms = (time.monotonic() - start) * 1000
+
+        emit({
+            "i": i,
+            "code": os.WEXITSTATUS(status) if os.WIFEXITED(status) else None,
+            "signal": os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+            "wall_ms": round(wall_ms),
+            "cpu_ms": round((usage.ru_utime + usage.ru_stime) * 1000),
+            "mem_kb": usage.ru_maxrss,
+            "stdout": base64.b64encode(read_file(out_path)).decode(),
+            "stderr": base64.b64encode(read_file(err_path)).decode(),
+        })
+
+
+main()
+'''
+
+
+JAVASCRIPT_HARNESS = r'''
+const fs = require("fs");
+const childProcess = require("child_process");
+
+const NONCE = __JUDGE_NONCE__;
+const TIMEOUT_MS = __JUDGE_TIMEOUT__ * 1000;
+const SOURCE = __JUDGE_SOURCE__;
+
+function emit(record) {
+    process.stdout.write(NONCE + " " + JSON.stringify(record) + "\n");
+}
+
+const data = fs.readFileSync(0);
+let pos = data.indexOf(10);
+const count = parseInt(data.subarray(0, pos).toString(), 10);
+pos += 1;
+
+fs.writeFileSync("__judge_solution.js", SOURCE);
+// Preload ghi CPU time và peak RSS của process con khi thoát (spawnSync không trả rusage)
+fs.writeFileSync("__judge_probe.js",
+    'process.on("exit", () => { const u = process.resourceUsage();' +
+    ' require("fs").writeFileSync(process.env.JUDGE_USAGE_FILE,' +
+    ' JSON.stringify({cpu: (u.userCPUTime + u.systemCPUTime) / 1000, rss: u.maxRSS})); });');
+
+function readUsage(path) {
+    try {
+        return JSON.parse(fs.readFileSync(path, "utf8"));
+    } catch (e) {
+        return {cpu: null, rss: null};
+    }
+}
+
+for (let i = 0; i < count; i++) {
+    const nl = data.indexOf(10, pos);
+    const size = parseInt(data.subarray(pos, nl).toString(), 10);
+    pos = nl + 1;
+    const input = data.subarray(pos, pos + size);
+    pos += size;
+
+    const usageFile = "__judge_usage_" + i;
+    const start = process.hrtime.bigint();
+    const r = childProcess.spawnSync(process.execPath, ["-r", "./__judge_probe.js", "__judge_solution.js"], {
+        input: input,
+        env: Object.assign({}, process.env, {JUDGE_USAGE_FILE: usageFile}),
+        timeout: TIMEOUT_MS,
+        killSignal: "SIGKILL",
+        maxBuffer: 64 * 1024 * 1024,
+    });
+    const wallMs = Number(process.hrtime.bigint() - start) / 1e6;
+    const usage = readUsage(usageFile);
+
+    emit({
+        i: i,
+        code: r.status,
+        signal: r.signal,
+        wall_ms: Math.round(wallMs),
+        cpu_ms: usage.cpu === null ? null : Math.round(usage.cpu),
+        mem_kb: usage.rss,
+        stdout: (r.stdout || Buffer.alloc(0)).toString("base64"),
+        stderr: (r.stderr || Buffer.from(r.error ? String(r.error) : "")).toString("base64"),
+    });
+}
+'''
+
+
+# Driver được đặt TRƯỚC code của user (để không bị ảnh hưởng bởi macro như
+# `#define int long long`), code của user giữ nguyên - kể cả main(). Driver là
+# một constructor chạy trước main: nó đọc các input rồi với mỗi input fork và
+# exec lại chính binary này (biến môi trường đánh dấu process con), process con
+# bỏ qua driver và chạy main() của user như một chương trình bình thường, nên
+# `return 0` ngầm định của main và việc flush output khi thoát vẫn đúng.
+CPP_HARNESS = r"""
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <string>
+#include <fcntl.h>
+#include <signal.h>
+#include <sys/resource.h>
+#include <sys/time.h>
+#include <sys/wait.h>
+#include <time.h>
+#include <unistd.h>
+
+static const char* __JUDGE_NONCE = __JUDGE_NONCE__;
+static const int __JUDGE_TIMEOUT = __JUDGE_TIMEOUT__;
+static const char* __JUDGE_CHILD_ENV = "__JUDGE_BATCH_CHILD";
+
+// Đọc stdin theo buffer cố định: mỗi input được chép thẳng vào file của nó
+static char __judge_in_buf[65536];
+static size_t __judge_in_pos = 0, __judge_in_len = 0;
+
+static int __judge_getc() {
+    if (__judge_in_pos == __judge_in_len) {
+        ssize_t n = read(0, __judge_in_buf, sizeof __judge_in_buf);
+        if (n <= 0) return -1;
+        __judge_in_pos = 0;
+        __judge_in_len = (size_t)n;
+    }
+    return (unsigned char)__judge_in_buf[__judge_in_pos++];
+}
+
+static unsigned long long __judge_read_number() {
+    unsigned long long value = 0;
+    int c;
+    while ((c = __judge_getc()) != -1 && c != '\n') value = value * 10 + (c - '0');
+    return value;
+}
+
+static void __judge_copy_input(int fd, unsigned long long size) {
+    while (size > 0) {
+        if (__judge_in_pos == __judge_in_len) {
+            ssize_t n = read(0, __judge_in_buf, sizeof __judge_in_buf);
+            if (n <= 0) return;
+            __judge_in_pos = 0;
+            __judge_in_len = (size_t)n;
+        }
+        size_t chunk = __judge_in_len - __judge_in_pos;
+        if (chunk > size) chunk = (size_t)size;
+        if (write(fd, __judge_in_buf + __judge_in_pos, chunk) < 0) _exit(1);
+        __judge_in_pos += chunk;
+        size -= chunk;
+    }
+}
+
+static std::string __judge_read_fd(int fd) {
+    std::string data;
+    char buf[65536];
+    ssize_t n;
+    while ((n = read(fd, buf, sizeof buf)) > 0) data.append(buf, (size_t)n);
+    return data;
+}
+
+static std::string __judge_read_file(const char* path) {
+    int fd = open(path, O_RDONLY);
+    if (fd < 0) return std::string();
+    std::string data = __judge_read_fd(fd);
+    close(fd);
+    return data;
+}
+
+static void __judge_redirect(int fd, const char* path, int flags) {
+    int target = open(path, flags, 0600);
+    dup2(target, fd);
+    close(target);
+}
+
+static std::string __judge_b64(const std::string& in) {
+    static const char* t = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+    std::string out;
+    out.reserve((in.size() + 2) / 3 * 4);
+    size_t i = 0;
+    for (; i + 2 < in.size(); i += 3) {
+        unsigned v = ((unsigned char)in[i] << 16) | ((unsigned char)in[i + 1] << 8) | (unsigned char)in[i + 2];
+        out += t[(v >> 18) & 63]; out += t[(v >> 12) & 63]; out += t[(v >> 6) & 63]; out += t[v & 63];
+    }
+    if (i < in.size()) {
+        unsigned v = (unsigned char)in[i] << 16;
+        if (i + 1 < in.size()) v |= (unsigned char)in[i + 1] << 8;
+        out += t[(v >> 18) & 63]; out += t[(v >> 12) & 63];
+        out += (i + 1 < in.size()) ? t[(v >> 6) & 63] : '=';
+        out += '=';
+    }
+    return out;
+}
+
+static double __judge_now_ms() {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000.0 + ts.tv_nsec / 1e6;
+}
+
+// Priority 101: chạy trước mọi static initializer (kể cả của code user)
+__attribute__((constructor(101))) static void __judge_driver() {
+    if (getenv(__JUDGE_CHILD_ENV)) {
+        unsetenv(__JUDGE_CHILD_ENV);  // Process con: chạy main() của user
+        return;
+    }
+
+    long count = (long)__judge_read_number();
+    for (long i = 0; i < count; i++) {
+        unsigned long long size = __judge_read_number();
+
+        char in_path[64], out_path[64], err_path[64];
+        std::snprintf(in_path, sizeof in_path, "__judge_in_%ld", i);
+        std::snprintf(out_path, sizeof out_path, "__judge_out_%ld", i);
+        std::snprintf(err_path, sizeof err_path, "__judge_err_%ld", i);
+        int fd = open(in_path, O_WRONLY | O_CREAT | O_TRUNC, 0600);
+        __judge_copy_input(fd, size);
+        close(fd);
+
+        std::fflush(stdout);
+        double start = __judge_now_ms();
+        pid_t pid = fork();
+        if (pid == 0) {
+            __judge_redirect(0, in_path, O_RDONLY);
+            __judge_redirect(1, out_path, O_WRONLY | O_CREAT | O_TRUNC);
+            __judge_redirect(2, err_path, O_WRONLY | O_CREAT | O_TRUNC);
+            struct rlimit rl;
+            rl.rlim_cur = __JUDGE_TIMEOUT;
+            rl.rlim_max = __JUDGE_TIMEOUT + 1;
+            setrlimit(RLIMIT_CPU, &rl);
+            alarm(__JUDGE_TIMEOUT);  // Giữ nguyên qua exec
+            setenv(__JUDGE_CHILD_ENV, "1", 1);
+            char* const args[] = {(char*)"solution", 0};
+            execv("/proc/self/exe", args);
+            // Không exec được (không có /proc): chạy main() ngay trong process con
+            unsetenv(__JUDGE_CHILD_ENV);
+            return;
+        }
+
+        int status = 0;
+        struct rusage ru;
+        std::memset(&ru, 0, sizeof ru);
+        wait4(pid, &status, 0, &ru);
+        double wall_ms = __judge_now_ms() - start;
+
+        char exit_code[16] = "null", sig[16] = "null";
+        if (WIFEXITED(status)) std::snprintf(exit_code, sizeof exit_code, "%d", WEXITSTATUS(status));
+        if (WIFSIGNALED(status)) std::snprintf(sig, sizeof sig, "%d", WTERMSIG(status));
+        long cpu_ms = (ru.ru_utime.tv_sec + ru.ru_stime.tv_sec) * 1000L
+                      + (ru.ru_utime.tv_usec + ru.ru_stime.tv_usec) / 1000L;
+
+        std::printf("%s {\"i\": %ld, \"code\": %s, \"signal\": %s, \"wall_ms\": %.0f, "
+                    "\"cpu_ms\": %ld, \"mem_kb\": %ld, \"stdout\": \"%s\", \"stderr\": \"%s\"}\n",
+                    __JUDGE_NONCE, i, exit_code, sig, wall_ms, cpu_ms, (long)ru.ru_maxrss,
+                    __judge_b64(__judge_read_file(out_path)).c_str(),
+                    __judge_b64(__judge_read_file(err_path)).c_str());
+    }
+    std::fflush(stdout);
+    _exit(0);  // Driver không bao giờ chạy main() của user
+}
+"""
+
+
+def supports_batch(language, code=None):
+    """Kiểm tra ngôn ngữ có chạy được qua batch harness không"""
+    return language in ("python", "javascript", "cpp")
+
+
+def _fill(template, nonce, timeout, source=None):
+    filled = template.replace("__JUDGE_NONCE__", json.dumps(nonce))
+    filled = filled.replace("__JUDGE_TIMEOUT__", str(int(timeout)))
+    if source is not None:
+        filled = filled.replace("__JUDGE_SOURCE__", json.dumps(source))
+    return filled
+
+
+def build_batch_program(code, language, timeout):
+    """
+    Bọc code của user trong harness của ngôn ngữ tương ứng.
+
+    Args:
+        code: Code hoàn chỉnh (đã wrap_user_code)
+        language: Tên ngôn ngữ Piston ("python", "cpp", "javascript")
+        timeout: Giới hạn thời gian cho MỖI input (giây)
+
+    Returns:
+        (source, nonce) hoặc None nếu ngôn ngữ không hỗ trợ batch
+    """
+    if not supports_batch(language, code):
+        return None
+
+    nonce = "@@JUDGE-" + secrets.token_hex(8)
+    if language == "python":
+        source = _fill(PYTHON_HARNESS, nonce, timeout, code)
+    elif language == "javascript":
+        source = _fill(JAVASCRIPT_HARNESS, nonce, timeout, code)
+    else:
+        source = _fill(CPP_HARNESS, nonce, timeout) + "\n" + code
+    return source, nonce
+
+
+def encode_inputs(inputs):
+    """Đóng khung các input thành một stdin duy nhất: '<count>\\n' + ('<bytes>\\n' + data)*"""
+    parts = [f"{len(inputs)}\n"]
+    for data in inputs:
+        data = data or ""
+        parts.append(f"{len(data.encode('utf-8'))}\n")
+        parts.append(data)
+    return "".join(parts)
+
+
+def _decode(b64_text):
+    return base64.b64decode(b64_text or "").decode("utf-8", "replace")
+
+
+def parse_batch_output(stdout, nonce):
+    """
+    Tách kết quả từng input từ stdout của harness.
+
+    Returns:
+        (compile_error, records) - compile_error là stderr nếu harness báo lỗi
+        compile (Python), records là dict {index: run_stage}. Các input không có
+        record (harness bị kill giữa chừng, output bị cắt...) sẽ không có trong dict.
+    """
+    prefix = nonce + " "
+    records = {}
+    for line in (stdout or "").splitlines():
+        if not line.startswith(prefix):
+            continue
+        try:
+            record = json.loads(line[len(prefix) :])
+        except ValueError:
+            continue  # Dòng cuối bị cắt
+
+        if "compile_error" in record:
+            return record["compile_error"], {}
+
+        signal = record.get("signal")
+        records[record["i"]] = {
+            "stdout": _decode(record.get("stdout")),
+            "stderr": _decode(record.get("stderr")),
+            "code": record.get("code"),
+            "signal": SIGNAL_NAMES.get(signal, signal),
+            "wall_time": record.get("wall_ms"),
+            "cpu_time": record.get("cpu_ms"),
+            "memory": record.get("mem_kb"),
+        }
+    return None, records
@@ -0,0 +1,358 @@
+"""
+HTTP client dùng chung cho executor gọi qua network (Piston).
+
+    - Một requests.Session với connection pool (keep-alive) dùng chung giữa các
+      judge thread thay vì mở kết nối TLS mới cho mỗi test case
+    - Retry có giới hạn với backoff + jitter cho lỗi tạm thời: lỗi kết nối
+      (connection refused/reset, connect timeout) và 429/502/503/504
+    - Circuit breaker: lỗi liên tiếp vượt ngưỡng thì "mở mạch" - các request sau
+      fail ngay với System Error trong reset_timeout giây thay vì chờ timeout,
+      sau đó cho một request thử (half-open) để kiểm tra server đã sống lại chưa
+    - 429 (executor giới hạn request) không tính là lỗi của breaker: endpoint bị
+      tạm hoãn theo Retry-After (backoff), request sau chờ hoặc dùng endpoint khác
+    - Nhiều executor endpoint (EndpointPool): chọn endpoint đang có ít request
+      nhất, giới hạn số request đồng thời mỗi endpoint, endpoint lỗi bị loại
+      (circuit breaker riêng) và được nhận lại khi health check thành công
+"""
+
+import itertools
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import PISTON_CLIENT_CONFIG
+
+# Status code coi là lỗi tạm thời (retry được)
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Không có executor nhận request: circuit breaker đang mở, hoặc mọi endpoint
+    đều bị loại / đã đủ số request đồng thời - không gửi request
+    """
+
+
+class ExecutorHTTPError(RuntimeError):
+    """Executor trả về status code lỗi"""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"Lỗi server Piston (Status: {status_code})")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker 3 trạng thái:
+        closed    - bình thường, đếm số lỗi liên tiếp
+        open      - fail ngay cho đến khi hết reset_timeout
+        half_open - cho đúng một request thử, thành công -> closed, lỗi -> open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow_request(self):
+        """True nếu được phép gửi request (half-open: chỉ request thử đầu tiên)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_in(self):
+        """Số giây còn lại trước khi breaker cho request thử"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_throttled(self):
+        """Server trả 429: vẫn sống nên không tính là lỗi, request thử (half-open) -> closed"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+def _backoff_delay(attempt, retry_after=None):
+    """Exponential backoff với full jitter, tôn trọng Retry-After nếu server gửi"""
+    base = PISTON_CLIENT_CONFIG["backoff_base"]
+    cap = PISTON_CLIENT_CONFIG["backoff_max"]
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _is_retryable(error):
+    """Lỗi tạm thời: request chưa tới executor, hoặc 429/502/503/504"""
+    if isinstance(error, ExecutorHTTPError):
+        return error.status_code in RETRY_STATUS_CODES
+    # Connection refused/reset, connect timeout. Read timeout thì code có thể đã
+    # chạy - không retry để tránh nhân đôi thời gian chờ
+    return isinstance(error, requests.exceptions.ConnectionError)
+
+
+def _parse_retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ExecutorClient:
+    """Client gửi JSON tới một executor endpoint: session pool + circuit breaker"""
+
+    def __init__(self, url):
+        self.url = url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=PISTON_CLIENT_CONFIG["pool_size"],
+            pool_block=True,  # Hết connection thì chờ thay vì mở kết nối không được reuse
+            max_retries=0,  # Retry do client tự xử lý (có backoff + circuit breaker)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(
+            PISTON_CLIENT_CONFIG["breaker_failure_threshold"],
+            PISTON_CLIENT_CONFIG["breaker_reset_timeout"],
+        )
+
+    def send(self, payload, timeout):
+        """
+        Gửi một request (không retry), ghi nhận kết quả vào circuit breaker.
+        Returns: (response json, thời gian ms)
+        Raises: ExecutorHTTPError / exception của requests / ValueError (không phải JSON)
+        """
+        start_time = time.time()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=timeout)
+            execution_time_ms = round((time.time() - start_time) * 1000)
+
+            if response.status_code == 200:
+                data = response.json()
+                self.breaker.record_success()
+                return data, execution_time_ms
+
+            # 429 (executor giới hạn request) không phải do executor chết - backoff
+            # ở EndpointPool, 4xx khác (request sai) cũng không phải lỗi của executor
+            if response.status_code == 429:
+                self.breaker.record_throttled()
+            elif response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise ExecutorHTTPError(response.status_code, _parse_retry_after(response))
+        except (requests.exceptions.RequestException, ValueError):
+            # Lỗi kết nối, timeout, response không phải JSON hợp lệ
+            self.breaker.record_failure()
+            raise
+
+
+def _health_url(url):
+    """URL health check của Piston endpoint (.../execute -> .../runtimes), None nếu không suy ra được"""
+    if url.rstrip("/").endswith("/execute"):
+        return url.rstrip("/")[: -len("execute")] + "runtimes"
+    return None
+
+
+class _Endpoint:
+    def __init__(self, url):
+        self.client = ExecutorClient(url)
+        self.health_url = _health_url(url)
+        self.max_concurrency = PISTON_CLIENT_CONFIG["endpoint_max_concurrency"]
+        self.outstanding = 0  # Số request đang chờ response
+        self.throttled_until = 0.0  # Endpoint trả 429: không gửi request trước lúc này
+
+    @property
+    def ejected(self):
+        return self.client.breaker.state == CircuitBreaker.OPEN
+
+
+class EndpointPool:
+    """
+    Gửi request tới một hoặc nhiều executor endpoint (retry + chọn endpoint).
+
+        - Mỗi request được gửi tới endpoint còn nhận request có ít request đang
+          chạy nhất (least outstanding requests), tối đa endpoint_max_concurrency
+          request đồng thời mỗi endpoint - hết slot thì chờ
+        - Endpoint lỗi liên tiếp bị loại (circuit breaker của endpoint mở), được
+          nhận lại khi health check thành công hoặc request thử (half-open) thành công
+        - Endpoint trả 429 bị tạm hoãn theo Retry-After (hoặc backoff): request dùng
+          endpoint khác nếu có, không thì chờ hết thời gian hoãn
+        - Retry lỗi tạm thời ưu tiên endpoint khác với endpoint vừa lỗi
+        - Health check định kỳ (GET .../runtimes) khi có từ hai endpoint trở lên
+    """
+
+    def __init__(self, urls):
+        self.endpoints = [_Endpoint(url) for url in urls]
+        self._cond = threading.Condition()
+        self._tiebreak = itertools.count()
+        interval = PISTON_CLIENT_CONFIG["health_check_interval"]
+        if len(self.endpoints) > 1 and interval > 0:
+            threading.Thread(
+                target=self._health_loop, args=(interval,), daemon=True
+            ).start()
+
+    def _acquire(self, avoid, deadline):
+        """
+        Chọn endpoint cho một request và giữ một slot của endpoint đó.
+        avoid: endpoint vừa lỗi - chỉ dùng lại khi không còn endpoint nào khác
+        Raises: CircuitOpenError nếu mọi endpoint bị loại, hoặc hết thời gian chờ slot
+        """
+        with self._cond:
+            while True:
+                available = [e for e in self.endpoints if not e.ejected]
+                if not available:
+                    retry_in = min(e.client.breaker.retry_in() for e in self.endpoints)
+                    raise CircuitOpenError(
+                        "Code executor is temporarily unavailable "
+                        f"(retry in {retry_in:.0f}s)"
+                    )
+
+                now = time.monotonic()
+                ready = [e for e in available if e.throttled_until <= now]
+                free = [e for e in ready if e.outstanding < e.max_concurrency]
+                preferred = [e for e in free if e is not avoid] or free
+                # Ít request đang chạy nhất, hòa thì xoay vòng
+                tiebreak = next(self._tiebreak)
+                preferred.sort(
+                    key=lambda e: (
+                        e.outstanding,
+                        (self.endpoints.index(e) - tiebreak) % len(self.endpoints),
+                    )
+                )
+                for endpoint in preferred:
+                    if endpoint.client.breaker.allow_request():
+                        endpoint.outstanding += 1
+                        return endpoint
+
+                # Chỉ còn endpoint đang half-open (đã có request thử) -> fail ngay
+                if not any(
+                    e.client.breaker.state == CircuitBreaker.CLOSED for e in available
+                ):
+                    raise CircuitOpenError(
+                        "Code executor is temporarily unavailable (recovering)"
+                    )
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise CircuitOpenError("All code executors are busy, try again later")
+                wait = min(remaining, 0.5)
+                if not ready:
+                    # Mọi endpoint đều đang bị hoãn do 429: chờ endpoint hết hoãn sớm nhất
+                    wait = min(e.throttled_until for e in available) - now
+                    if wait > remaining:
+                        raise CircuitOpenError(
+                            "Code executor is rate limiting requests, try again later"
+                        )
+                # Breaker chuyển open -> half-open theo thời gian, không có notify
+                self._cond.wait(wait)
+
+    def _release(self, endpoint):
+        with self._cond:
+            endpoint.outstanding -= 1
+            self._cond.notify()
+
+    def post_json(self, payload, timeout):
+        """
+        POST payload tới một endpoint, retry lỗi tạm thời với backoff.
+        Thời gian chờ slot tối đa bằng timeout của request.
+        Returns: (response json, thời gian ms của lần gọi thành công)
+        Raises: CircuitOpenError khi không có endpoint nhận request, exception của
+            lần thử cuối khi hết retry
+        """
+        max_retries = PISTON_CLIENT_CONFIG["max_retries"]
+        failed = None
+
+        for attempt in range(max_retries + 1):
+            endpoint = self._acquire(failed, time.monotonic() + timeout)
+            try:
+                return endpoint.client.send(payload, timeout)
+            except (ExecutorHTTPError, requests.exceptions.RequestException, ValueError) as e:
+                throttled = isinstance(e, ExecutorHTTPError) and e.status_code == 429
+                if throttled:
+                    self._throttle(endpoint, _backoff_delay(attempt, e.retry_after))
+                if not _is_retryable(e) or attempt == max_retries:
+                    raise
+                failed = endpoint
+                # Còn endpoint khác thì chuyển ngay, chỉ một endpoint thì backoff như cũ
+                # (429: _acquire chờ endpoint hết bị hoãn)
+                if len(self.endpoints) == 1 and not throttled:
+                    time.sleep(_backoff_delay(attempt, getattr(e, "retry_after", None)))
+            finally:
+                self._release(endpoint)
+
+    def _throttle(self, endpoint, delay):
+        """Endpoint trả 429: hoãn gửi request tới endpoint trong delay giây"""
+        with self._cond:
+            endpoint.throttled_until = max(
+                endpoint.throttled_until, time.monotonic() + delay
+            )
+
+    def _health_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            for endpoint in self.endpoints:
+                self._probe(endpoint)
+
+    def _probe(self, endpoint):
+        """Health check một endpoint: lỗi -> tính như request lỗi, thành công -> nhận lại"""
+        if endpoint.health_url is None:
+            return
+        breaker = endpoint.client.breaker
+        try:
+            response = endpoint.client.session.get(
+                endpoint.health_url, timeout=PISTON_CLIENT_CONFIG["health_check_timeout"]
+            )
+            healthy = response.status_code == 200
+        except requests.exceptions.RequestException:
+            healthy = False
+
+        if not healthy:
+            breaker.record_failure()
+        elif breaker.state != CircuitBreaker.CLOSED:
+            breaker.record_success()
+            with self._cond:
+                self._cond.notify_all()
@@ -0,0 +1,348 @@
+"""
+Local executor - chạy code bằng subprocess ngay trên máy chấm (không qua network).
+
+Mỗi lần chạy:
+    - Source được ghi vào một workspace tạm (build dir), compile một lần nếu cần
+    - Mỗi input chạy trong một thư mục làm việc riêng, process group riêng
+    - Giới hạn tài nguyên bằng rlimit: CPU time, address space, kích thước output,
+      số process (khi chạy bằng UID sandbox); wall time được giới hạn bằng timeout
+      khi chờ process
+    - Code chạy trong sandbox của launcher: mount namespace chỉ thấy thư mục của
+      lần chạy, UID riêng nếu có cấu hình - xem sandbox_launcher
+    - Python / Node chạy bằng interpreter khởi động sẵn (warm pool) nếu có process
+      rảnh, CPU time chỉ tính từ lúc code của user bắt đầu chạy
+"""
+
+import math
+import os
+import re
+import resource
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from config import EXECUTOR_CONFIG
+from backend.constants import LOCAL_RUNTIME_CONFIG
+from backend.executors.base import (
+    BaseExecutor,
+    resolve_language,
+    unsupported_language_result,
+    system_error_result,
+    compile_error_result,
+    build_run_result,
+)
+from backend.executors.artifact_cache import get_artifact_cache
+from backend.executors.sandbox_launcher import (
+    get_launcher,
+    get_sandbox_uids,
+    launcher_command,
+    prepare_sandbox_dir,
+    read_report,
+    stop_launcher,
+)
+from backend.executors.warm_pool import get_warm_pool, kill_process_group
+
+JAVA_MAIN_CLASS_PATTERN = re.compile(r"public\s+(?:final\s+)?class\s+(\w+)")
+
+# Fallback khi không build được sandbox launcher: prlimit (util-linux) set rlimit
+# rồi exec chương trình, hoặc set rlimit trong preexec_fn. Khi đó ru_maxrss bao gồm
+# cả RSS của app server (giữ nguyên qua exec) nên memory bị báo cao hơn thực tế,
+# và code không được cô lập bằng mount namespace (vẫn chạy bằng UID sandbox nếu có)
+PRLIMIT = shutil.which("prlimit")
+
+
+def _resource_limits(runtime, cpu):
+    """Danh sách (tên rlimit, soft, hard) áp dụng cho process chạy code"""
+    address_space = EXECUTOR_CONFIG["address_space_mb"] * 1024 * 1024
+    output_limit = EXECUTOR_CONFIG["output_limit_kb"] * 1024
+    max_processes = EXECUTOR_CONFIG["max_processes"]
+
+    limits = [
+        ("cpu", cpu, cpu + 1),
+        ("fsize", output_limit, output_limit),
+        ("core", 0, 0),
+    ]
+    # RLIMIT_NPROC đếm mọi process / thread của UID: với UID của app sẽ tính cả
+    # thread của app server -> chỉ giới hạn khi code chạy bằng UID sandbox riêng
+    if get_sandbox_uids().enabled:
+        limits.append(("nproc", max_processes, max_processes))
+    if runtime["limit_address_space"]:
+        limits.append(("as", address_space, address_space))
+    return limits
+
+
+def _limited_command(runtime, run_cmd, launcher, report_fd, uid, show, cpu):
+    """
+    Returns: (command, preexec_fn) - bọc command bằng sandbox launcher (đo chính xác
+    CPU time / peak RSS, cô lập), hoặc prlimit, hoặc set rlimit trong preexec_fn
+    """
+    limits = _resource_limits(runtime, cpu)
+    if launcher:
+        return launcher_command(launcher, limits, report_fd, uid, show, run_cmd), None
+    if PRLIMIT:
+        options = [f"--{name}={soft}:{hard}" for name, soft, hard in limits]
+        return [PRLIMIT, *options, *run_cmd], None
+
+    def apply_limits():
+        for name, soft, hard in limits:
+            resource.setrlimit(getattr(resource, f"RLIMIT_{name.upper()}"), (soft, hard))
+
+    return run_cmd, apply_limits
+
+
+def _read_text(path, limit):
+    # O_NOFOLLOW: code của user không thay output bằng symlink tới file của app được
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return ""
+    with os.fdopen(fd, "rb") as f:
+        return f.read(limit).decode("utf-8", "replace")
+
+
+def _file_size(path):
+    try:
+        return os.lstat(path).st_size
+    except OSError:
+        return 0
+
+
+def _signal_name(signum):
+    try:
+        return signal.Signals(signum).name
+    except ValueError:
+        return signum
+
+
+class LocalExecutor(BaseExecutor):
+    """Chạy code bằng subprocess với rlimit trên máy chấm"""
+
+    name = "local"
+
+    def __init__(self):
+        self.work_dir = EXECUTOR_CONFIG["work_dir"]
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    def supports_batch(self, language, code=None):
+        config = resolve_language(language)
+        return bool(config) and config["language"] in LOCAL_RUNTIME_CONFIG
+
+    def run(self, code, language, input_data, time_limit=None):
+        return self.run_batch(code, language, [input_data], time_limit)[0]
+
+    def run_batch(self, code, language, inputs, time_limit=None):
+        """Compile một lần trong build dir, sau đó chạy từng input"""
+        config = resolve_language(language)
+        if not config or config["language"] not in LOCAL_RUNTIME_CONFIG:
+            return [unsupported_language_result(language)] * len(inputs)
+
+        runtime = LOCAL_RUNTIME_CONFIG[config["language"]]
+        workspace = tempfile.mkdtemp(prefix="run-", dir=self.work_dir)
+        try:
+            run_cmd, error = self._prepare(workspace, code, config, runtime)
+            if error:
+                return [error] * len(inputs)
+
+            warm_pool = get_warm_pool(
+                config["language"],
+                runtime,
+                self.work_dir,
+                EXECUTOR_CONFIG["warm_pool_size"].get(config["language"], 0),
+                _resource_limits(runtime, EXECUTOR_CONFIG["cpu_time_limit"]),
+            )
+            return [
+                self._execute(workspace, i, run_cmd, runtime, data, time_limit, warm_pool)
+                for i, data in enumerate(inputs)
+            ]
+        except Exception as e:
+            return [system_error_result(e)] * len(inputs)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    def _prepare(self, workspace, code, config, runtime):
+        """
+        Ghi source vào build dir và compile (nếu ngôn ngữ cần compile).
+        Artifact compile được lấy từ / lưu vào artifact cache theo hash của source.
+        Returns: (run command, None) hoặc (None, compile error result)
+        """
+        build_dir = os.path.join(workspace, "build")
+        os.makedirs(build_dir)
+
+        match = JAVA_MAIN_CLASS_PATTERN.search(code)
+        values = {
+            "build": build_dir,
+            "main_class": match.group(1) if match else "Main",
+        }
+
+        source_name = runtime["source"].format(**values)
+        with open(os.path.join(build_dir, source_name), "w", encoding="utf-8") as f:
+            f.write(code)
+
+        if runtime["compile"]:
+            cache = get_artifact_cache()
+            cache_key = cache.make_key(
+                config["language"], config["version"], runtime["compile"], code
+            )
+            cached_error = cache.get_compile_error(cache_key)
+            if cached_error is not None:
+                return None, compile_error_result(cached_error)
+            if cache.checkout(cache_key, build_dir):
+                return [arg.format(**values) for arg in runtime["run"]], None
+
+            compile_cmd = [arg.format(**values) for arg in runtime["compile"]]
+            try:
+                compiled = subprocess.run(
+                    compile_cmd,
+                    cwd=build_dir,
+                    capture_output=True,
+                    timeout=EXECUTOR_CONFIG["compile_time_limit"],
+                )
+            except subprocess.TimeoutExpired:
+                return None, compile_error_result("Compilation timed out")
+
+            if compiled.returncode != 0:
+                stderr = (compiled.stderr or compiled.stdout).decode("utf-8", "replace")
+                cache.store_compile_error(cache_key, stderr)
+                return None, compile_error_result(stderr)
+
+            cache.store_build(cache_key, build_dir, exclude=(source_name,))
+
+        return [arg.format(**values) for arg in runtime["run"]], None
+
+    def _execute(
+        self, workspace, index, run_cmd, runtime, input_data, time_limit=None, warm_pool=None
+    ):
+        """Chạy một input trong thư mục làm việc riêng, trả về result dict"""
+        run_dir = os.path.join(workspace, f"case-{index}")
+        os.makedirs(run_dir)
+        stdin_path = os.path.join(run_dir, ".stdin")
+        stdout_path = os.path.join(run_dir, ".stdout")
+        stderr_path = os.path.join(run_dir, ".stderr")
+
+        with open(stdin_path, "w", encoding="utf-8") as f:
+            f.write(input_data or "")
+
+        output_limit = EXECUTOR_CONFIG["output_limit_kb"] * 1024
+        # CPU / wall time limit: mặc định của executor, hoặc time_limit của lần chạy này
+        cpu_limit = EXECUTOR_CONFIG["cpu_time_limit"]
+        wall_limit = EXECUTOR_CONFIG["wall_time_limit"]
+        if time_limit:
+            cpu_limit = max(1, math.ceil(time_limit))
+            wall_limit = max(wall_limit, cpu_limit * 2)
+
+        outcome = None
+        if warm_pool:
+            # Script là phần tử cuối của run command (interpreter đã chạy sẵn)
+            outcome = warm_pool.run(
+                run_dir,
+                run_cmd[-1],
+                _resource_limits(runtime, cpu_limit),
+                cpu_limit,
+                wall_limit,
+            )
+        if outcome is None:
+            outcome = self._spawn(run_dir, run_cmd, runtime, cpu_limit, wall_limit)
+        status, cpu_time_ms, memory_kb, wall_time_ms, timed_out = outcome
+
+        returncode = os.waitstatus_to_exitcode(status)
+        run_stage = {
+            "stdout": _read_text(stdout_path, output_limit),
+            "stderr": _read_text(stderr_path, output_limit),
+            "code": returncode if returncode >= 0 else None,
+            "signal": "SIGKILL" if timed_out else (
+                _signal_name(-returncode) if returncode < 0 else None
+            ),
+        }
+        # SIGXFSZ, hoặc write lỗi EFBIG nếu runtime ignore signal này (Python)
+        if run_stage["signal"] == "SIGXFSZ" or (
+            run_stage["code"] and _file_size(stdout_path) >= output_limit
+        ):
+            run_stage["stderr"] += "\nOutput Limit Exceeded"
+
+        return build_run_result(run_stage, wall_time_ms, cpu_time_ms, memory_kb)
+
+    def _spawn(self, run_dir, run_cmd, runtime, cpu_limit, wall_limit):
+        """
+        Chạy command trong process mới (cold start).
+        Returns: (wait status, cpu_ms, memory_kb, wall_ms, timed_out)
+        """
+        uids = get_sandbox_uids()
+        uid = uids.acquire(wall_limit)
+        try:
+            return self._spawn_as(uid, run_dir, run_cmd, runtime, cpu_limit, wall_limit)
+        finally:
+            uids.release(uid)
+
+    def _spawn_as(self, uid, run_dir, run_cmd, runtime, cpu_limit, wall_limit):
+        timed_out = threading.Event()
+        launcher = get_launcher(self.work_dir)
+        build_dir = os.path.join(os.path.dirname(run_dir), "build")
+        for path in (os.path.dirname(run_dir), build_dir, run_dir):
+            prepare_sandbox_dir(path, uid)
+        # Report được ghi vào pipe của app, không qua file mà code của user ghi được
+        report_read, report_write = os.pipe() if launcher else (None, -1)
+        command, preexec_fn = _limited_command(
+            runtime,
+            run_cmd,
+            launcher,
+            report_write,
+            uid,
+            [(build_dir, False), (run_dir, True)],
+            cpu_limit,
+        )
+        # Không có launcher: subprocess tự đổi sang UID sandbox trước khi exec
+        user = {} if launcher or uid is None else {"user": uid, "group": uid, "extra_groups": []}
+
+        try:
+            with open(os.path.join(run_dir, ".stdin"), "rb") as stdin, open(
+                os.path.join(run_dir, ".stdout"), "wb"
+            ) as stdout, open(os.path.join(run_dir, ".stderr"), "wb") as stderr:
+                start_time = time.monotonic()
+                proc = subprocess.Popen(
+                    command,
+                    cwd=run_dir,
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    preexec_fn=preexec_fn,
+                    start_new_session=True,  # Process group riêng để kill cả process con
+                    close_fds=True,
+                    pass_fds=(report_write,) if launcher else (),
+                    **user,
+                )
+        except Exception:
+            if launcher:
+                os.close(report_read)
+            raise
+        finally:
+            if launcher:
+                os.close(report_write)
+
+        def kill_on_timeout():
+            timed_out.set()
+            if launcher:
+                stop_launcher(proc.pid)
+            else:
+                kill_process_group(proc.pid)
+
+        # Wall time limit: timer kill process group, wait4 lấy rusage của process
+        timer = threading.Timer(wall_limit, kill_on_timeout)
+        timer.start()
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+        wall_time_ms = round((time.monotonic() - start_time) * 1000)
+        kill_process_group(proc.pid)  # Dọn process con còn sót lại
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        # CPU time (user + sys) và peak RSS (ru_maxrss - KB trên Linux) của process
+        cpu_time_ms = round((usage.ru_utime + usage.ru_stime) * 1000)
+        memory_kb = usage.ru_maxrss
+        report = read_report(report_read) if launcher else None
+        if report:
+            # Launcher đo riêng process chạy code của user
+            status, cpu_time_ms, memory_kb = report
+        return status, cpu_time_ms, memory_kb, wall_time_ms, timed_out.is_set()
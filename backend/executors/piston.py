@@ -0,0 +1,197 @@
+from backend.constants import (
+    PISTON_API_URL,
+    PISTON_TIMEOUT,
+    PISTON_MAX_RUN_TIMEOUT,
+    CODE_RUN_TIMEOUT,
+)
+from config import PISTON_CLIENT_CONFIG
+from backend.executors.base import (
+    BaseExecutor,
+    resolve_language,
+    unsupported_language_result,
+    system_error_result,
+    compile_error_result,
+    build_run_result,
+)
+from backend.executors.artifact_cache import get_artifact_cache
+from backend.executors.http_client import EndpointPool, CircuitOpenError
+from backend.executors.batch_harness import (
+    supports_batch,
+    build_batch_program,
+    encode_inputs,
+    parse_batch_output,
+)
+
+
+# Ngôn ngữ có compile stage trên Piston
+COMPILED_LANGUAGES = ("cpp", "java")
+
+
+class PistonExecutor(BaseExecutor):
+    """Chạy code qua Piston API (PISTON_API_URLS, mặc định PISTON_API_URL)"""
+
+    name = "piston"
+
+    def __init__(self):
+        # Session keep-alive + retry + circuit breaker dùng chung cho mọi judge thread,
+        # request được chia cho các endpoint
+        self.client = EndpointPool(PISTON_CLIENT_CONFIG["endpoints"] or [PISTON_API_URL])
+
+    @staticmethod
+    def _compile_cache_key(config, code):
+        """
+        Piston compile trên server nên không cache được binary, nhưng lỗi compile
+        thì cache được: submission lỗi giống hệt sẽ fail ngay không cần gọi Piston
+        """
+        if config["language"] not in COMPILED_LANGUAGES:
+            return None
+        return get_artifact_cache().make_key(
+            config["language"], config["version"], ["piston"], code
+        )
+
+    def _cached_compile_error(self, config, code):
+        cache_key = self._compile_cache_key(config, code)
+        if cache_key is None:
+            return None
+        stderr = get_artifact_cache().get_compile_error(cache_key)
+        return compile_error_result(stderr) if stderr is not None else None
+
+    def _post(self, payload, timeout):
+        """Gửi request tới một Piston endpoint, trả về (response json, thời gian ms)"""
+        return self.client.post_json(payload, timeout)
+
+    @staticmethod
+    def _compile_error(compile_stage):
+        """Trả về result dict nếu Piston báo lỗi biên dịch (C++/Java), ngược lại None"""
+        if compile_stage and compile_stage.get("code", 0) != 0:
+            return compile_error_result(compile_stage.get("stderr"))
+        return None
+
+    def run(self, code, language, input_data, time_limit=None):
+        config = resolve_language(language)
+        if not config:
+            return unsupported_language_result(language)
+
+        cached_error = self._cached_compile_error(config, code)
+        if cached_error:
+            return cached_error
+
+        payload = {
+            "language": config["language"],
+            "version": config["version"],
+            "files": [{"content": code}],
+            "stdin": input_data or "",
+            "run_timeout": (time_limit or CODE_RUN_TIMEOUT) * 1000,  # Convert to milliseconds
+        }
+
+        try:
+            result, execution_time_ms = self._post(payload, PISTON_TIMEOUT)
+        except Exception as e:
+            return system_error_result(e)
+
+        # Kiểm tra lỗi biên dịch (C++/Java)
+        compile_error = self._compile_error(result.get("compile", {}))
+        if compile_error:
+            cache_key = self._compile_cache_key(config, code)
+            if cache_key:
+                get_artifact_cache().store_compile_error(cache_key, compile_error["error"])
+            return compile_error
+
+        # CPU time (ms) và peak memory (bytes) do Piston đo trong sandbox (Piston >= 3.1).
+        # Bản Piston cũ không trả về -> để None thay vì đoán từ thời gian HTTP
+        run_stage = result.get("run", {})
+        memory = run_stage.get("memory")
+
+        return build_run_result(
+            run_stage,
+            execution_time_ms,
+            run_stage.get("cpu_time"),
+            memory // 1024 if memory is not None else None,
+        )
+
+    def supports_batch(self, language, code=None):
+        config = resolve_language(language)
+        return bool(config) and supports_batch(config["language"], code)
+
+    def max_batch_inputs(self, language, time_limit=None):
+        """
+        Piston giới hạn run_timeout của mỗi request (PISTON_MAX_RUN_TIMEOUT): một
+        batch chỉ gồm số input mà mỗi input chạy hết time limit vẫn nằm trong giới hạn
+        """
+        per_input_timeout = time_limit or CODE_RUN_TIMEOUT
+        return max(1, int(PISTON_MAX_RUN_TIMEOUT // per_input_timeout))
+
+    def run_batch(self, code, language, inputs, time_limit=None):
+        """
+        Chạy code với nhiều input trong MỘT lần gọi Piston (compile một lần).
+        Input nào harness không trả về kết quả (bị kill do vượt run_timeout tổng,
+        output bị cắt, request lỗi...) có kết quả None - judge_service chạy lại
+        riêng từng input đó song song trên scheduler.
+        """
+        if not inputs:
+            return []
+
+        config = resolve_language(language)
+        cached_error = self._cached_compile_error(config, code) if config else None
+        if cached_error:
+            return [cached_error] * len(inputs)
+
+        per_input_timeout = time_limit or CODE_RUN_TIMEOUT
+        program = (
+            build_batch_program(code, config["language"], per_input_timeout)
+            if config
+            else None
+        )
+        if program is None:
+            return super().run_batch(code, language, inputs, time_limit)
+
+        source, nonce = program
+        # Piston giới hạn run_timeout của mỗi request, harness tự giới hạn từng input.
+        # Batch lớn hơn max_batch_inputs() thì các input cuối có thể không kịp chạy
+        run_timeout = min(per_input_timeout * len(inputs), PISTON_MAX_RUN_TIMEOUT)
+        payload = {
+            "language": config["language"],
+            "version": config["version"],
+            "files": [{"content": source}],
+            "stdin": encode_inputs(inputs),
+            "run_timeout": run_timeout * 1000,
+        }
+
+        try:
+            result, execution_time_ms = self._post(
+                payload, PISTON_TIMEOUT + run_timeout
+            )
+        except CircuitOpenError as e:
+            # Piston đang bị ngắt - fail ngay, không chạy lại từng input
+            return [system_error_result(e)] * len(inputs)
+        except Exception:
+            return [None] * len(inputs)
+
+        if self._compile_error(result.get("compile", {})):
+            # Harness không compile được - có thể do code của user hoặc do harness.
+            # Chạy riêng input đầu tiên để lấy lỗi thật của user.
+            first = self.run(code, language, inputs[0], time_limit)
+            if first.get("status_label") == "Compilation Error":
+                return [first] * len(inputs)
+            return [first] + [None] * (len(inputs) - 1)
+
+        compile_error, records = parse_batch_output(
+            result.get("run", {}).get("stdout", ""), nonce
+        )
+        if compile_error is not None:
+            return [compile_error_result(compile_error)] * len(inputs)
+
+        results = []
+        for i in range(len(inputs)):
+            record = records.get(i)
+            if record is None:
+                results.append(None)
+                continue
+
+            # Harness đo CPU time và peak RSS của từng input bằng wait4 trong sandbox
+            results.append(
+                build_run_result(
+                    record, execution_time_ms, record["cpu_time"], record["memory"]
+                )
+            )
+        return results
@@ -0,0 +1,439 @@
+"""
+Sandbox launcher - chương trình C nhỏ dùng để chạy code của user và đo tài nguyên.
+
+Linux giữ ru_maxrss qua execve: process con fork/vfork từ app server (hàng chục MB)
+sẽ luôn báo peak RSS >= RSS của app server. Launcher là process rất nhỏ:
+    - fork, process con tự cô lập (xem dưới), set rlimit rồi exec chương trình
+    - wait4 process con -> ghi "wait_status cpu_ms maxrss_kb" vào report pipe
+      (fd do app mở - code của user không ghi đè / giả mạo được report)
+    - Chương trình chạy trong process group riêng: app dừng chương trình bằng
+      stop_launcher (SIGTERM cho launcher) để launcher vẫn dọn UID và ghi report
+Vì chương trình được fork từ launcher (vài trăm KB) nên số đo memory chính xác.
+
+Cô lập process chạy code của user:
+    - Mount namespace riêng (EXECUTOR_SANDBOX_ISOLATE): các thư mục của app (work
+      dir, test data, artifact cache, thư mục app...) bị che bằng tmpfs rỗng, chỉ
+      các thư mục của lần chạy (build dir - chỉ đọc, thư mục làm việc) được bind
+      lại đúng đường dẫn cũ. App không chạy bằng root -> dùng thêm user namespace
+    - UID riêng (EXECUTOR_SANDBOX_UIDS, cần app chạy bằng root): mỗi process chạy
+      code giữ một UID trong dải, RLIMIT_NPROC chỉ được áp dụng khi đó (rlimit này
+      đếm mọi process / thread của UID). Process còn sót của UID bị kill khi chạy xong
+
+Launcher được compile một lần vào work_dir (cần cc/gcc/g++ trên máy chấm).
+"""
+
+import hashlib
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import threading
+from config import EXECUTOR_CONFIG, TESTDATA_CONFIG
+
+LAUNCHER_SOURCE = r"""
+#define _GNU_SOURCE
+#include <errno.h>
+#include <fcntl.h>
+#include <grp.h>
+#include <limits.h>
+#include <sched.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/mount.h>
+#include <sys/prctl.h>
+#include <sys/resource.h>
+#include <sys/stat.h>
+#include <sys/statvfs.h>
+#include <sys/time.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+/*
+ * launcher <cpu> <fsize> <nproc> <as> <report_fd> <uid> <isolate> [hide...] -- [show...] -- cmd [args...]
+ *   cpu / fsize / nproc / as = 0: không giới hạn, report_fd = -1: không ghi report
+ *   uid = -1: giữ uid hiện tại, isolate = 1: mount namespace riêng
+ *   hide: thư mục bị che bằng tmpfs, show: "r:<dir>" (chỉ đọc) / "w:<dir>" được bind lại
+ */
+static int error_fd = -1;
+static volatile pid_t child_pid = 0;
+
+/* SIGTERM từ app (timeout / dừng warm process): kill process group của chương
+   trình, launcher vẫn sống để dọn UID và ghi report */
+static void stop_child(int signum) {
+    (void)signum;
+    if (child_pid > 0) kill(-child_pid, SIGKILL);
+}
+
+static void fail(const char *what) {
+    dprintf(error_fd, "%s: %s", what, strerror(errno));
+    _exit(126);
+}
+
+static void limit(int resource, rlim_t value) {
+    struct rlimit rl;
+    if (value == 0) return;
+    rl.rlim_cur = value;
+    rl.rlim_max = resource == RLIMIT_CPU ? value + 1 : value;
+    setrlimit(resource, &rl);
+}
+
+static void write_file(const char *path, const char *text) {
+    int fd = open(path, O_WRONLY);
+    if (fd < 0 || write(fd, text, strlen(text)) < 0) fail(path);
+    close(fd);
+}
+
+static void make_dirs(char *path) {
+    for (char *p = path + 1; *p; p++) {
+        if (*p != '/') continue;
+        *p = 0;
+        mkdir(path, 0755);
+        *p = '/';
+    }
+    mkdir(path, 0755);
+}
+
+static void isolate(char **hide, int hide_count, char **show, int show_count) {
+    if (geteuid() == 0) {
+        if (unshare(CLONE_NEWNS) < 0) fail("unshare");
+    } else {
+        /* Không phải root: user namespace chỉ map uid / gid hiện tại */
+        char map[64];
+        uid_t uid = geteuid();
+        gid_t gid = getegid();
+        if (unshare(CLONE_NEWUSER | CLONE_NEWNS) < 0) fail("unshare");
+        snprintf(map, sizeof map, "%u %u 1\n", uid, uid);
+        write_file("/proc/self/uid_map", map);
+        write_file("/proc/self/setgroups", "deny");
+        snprintf(map, sizeof map, "%u %u 1\n", gid, gid);
+        write_file("/proc/self/gid_map", map);
+    }
+    if (mount(NULL, "/", NULL, MS_REC | MS_PRIVATE, NULL) < 0) fail("mount /");
+
+    /* Mở các thư mục được giữ lại trước khi che, sau đó bind lại đúng đường dẫn */
+    int fds[show_count + 1];
+    for (int i = 0; i < show_count; i++) {
+        fds[i] = open(show[i] + 2, O_PATH | O_DIRECTORY | O_CLOEXEC);
+        if (fds[i] < 0) fail(show[i] + 2);
+    }
+    for (int i = 0; i < hide_count; i++) {
+        if (mount("tmpfs", hide[i], "tmpfs", MS_NOSUID | MS_NODEV | MS_NOEXEC, "size=64k,mode=755") < 0
+            && errno != ENOENT)
+            fail(hide[i]);
+    }
+    for (int i = 0; i < show_count; i++) {
+        char source[64];
+        char *target = show[i] + 2;
+        struct statvfs st;
+        make_dirs(target);
+        snprintf(source, sizeof source, "/proc/self/fd/%d", fds[i]);
+        if (mount(source, target, NULL, MS_BIND | MS_REC, NULL) < 0) fail(target);
+
+        /* Giữ các flag của mount gốc (bị khóa trong user namespace) */
+        unsigned long flags = MS_BIND | MS_REMOUNT | MS_NOSUID | MS_NODEV;
+        if (show[i][0] == 'r') flags |= MS_RDONLY;
+        if (statvfs(target, &st) == 0) {
+            if (st.f_flag & ST_RDONLY) flags |= MS_RDONLY;
+            if (st.f_flag & ST_NOEXEC) flags |= MS_NOEXEC;
+            if (st.f_flag & ST_NOATIME) flags |= MS_NOATIME;
+            if (st.f_flag & ST_NODIRATIME) flags |= MS_NODIRATIME;
+        }
+        if (mount(NULL, target, NULL, flags, NULL) < 0) fail(target);
+        close(fds[i]);
+    }
+}
+
+int main(int argc, char **argv) {
+    if (argc < 10) return 120;
+    rlim_t cpu = strtoull(argv[1], 0, 10);
+    rlim_t fsize = strtoull(argv[2], 0, 10);
+    rlim_t nproc = strtoull(argv[3], 0, 10);
+    rlim_t as = strtoull(argv[4], 0, 10);
+    int report_fd = atoi(argv[5]);
+    long uid = atol(argv[6]);
+    int isolated = atoi(argv[7]);
+
+    char **hide = argv + 8, **show, **cmd;
+    int hide_count = 0, show_count = 0;
+    while (hide + hide_count < argv + argc && strcmp(hide[hide_count], "--") != 0) hide_count++;
+    show = hide + hide_count + 1;
+    while (show + show_count < argv + argc && strcmp(show[show_count], "--") != 0) show_count++;
+    cmd = show + show_count + 1;
+    if (cmd >= argv + argc) return 120;
+
+    if (report_fd >= 0) fcntl(report_fd, F_SETFD, FD_CLOEXEC);
+    char cwd[PATH_MAX];
+    if (!getcwd(cwd, sizeof cwd)) return 121;
+
+    /* Lỗi khi cô lập / exec được process con gửi về qua pipe (đóng khi exec) */
+    int errors[2];
+    if (pipe2(errors, O_CLOEXEC) < 0) return 121;
+
+    struct sigaction term;
+    memset(&term, 0, sizeof term);
+    term.sa_handler = stop_child;
+    term.sa_flags = SA_RESTART;
+    sigemptyset(&term.sa_mask);
+    sigaction(SIGTERM, &term, NULL);
+    /* Chặn SIGTERM tới khi biết pid / group của process con */
+    sigset_t blocked, previous;
+    sigemptyset(&blocked);
+    sigaddset(&blocked, SIGTERM);
+    sigprocmask(SIG_BLOCK, &blocked, &previous);
+
+    if (uid >= 0) prctl(PR_SET_CHILD_SUBREAPER, 1);
+    pid_t pid = fork();
+    if (pid < 0) return 121;
+    if (pid == 0) {
+        /* Process group riêng: kill group của chương trình không kill launcher */
+        setpgid(0, 0);
+        signal(SIGTERM, SIG_DFL);
+        sigprocmask(SIG_SETMASK, &previous, NULL);
+        error_fd = errors[1];
+        close(errors[0]);
+        if (isolated) isolate(hide, hide_count, show, show_count);
+        if (chdir(cwd) < 0) fail(cwd);
+        limit(RLIMIT_CPU, cpu);
+        limit(RLIMIT_FSIZE, fsize);
+        limit(RLIMIT_NPROC, nproc);
+        limit(RLIMIT_AS, as);
+        struct rlimit core = {0, 0};
+        setrlimit(RLIMIT_CORE, &core);
+        if (uid >= 0) {
+            if (setgroups(0, NULL) < 0 || setgid((gid_t)uid) < 0 || setuid((uid_t)uid) < 0)
+                fail("setuid");
+        }
+        execvp(cmd[0], cmd);
+        fail(cmd[0]);
+    }
+    setpgid(pid, pid);
+    child_pid = pid;
+    sigprocmask(SIG_SETMASK, &previous, NULL);
+    close(errors[1]);
+
+    int status = 0;
+    struct rusage ru;
+    while (wait4(pid, &status, 0, &ru) < 0) {
+        if (errno != EINTR) return 122;
+    }
+    kill(-pid, SIGKILL);  /* Process con còn sót trong group của chương trình */
+
+    if (uid >= 0) {
+        /* Kill mọi process còn sót lại của UID (kể cả process đã rời process group)
+           trước khi UID được dùng cho lần chạy khác */
+        pid_t killer = fork();
+        if (killer == 0) {
+            if (setuid((uid_t)uid) == 0) kill(-1, SIGKILL);
+            _exit(0);
+        }
+        if (killer > 0) waitpid(killer, NULL, 0);
+        /* Launcher là subreaper: reap các process mồ côi vừa bị kill để zombie
+           không tiếp tục tính vào RLIMIT_NPROC của UID */
+        while (waitpid(-1, NULL, 0) > 0 || errno == EINTR) {}
+    }
+
+    char error[512];
+    ssize_t size = read(errors[0], error, sizeof error - 1);
+    if (report_fd < 0) return 0;
+    if (size > 0) {
+        error[size] = 0;
+        dprintf(report_fd, "E %s\n", error);
+        return 0;
+    }
+    long cpu_ms = (ru.ru_utime.tv_sec + ru.ru_stime.tv_sec) * 1000L
+                  + (ru.ru_utime.tv_usec + ru.ru_stime.tv_usec) / 1000L;
+    dprintf(report_fd, "%d %ld %ld\n", status, cpu_ms, (long)ru.ru_maxrss);
+    return 0;
+}
+"""
+
+
+class SandboxError(Exception):
+    """Launcher không cô lập / chạy được chương trình (lỗi của máy chấm, không phải của code)"""
+
+
+_launcher_path = None
+_launcher_lock = threading.Lock()
+
+
+def get_launcher(work_dir):
+    """
+    Đường dẫn tới launcher đã compile (compile lần đầu khi được gọi).
+    Returns: None nếu máy chấm không có C compiler
+    """
+    global _launcher_path
+    if _launcher_path is not None:
+        return _launcher_path or None
+
+    with _launcher_lock:
+        if _launcher_path is None:
+            _launcher_path = _build_launcher(work_dir) or ""
+    return _launcher_path or None
+
+
+def _build_launcher(work_dir):
+    compiler = shutil.which("cc") or shutil.which("gcc") or shutil.which("g++")
+    if not compiler:
+        return None
+
+    digest = hashlib.sha256(LAUNCHER_SOURCE.encode("utf-8")).hexdigest()[:16]
+    binary = os.path.join(work_dir, f"launcher-{digest}")
+    if os.access(binary, os.X_OK):
+        return binary
+
+    source = binary + ".c"
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(LAUNCHER_SOURCE)
+
+    staging = f"{binary}.{os.getpid()}.tmp"
+    try:
+        built = subprocess.run(
+            [compiler, "-O2", "-x", "c", "-o", staging, source],
+            capture_output=True,
+            timeout=60,
+        )
+        if built.returncode != 0:
+            print(f"Cannot build sandbox launcher: {built.stderr.decode(errors='replace')}")
+            return None
+        os.replace(staging, binary)
+        return binary
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Cannot build sandbox launcher: {e}")
+        return None
+    finally:
+        for path in (source, staging):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def read_report(report_fd):
+    """
+    Đọc report của launcher từ report pipe (đóng fd sau khi đọc).
+    Returns: (wait status, cpu_ms, maxrss_kb) hoặc None nếu không có report
+    (launcher bị kill)
+    Raises: SandboxError nếu launcher không cô lập / exec được chương trình
+    """
+    data = b""
+    try:
+        while True:
+            chunk = os.read(report_fd, 4096)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(report_fd)
+
+    text = data.decode("utf-8", "replace").strip()
+    if text.startswith("E "):
+        raise SandboxError(f"Sandbox setup failed: {text[2:]}")
+    try:
+        status, cpu_ms, maxrss_kb = (int(x) for x in text.split())
+        return status, cpu_ms, maxrss_kb
+    except ValueError:
+        return None
+
+
+def stop_launcher(pid):
+    """
+    Dừng chương trình chạy qua launcher `pid`: launcher kill process group của
+    chương trình rồi vẫn dọn UID sandbox / ghi report trước khi thoát
+    """
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+def launcher_command(launcher, limits, report_fd, uid, show, command):
+    """
+    Command chạy `command` qua launcher.
+
+    Args:
+        limits: list (tên rlimit, soft, hard) - xem local._resource_limits
+        report_fd: fd ghi của report pipe (-1 = không cần report)
+        uid: UID sandbox (None = giữ UID của app)
+        show: list (đường dẫn, writable) - thư mục code của user thấy được khi cô lập
+    """
+    values = {name: soft for name, soft, _ in limits}
+    args = [values.get(name, 0) for name in ("cpu", "fsize", "nproc", "as")]
+    isolated = EXECUTOR_CONFIG["sandbox_isolate"]
+    return [
+        launcher,
+        *map(str, args),
+        str(report_fd),
+        str(-1 if uid is None else uid),
+        "1" if isolated else "0",
+        *(hidden_dirs() if isolated else []),
+        "--",
+        *(f"{'w' if writable else 'r'}:{os.path.abspath(path)}" for path, writable in show),
+        "--",
+        *resolve_program(command),
+    ]
+
+
+def hidden_dirs():
+    """Thư mục của app bị che khi cô lập (work dir trước để bind lại được thư mục con)"""
+    dirs = [
+        EXECUTOR_CONFIG["work_dir"],
+        EXECUTOR_CONFIG["artifact_cache_dir"],
+        TESTDATA_CONFIG["dir"],
+        *EXECUTOR_CONFIG["sandbox_hide"],
+    ]
+    return [os.path.abspath(path) for path in dirs if path]
+
+
+def resolve_program(command):
+    """
+    Đổi chương trình (VD: python3 của virtualenv nằm trong thư mục app) thành
+    đường dẫn thật, vẫn exec được khi thư mục app bị che
+    """
+    program = shutil.which(command[0])
+    if not program:
+        return command
+    return [os.path.realpath(program), *command[1:]]
+
+
+class SandboxUids:
+    """Dải UID dành cho code của user - mỗi process chạy code giữ riêng một UID"""
+
+    def __init__(self, uids):
+        self._free = queue.Queue()
+        for uid in uids:
+            self._free.put(uid)
+        self.enabled = bool(uids)
+
+    def acquire(self, timeout):
+        """UID rảnh (chờ tối đa timeout giây), None nếu không dùng UID riêng"""
+        if not self.enabled:
+            return None
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise SandboxError("No free sandbox UID (EXECUTOR_SANDBOX_UIDS is too small)")
+
+    def release(self, uid):
+        if uid is not None:
+            self._free.put(uid)
+
+
+_sandbox_uids = SandboxUids(EXECUTOR_CONFIG["sandbox_uids"])
+
+
+def get_sandbox_uids():
+    return _sandbox_uids
+
+
+def prepare_sandbox_dir(path, uid, writable=False):
+    """
+    Cho UID sandbox vào được thư mục của lần chạy (mkdtemp tạo với quyền 0700).
+    writable: thư mục thuộc về UID sandbox (slot của warm pool)
+    """
+    if uid is None:
+        return
+    if writable:
+        os.chown(path, uid, uid)
+    else:
+        os.chmod(path, 0o755)
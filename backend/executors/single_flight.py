@@ -0,0 +1,87 @@
+"""
+Single-flight: gộp các lần chạy code giống hệt nhau đang diễn ra đồng thời.
+
+Cả lớp bấm Run cùng starter code, hay user double-click Submit, tạo ra nhiều
+payload (language, code đã wrap, stdin, time limit) giống hệt nhau gửi tới
+executor cùng lúc. Lần gọi đầu tiên (leader) thực sự chạy, các lần gọi trùng key
+trong lúc leader đang chạy chờ và nhận cùng kết quả (bản copy) hoặc cùng exception.
+Không cache: khi leader xong, lần gọi sau với cùng key sẽ chạy lại.
+
+Bộ đếm (executions / shared) xem qua get_single_flight().stats().
+"""
+
+import copy
+import hashlib
+import json
+import threading
+
+
+def make_execution_key(kind, language, code, stdin, time_limit):
+    """Key của một lần chạy: hash(kind, language, code, stdin / list input, time limit)"""
+    payload = json.dumps([kind, language, code, stdin, time_limit])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0  # Số caller đang chờ kết quả của lần chạy này
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call đang chạy
+        self.executions = 0  # Số lần thực sự gọi executor
+        self.shared = 0  # Số lần gọi nhận kết quả của lần chạy khác
+
+    def do(self, key, fn, *args):
+        """Chạy fn(*args), hoặc chờ lần chạy đang diễn ra với cùng key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Caller có thể sửa result dict - mỗi caller nhận bản copy riêng
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]  # Từ đây không còn caller mới chờ call này
+            call.done.set()
+        return copy.deepcopy(call.result) if call.waiters else call.result
+
+    def stats(self):
+        with self._lock:
+            requests = self.executions + self.shared
+            return {
+                "executions": self.executions,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+                "hit_rate": round(self.shared / requests, 4) if requests else 0.0,
+            }
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    return _single_flight
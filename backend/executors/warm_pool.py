@@ -0,0 +1,593 @@
+"""
+Warm pool - interpreter Python / Node được khởi động sẵn cho local executor.
+
+Với test case nhỏ, phần lớn thời gian đo được là khởi động interpreter và import
+của wrapper chứ không phải code của user. Pool giữ sẵn process đã khởi động:
+
+    python - fork server (zygote): một process Python đã import sẵn các module
+             thường dùng, mỗi lần chạy fork một process con -> process con set
+             rlimit, chuyển vào slot của zygote rồi chạy script. rusage của
+             process con bắt đầu từ lúc fork nên CPU time chỉ tính code của user.
+             Zygote được dùng lại cho các lần chạy sau.
+    node   - Node không fork được: process node được khởi động sẵn chờ đường dẫn
+             script trên control pipe. Trước khi chạy script, process báo CPU time
+             đã dùng để khởi động (được trừ ra khỏi CPU time). Mỗi process chỉ
+             chạy một lần, pool tự khởi động process thay thế.
+
+Mỗi process khởi động sẵn chạy qua sandbox launcher như cold start (mount
+namespace, UID sandbox giữ suốt đời process) và chỉ thấy thư mục riêng của nó
+(slot): script, stdin của lần chạy được chép vào slot, stdout / stderr được
+chuyển về thư mục làm việc của test case sau khi chạy.
+
+Khi pool không còn process rảnh (hoặc không dùng được), run() trả về None và
+local executor chạy theo cách thường (cold start).
+"""
+
+import atexit
+import json
+import os
+import queue
+import shutil
+import signal
+import stat
+import subprocess
+import tempfile
+import threading
+import time
+from backend.executors.sandbox_launcher import (
+    get_launcher,
+    get_sandbox_uids,
+    launcher_command,
+    prepare_sandbox_dir,
+    read_report,
+    stop_launcher,
+)
+
+PYTHON_ZYGOTE_SOURCE = r'''
+import json, os, resource, runpy, signal, sys, time, traceback
+
+
+def kill_leftovers():
+    """Chạy bằng UID sandbox riêng: kill process còn sót của lần chạy trước (trừ zygote)"""
+    me, uid = os.getpid(), os.getuid()
+    for name in os.listdir("/proc"):
+        if not name.isdigit() or int(name) == me:
+            continue
+        try:
+            if os.stat("/proc/" + name).st_uid == uid:
+                os.kill(int(name), signal.SIGKILL)
+        except OSError:
+            pass
+    # Zygote là subreaper: reap các process mồ côi vừa bị kill để zombie không
+    # tiếp tục tính vào RLIMIT_NPROC của UID
+    while True:
+        try:
+            os.waitpid(-1, 0)
+        except ChildProcessError:
+            return
+        except InterruptedError:
+            continue
+
+
+def run_child(request, control, ready):
+    for f in control:
+        f.close()
+    os.setsid()
+    os.close(ready)  # Báo zygote: process group đã tồn tại
+    os.chdir(request["dir"])
+    create = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    for fd, name, flags in ((0, ".stdin", os.O_RDONLY), (1, ".stdout", create), (2, ".stderr", create)):
+        target = os.open(name, flags, 0o600)
+        os.dup2(target, fd)
+        os.close(target)
+    for name, soft, hard in request["limits"]:
+        resource.setrlimit(getattr(resource, "RLIMIT_" + name.upper()), (soft, hard))
+
+    script = request["script"]
+    sys.argv = [script]
+    sys.path[0] = os.path.dirname(script)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        return 1
+    return 0
+
+
+def main():
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(36, 1, 0, 0, 0)  # PR_SET_CHILD_SUBREAPER
+    except Exception:
+        pass
+    for name in sys.argv[1:]:
+        __import__(name)
+    control_in = os.fdopen(os.dup(0), "rb")
+    control_out = os.fdopen(os.dup(1), "wb")
+    null = os.open(os.devnull, os.O_RDWR)
+    os.dup2(null, 0)
+    os.dup2(null, 1)
+    os.close(null)
+
+    while True:
+        line = control_in.readline()
+        if not line:
+            return 0
+        request = json.loads(line)
+        start = time.monotonic()
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            return run_child(request, (control_in, control_out), ready_write)
+        os.close(ready_write)
+        # Chỉ báo pid sau khi con đã setsid, để killpg(pid) khi timeout luôn có group
+        os.read(ready_read, 1)
+        os.close(ready_read)
+        control_out.write(b"%d\n" % pid)
+        control_out.flush()
+        _, status, usage = os.wait4(pid, 0)
+        cpu_ms = round((usage.ru_utime + usage.ru_stime) * 1000)
+        wall_ms = round((time.monotonic() - start) * 1000)
+        if request["sandbox_uid"]:
+            kill_leftovers()
+        control_out.write(b"%d %d %d %d\n" % (status, cpu_ms, usage.ru_maxrss, wall_ms))
+        control_out.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+'''
+
+NODE_BOOTSTRAP_SOURCE = r"""
+"use strict";
+const fs = require("fs");
+const Module = require("module");
+const controlFd = Number(process.argv[2]);
+const ackFd = Number(process.argv[3]);
+
+const buffer = Buffer.alloc(4096);
+const chunks = [];
+for (;;) {
+  const size = fs.readSync(controlFd, buffer, 0, buffer.length, null);
+  if (size === 0) break;
+  chunks.push(Buffer.from(buffer.subarray(0, size)));
+  if (buffer.subarray(0, size).includes(10)) break;
+}
+const script = Buffer.concat(chunks).toString("utf8").trim();
+fs.closeSync(controlFd);
+if (!script) process.exit(0);
+
+const usage = process.cpuUsage();
+fs.writeSync(ackFd, `${Math.round((usage.user + usage.system) / 1000)}\n`);
+fs.closeSync(ackFd);
+
+process.argv = [process.argv[0], script];
+Module.runMain();
+"""
+
+# Loại pool theo ngôn ngữ (LOCAL_RUNTIME_CONFIG[...]["warm_pool"])
+WARM_PYTHON = "python"
+WARM_NODE = "node"
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def kill_process_group(pgid):
+    """Kill toàn bộ process group (kể cả process con user tạo ra)"""
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _stop_launcher(proc):
+    """Dừng process chạy qua launcher và đợi launcher dọn UID sandbox rồi thoát"""
+    if proc.returncode is not None:
+        return
+    stop_launcher(proc.pid)
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc.pid)
+        proc.wait()
+
+
+def get_warm_pool(language, runtime, work_dir, size, spawn_limits):
+    """
+    Warm pool của ngôn ngữ (tạo và bắt đầu khởi động process lần đầu khi được gọi).
+
+    Args:
+        runtime: LOCAL_RUNTIME_CONFIG của ngôn ngữ
+        size: số process giữ sẵn, <= 0 = tắt pool
+        spawn_limits: rlimit cho process node khởi động sẵn (list (tên, soft, hard))
+
+    Returns: pool hoặc None nếu ngôn ngữ không có / không dùng được warm pool
+    """
+    kind = runtime.get("warm_pool")
+    if not kind or size <= 0:
+        return None
+
+    pool = _pools.get(language)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(language)
+            if pool is None:
+                pool = _create_pool(kind, runtime, work_dir, size, spawn_limits)
+                _pools[language] = pool or False
+    return pool or None
+
+
+def _create_pool(kind, runtime, work_dir, size, spawn_limits):
+    if not shutil.which(runtime["run"][0]):
+        return None
+    launcher = get_launcher(work_dir)
+    if not launcher:  # Cần launcher để cô lập process (và đo CPU time / RSS của node)
+        return None
+    if kind == WARM_PYTHON:
+        return PythonZygotePool(runtime, work_dir, size, launcher)
+    if kind == WARM_NODE:
+        return NodeWarmPool(runtime, work_dir, size, launcher, spawn_limits)
+    return None
+
+
+def _create_slot(work_dir, uid, name, source):
+    """
+    Thư mục riêng (slot) của một process khởi động sẵn - thư mục duy nhất process
+    thấy được khi cô lập - cùng với source của zygote / bootstrap.
+    Returns: (slot, đường dẫn source)
+    """
+    slot = tempfile.mkdtemp(prefix="warm-", dir=work_dir)
+    prepare_sandbox_dir(slot, uid, writable=True)
+    path = os.path.join(slot, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    return slot, path
+
+
+def _copy_into_slot(source, target):
+    """
+    Chép file vào slot. Slot ghi được bởi code của lần chạy trước: file cũ bị xóa
+    và tạo lại (O_EXCL | O_NOFOLLOW) để không ghi theo symlink ra ngoài slot
+    """
+    try:
+        os.unlink(target)
+    except FileNotFoundError:
+        pass
+    fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o644)
+    with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def _load_slot(slot, run_dir, script):
+    """Chép stdin của test case và script vào slot. Returns: đường dẫn script trong slot"""
+    _copy_into_slot(os.path.join(run_dir, ".stdin"), os.path.join(slot, ".stdin"))
+    target = os.path.join(slot, "main" + os.path.splitext(script)[1])
+    _copy_into_slot(script, target)
+    return target
+
+
+def _unload_slot(slot, run_dir):
+    """
+    Chuyển stdout / stderr của lần chạy về thư mục làm việc của test case.
+    Chỉ nhận file thường (code của user có thể thay bằng symlink tới file khác)
+    """
+    for name in (".stdout", ".stderr"):
+        source = os.path.join(slot, name)
+        target = os.path.join(run_dir, name)
+        try:
+            regular = stat.S_ISREG(os.lstat(source).st_mode)
+        except FileNotFoundError:
+            regular = False
+        if regular:
+            os.replace(source, target)
+        else:
+            open(target, "wb").close()
+
+
+def _read_line(fd):
+    """Đọc một dòng từ pipe fd (blocking), "" nếu process bên kia đã đóng pipe"""
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = os.read(fd, 64)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode("ascii", "replace").strip()
+
+
+class _WarmPool:
+    """Hàng đợi các process rảnh; process được khởi động bằng background thread"""
+
+    def __init__(self, runtime, work_dir, size):
+        self.runtime = runtime
+        self.work_dir = work_dir
+        self.size = size
+        self._idle = queue.Queue()
+        self._refill(size)
+
+    def _refill(self, count):
+        threading.Thread(target=self._fill, args=(count,), daemon=True).start()
+
+    def _fill(self, count):
+        for _ in range(count):
+            try:
+                self._idle.put(self._spawn())
+            except Exception as e:
+                print(f"Cannot start warm {self.runtime['run'][0]} process: {e}")
+                return
+
+    def _acquire(self):
+        """Process rảnh, None nếu tất cả đang bận (không chờ)"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _spawn(self):
+        raise NotImplementedError
+
+    def run(self, run_dir, script, limits, cpu_limit, wall_limit):
+        """
+        Chạy script với stdin / stdout / stderr là .stdin / .stdout / .stderr trong run_dir.
+        Returns: (wait status, cpu_ms, memory_kb, wall_ms, timed_out) hoặc None nếu
+        không có process rảnh - caller chạy theo cách thường
+        """
+        raise NotImplementedError
+
+
+class _Zygote:
+    def __init__(self, proc, slot, uid):
+        self.proc = proc
+        self.slot = slot
+        self.uid = uid
+        self.stdin = proc.stdin
+        self.stdout = proc.stdout
+
+    def close(self):
+        _stop_launcher(self.proc)
+        shutil.rmtree(self.slot, ignore_errors=True)
+        get_sandbox_uids().release(self.uid)
+
+
+class PythonZygotePool(_WarmPool):
+    """Fork server Python - xem PYTHON_ZYGOTE_SOURCE"""
+
+    def __init__(self, runtime, work_dir, size, launcher):
+        self.launcher = launcher
+        super().__init__(runtime, work_dir, size)
+        atexit.register(self.close_idle)
+
+    def close_idle(self):
+        """Dừng các zygote đang chờ và xóa slot của chúng (khi app tắt)"""
+        while True:
+            zygote = self._acquire()
+            if zygote is None:
+                return
+            zygote.close()
+
+    def _spawn(self):
+        uid = get_sandbox_uids().acquire(None)
+        try:
+            slot, source = _create_slot(
+                self.work_dir, uid, "zygote.py", PYTHON_ZYGOTE_SOURCE
+            )
+            # Zygote không bị giới hạn, process con tự set rlimit cho từng lần chạy
+            command = launcher_command(
+                self.launcher,
+                [],
+                -1,
+                uid,
+                [(slot, True)],
+                [*self.runtime["run"][:-1], source, *self.runtime.get("warm_preload", [])],
+            )
+            proc = subprocess.Popen(
+                command,
+                cwd=slot,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                close_fds=True,
+            )
+        except Exception:
+            get_sandbox_uids().release(uid)
+            raise
+        return _Zygote(proc, slot, uid)
+
+    def _discard(self, zygote):
+        zygote.close()
+        self._refill(1)
+
+    def run(self, run_dir, script, limits, cpu_limit, wall_limit):
+        zygote = self._acquire()
+        if zygote is None:
+            return None
+
+        request = {
+            "dir": zygote.slot,
+            "script": _load_slot(zygote.slot, run_dir, script),
+            "limits": limits,
+            "sandbox_uid": zygote.uid is not None,
+        }
+        try:
+            zygote.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            zygote.stdin.flush()
+            pid = int(zygote.stdout.readline())
+        except (OSError, ValueError):  # Zygote đã chết
+            self._discard(zygote)
+            return None
+
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            kill_process_group(pid)
+
+        timer = threading.Timer(wall_limit, kill_on_timeout)
+        timer.start()
+        try:
+            line = zygote.stdout.readline()
+        finally:
+            timer.cancel()
+        kill_process_group(pid)  # Dọn process con còn sót lại
+
+        try:
+            status, cpu_ms, memory_kb, wall_ms = (int(x) for x in line.split())
+        except ValueError:
+            self._discard(zygote)
+            return None
+        _unload_slot(zygote.slot, run_dir)
+        self._idle.put(zygote)
+        return status, cpu_ms, memory_kb, wall_ms, timed_out.is_set()
+
+
+class _NodeProcess:
+    def __init__(self, proc, slot, uid, control, ack, report):
+        self.proc = proc
+        self.slot = slot
+        self.uid = uid
+        self.control = control  # Pipe gửi đường dẫn script
+        self.ack = ack  # Pipe nhận CPU time khởi động (ms)
+        self.report = report  # Report pipe của launcher
+
+    def close(self):
+        for fd in (self.control, self.ack, self.report):
+            if fd is None:
+                continue
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        _stop_launcher(self.proc)
+        shutil.rmtree(self.slot, ignore_errors=True)
+        get_sandbox_uids().release(self.uid)
+
+
+class NodeWarmPool(_WarmPool):
+    """Process node khởi động sẵn qua sandbox launcher - xem NODE_BOOTSTRAP_SOURCE"""
+
+    def __init__(self, runtime, work_dir, size, launcher, spawn_limits):
+        self.launcher = launcher
+        self.spawn_limits = spawn_limits
+        self.cpu_limit = {name: soft for name, soft, _ in spawn_limits}["cpu"]
+        super().__init__(runtime, work_dir, size)
+        atexit.register(self.close_idle)
+
+    def close_idle(self):
+        """Dừng các process đang chờ và xóa slot của chúng (khi app tắt)"""
+        while True:
+            worker = self._acquire()
+            if worker is None:
+                return
+            worker.close()
+
+    def _spawn(self):
+        uid = get_sandbox_uids().acquire(None)
+        pipes = []
+        try:
+            slot, bootstrap = _create_slot(
+                self.work_dir, uid, "bootstrap.js", NODE_BOOTSTRAP_SOURCE
+            )
+            for name in (".stdin", ".stdout", ".stderr"):
+                open(os.path.join(slot, name), "wb").close()
+            control_read, control_write = os.pipe()
+            ack_read, ack_write = os.pipe()
+            report_read, report_write = os.pipe()
+            pipes = [control_write, ack_read, report_read]
+            command = launcher_command(
+                self.launcher,
+                self.spawn_limits,
+                report_write,
+                uid,
+                [(slot, True)],
+                [
+                    *self.runtime["run"][:-1],
+                    bootstrap,
+                    str(control_read),
+                    str(ack_write),
+                ],
+            )
+            try:
+                with open(os.path.join(slot, ".stdin"), "rb") as stdin, open(
+                    os.path.join(slot, ".stdout"), "wb"
+                ) as stdout, open(os.path.join(slot, ".stderr"), "wb") as stderr:
+                    proc = subprocess.Popen(
+                        command,
+                        cwd=slot,
+                        stdin=stdin,
+                        stdout=stdout,
+                        stderr=stderr,
+                        pass_fds=(control_read, ack_write, report_write),
+                        start_new_session=True,
+                    )
+            finally:
+                for fd in (control_read, ack_write, report_write):
+                    os.close(fd)
+        except Exception:
+            for fd in pipes:
+                os.close(fd)
+            get_sandbox_uids().release(uid)
+            raise
+        return _NodeProcess(proc, slot, uid, control_write, ack_read, report_read)
+
+    def run(self, run_dir, script, limits, cpu_limit, wall_limit):
+        # rlimit CPU của process đã khởi động không đổi được -> chỉ dùng khi đủ
+        if cpu_limit > self.cpu_limit:
+            return None
+        worker = self._acquire()
+        if worker is None:
+            return None
+        self._refill(1)  # Process chỉ chạy một lần
+
+        try:
+            # Ghi vào file .stdin sẵn có (giữ nguyên inode - node đã mở sẵn file này).
+            # Slot chưa chạy code nào nên không có symlink của user
+            shutil.copyfile(
+                os.path.join(run_dir, ".stdin"), os.path.join(worker.slot, ".stdin")
+            )
+            target = os.path.join(worker.slot, "main.js")
+            _copy_into_slot(script, target)
+            os.write(worker.control, target.encode("utf-8") + b"\n")
+            os.close(worker.control)
+            worker.control = None
+            startup_cpu_ms = int(_read_line(worker.ack))
+        except (OSError, ValueError):  # Process chết trước khi chạy code của user
+            worker.close()
+            return None
+
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            stop_launcher(worker.proc.pid)
+
+        start_time = time.monotonic()
+        timer = threading.Timer(wall_limit, kill_on_timeout)
+        timer.start()
+        try:
+            _, status, usage = os.wait4(worker.proc.pid, 0)
+        finally:
+            timer.cancel()
+        wall_ms = round((time.monotonic() - start_time) * 1000)
+        worker.proc.returncode = os.waitstatus_to_exitcode(status)
+
+        cpu_ms = round((usage.ru_utime + usage.ru_stime) * 1000)
+        memory_kb = usage.ru_maxrss
+        try:
+            report = read_report(worker.report)
+        finally:
+            worker.report = None
+        if report:
+            status, cpu_ms, memory_kb = report
+        cpu_ms = max(0, cpu_ms - startup_cpu_ms)
+
+        _unload_slot(worker.slot, run_dir)
+        worker.close()
+        return status, cpu_ms, memory_kb, wall_ms, timed_out.is_set()
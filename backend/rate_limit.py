@@ -0,0 +1,343 @@
+"""
+Rate limiting / admission control cho /api/run và /api/submit.
+
+    - Token bucket theo user (hoặc theo session nếu chưa đăng nhập) và theo IP,
+      budget riêng cho từng action ("run", "submit") - RATE_LIMIT_CONFIG["budgets"]
+    - Giới hạn số lần chạy code (/api/run) đồng thời trên toàn hệ thống
+      (RATE_LIMIT_CONFIG["max_inflight_runs"])
+    - Request bị từ chối nhận 429 kèm header Retry-After (giây)
+
+Backend lưu state:
+    memory   - trong process (chỉ đúng khi chạy một process)
+    database - bảng rate_limit_buckets / rate_limit_leases trong MySQL, dùng chung
+               cho mọi worker process (migrations/007_rate_limits.sql)
+
+Lỗi của backend (mất kết nối DB...) không chặn request: limiter cho qua và log lỗi.
+"""
+
+import math
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from flask import jsonify, request, session
+from config import RATE_LIMIT_CONFIG
+from backend.database import get_db_connection
+
+# Bucket không được dùng quá khoảng thời gian này sẽ bị xóa (đã đầy token từ lâu)
+BUCKET_IDLE_SECONDS = 3600
+# Lease của một lần chạy tự hết hạn nếu process bị chết trước khi trả slot
+LEASE_SECONDS = 120
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class MemoryBackend:
+    """State trong memory của process hiện tại"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated_at)
+        self._leases = {}  # scope -> {lease_id: expires_at}
+
+    def take(self, key, capacity, rate):
+        """
+        Lấy một token từ bucket (capacity token, hồi rate token / giây).
+        Returns: 0 nếu được phép, ngược lại số giây cần chờ
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > 10000:
+                self._prune(now)
+            return (1 - tokens) / rate
+
+    def refund(self, key, capacity):
+        """Trả lại token đã lấy (request bị bucket khác từ chối)"""
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + 1), updated_at)
+
+    def _prune(self, now):
+        self._buckets = {
+            key: value
+            for key, value in self._buckets.items()
+            if now - value[1] < BUCKET_IDLE_SECONDS
+        }
+
+    def acquire_slot(self, scope, limit):
+        """Lấy một slot chạy đồng thời. Returns: lease id hoặc None nếu đã đủ limit"""
+        now = time.monotonic()
+        with self._lock:
+            leases = self._leases.setdefault(scope, {})
+            for lease_id in [k for k, expires_at in leases.items() if expires_at <= now]:
+                del leases[lease_id]
+            if len(leases) >= limit:
+                return None
+            lease_id = uuid.uuid4().hex
+            leases[lease_id] = now + LEASE_SECONDS
+            return lease_id
+
+    def release_slot(self, scope, lease_id):
+        with self._lock:
+            self._leases.get(scope, {}).pop(lease_id, None)
+
+
+class DatabaseBackend:
+    """State trong MySQL, dùng chung giữa các worker process"""
+
+    def take(self, key, capacity, rate):
+        conn = get_db_connection()
+        if not conn:
+            return 0
+
+        cursor = conn.cursor()
+        try:
+            now = time.time()
+            # Tạo bucket đầy nếu chưa có, rồi khóa row (tránh gap lock khi insert đồng thời)
+            cursor.execute(
+                "INSERT IGNORE INTO rate_limit_buckets (bucket_key, tokens, updated_at) "
+                "VALUES (%s, %s, %s)",
+                (key, capacity, now),
+            )
+            cursor.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets "
+                "WHERE bucket_key = %s FOR UPDATE",
+                (key,),
+            )
+            stored_tokens, updated_at = cursor.fetchone()
+            tokens = min(capacity, stored_tokens + max(0, now - updated_at) * rate)
+
+            retry_after = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+
+            cursor.execute(
+                "UPDATE rate_limit_buckets SET tokens = %s, updated_at = %s "
+                "WHERE bucket_key = %s",
+                (tokens, now, key),
+            )
+            if random.random() < 0.002:  # Thỉnh thoảng dọn bucket cũ
+                cursor.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated_at < %s",
+                    (now - BUCKET_IDLE_SECONDS,),
+                )
+            conn.commit()
+            return retry_after
+        except Exception as e:
+            print(f"Error updating rate limit bucket: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            cursor.close()
+            conn.close()
+
+    def refund(self, key, capacity):
+        conn = get_db_connection()
+        if not conn:
+            return
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE rate_limit_buckets SET tokens = LEAST(%s, tokens + 1) "
+                "WHERE bucket_key = %s",
+                (capacity, key),
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"Error refunding rate limit token: {e}")
+            conn.rollback()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def acquire_slot(self, scope, limit):
+        conn = get_db_connection()
+        if not conn:
+            return 0  # Không kiểm tra được - cho qua, lease id 0 không cần trả
+
+        cursor = conn.cursor()
+        try:
+            now = time.time()
+            # Khóa theo scope: row của scope trong rate_limit_buckets
+            lock_key = f"slots:{scope}"
+            cursor.execute(
+                "INSERT IGNORE INTO rate_limit_buckets (bucket_key, tokens, updated_at) "
+                "VALUES (%s, 0, %s)",
+                (lock_key, now),
+            )
+            cursor.execute(
+                "SELECT bucket_key FROM rate_limit_buckets WHERE bucket_key = %s FOR UPDATE",
+                (lock_key,),
+            )
+            cursor.fetchall()
+            cursor.execute(
+                "DELETE FROM rate_limit_leases WHERE scope = %s AND expires_at <= %s",
+                (scope, now),
+            )
+            cursor.execute(
+                "SELECT COUNT(*) FROM rate_limit_leases WHERE scope = %s", (scope,)
+            )
+            if cursor.fetchone()[0] >= limit:
+                conn.commit()
+                return None
+
+            cursor.execute(
+                "INSERT INTO rate_limit_leases (scope, expires_at) VALUES (%s, %s)",
+                (scope, now + LEASE_SECONDS),
+            )
+            lease_id = cursor.lastrowid
+            # Giữ row khóa không bị dọn như bucket cũ
+            cursor.execute(
+                "UPDATE rate_limit_buckets SET updated_at = %s WHERE bucket_key = %s",
+                (now, lock_key),
+            )
+            conn.commit()
+            return lease_id
+        except Exception as e:
+            print(f"Error acquiring execution slot: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            cursor.close()
+            conn.close()
+
+    def release_slot(self, scope, lease_id):
+        if not lease_id:
+            return
+        conn = get_db_connection()
+        if not conn:
+            return
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "DELETE FROM rate_limit_leases WHERE lease_id = %s", (lease_id,)
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"Error releasing execution slot: {e}")
+            conn.rollback()
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def get_rate_limit_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if RATE_LIMIT_CONFIG["backend"] == "database":
+                    _backend = DatabaseBackend()
+                else:
+                    _backend = MemoryBackend()
+    return _backend
+
+
+def _client_keys(action):
+    """[(bucket key, capacity, rate)] áp dụng cho request hiện tại"""
+    budgets = RATE_LIMIT_CONFIG["budgets"][action]
+    user_id = session.get("user_id")
+    if user_id:
+        identity = f"user:{user_id}"
+    else:
+        # Chưa đăng nhập: bucket theo session (cookie), IP bucket vẫn được áp dụng
+        if "rate_limit_id" not in session:
+            session["rate_limit_id"] = uuid.uuid4().hex
+        identity = f"session:{session['rate_limit_id']}"
+
+    keys = []
+    for scope, client in (("ip", request.remote_addr or "unknown"), ("user", identity)):
+        burst, per_minute = budgets[scope]
+        if burst > 0 and per_minute > 0:
+            keys.append((f"{action}:{scope}:{client}", burst, per_minute / 60.0))
+    return keys
+
+
+def check_rate_limit(action):
+    """
+    Lấy token từ mọi bucket của request hiện tại.
+    Returns: 0 nếu được phép, ngược lại số giây cần chờ
+    """
+    backend = get_rate_limit_backend()
+    taken = []
+    for key, capacity, rate in _client_keys(action):
+        retry_after = backend.take(key, capacity, rate)
+        if retry_after > 0:
+            for taken_key, taken_capacity in taken:
+                backend.refund(taken_key, taken_capacity)
+            return retry_after
+        taken.append((key, capacity))
+    return 0
+
+
+def too_many_requests(retry_after, message=None):
+    """Response 429 + Retry-After (giây, làm tròn lên)"""
+    seconds = max(1, math.ceil(retry_after))
+    message = message or f"Bạn thao tác quá nhanh, vui lòng thử lại sau {seconds} giây"
+    response = jsonify({"status": "error", "final_status": "Error", "message": message})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(seconds)
+    return response
+
+
+def rate_limited(action):
+    """Decorator cho route: áp dụng token bucket của action ("run" / "submit")"""
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if RATE_LIMIT_CONFIG["enabled"]:
+                retry_after = check_rate_limit(action)
+                if retry_after > 0:
+                    return too_many_requests(retry_after)
+            return f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
+
+
+def acquire_execution_slot(scope, limit):
+    """
+    Lấy một slot chạy code (dùng khi slot phải giữ đến sau khi route trả về, VD
+    response streaming).
+    Returns: hàm trả slot, None nếu hệ thống đã đủ số lần chạy đồng thời
+    """
+    if not RATE_LIMIT_CONFIG["enabled"] or limit <= 0:
+        return lambda: None
+
+    backend = get_rate_limit_backend()
+    lease_id = backend.acquire_slot(scope, limit)
+    if lease_id is None:
+        return None
+    return lambda: backend.release_slot(scope, lease_id)
+
+
+@contextmanager
+def execution_slot(scope, limit):
+    """
+    Giữ một slot chạy code trong khi thực thi block.
+    Yields: True nếu lấy được slot, False nếu hệ thống đã đủ số lần chạy đồng thời
+    """
+    release = acquire_execution_slot(scope, limit)
+    if release is None:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        release()
@@ -1,16 +1,104 @@
-from flask import Blueprint, request, jsonify, session
-from backend.utils import run_code_external, wrap_user_code
+import json
+import queue
+import threading
+from flask import Blueprint, Response, request, jsonify, session
+from backend.utils import wrap_user_code, admin_required
+from backend.executors.single_flight import get_single_flight
+from backend.checker import checker_from_problem
 from backend.services.testcase_service import get_public_test_cases, get_all_test_cases
-from backend.services.submission_service import save_submission_to_db
+from backend.services.testpack_cache import get_testpack_cache
+from backend.services.submission_service import (
+    save_submission_to_db,
+    update_submission_status,
+)
 from backend.services.problem_service import get_problem_by_id
+from backend.services.judge_service import judge_run
+from backend.services.judge_scheduler import (
+    get_scheduler,
+    PRIORITY_RUN,
+    PRIORITY_SUBMIT,
+    PRIORITY_REJUDGE,
+)
+from backend.services.judge_queue import (
+    JudgeJob,
+    enqueue_submission,
+    queue_length,
+    test_case_results_to_save,
+    PENDING,
+    WORKER_ID,
+)
+from backend.services.verdict_cache import get_verdict_cache, make_verdict_key
 from backend.validators import validate_code_submission
+from backend.database import close_db_connection
+from backend.rate_limit import (
+    rate_limited,
+    execution_slot,
+    acquire_execution_slot,
+    too_many_requests,
+)
+from config import RATE_LIMIT_CONFIG
 
 judge_bp = Blueprint("judge", __name__)
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def _stream_run(code, language, test_cases, checker, owner, release_slot):
+    """
+    Run Code dạng NDJSON: mỗi dòng là một JSON object
+        {"type": "case", ...result_item} - ngay khi test case chạy xong
+        {"type": "verdict", "final_status": ...} - dòng cuối
+    Code được chấm trên một thread riêng, slot chạy code được trả khi chấm xong
+    (kể cả khi client ngắt kết nối giữa chừng).
+    """
+    events = queue.Queue()
+
+    def run():
+        try:
+            final_status, _ = judge_run(
+                code,
+                language,
+                test_cases,
+                checker=checker,
+                on_case=lambda item: events.put({"type": "case", **item}),
+                owner=owner,
+            )
+            events.put({"type": "verdict", "final_status": final_status})
+        except Exception as e:
+            print(f"Error streaming run: {e}")
+            events.put(
+                {
+                    "type": "verdict",
+                    "final_status": "System Error",
+                    "message": "Lỗi hệ thống khi chạy code",
+                }
+            )
+        finally:
+            release_slot()
+
+    threading.Thread(target=run, name="run-stream", daemon=True).start()
+
+    def generate():
+        while True:
+            event = events.get()
+            yield json.dumps(event) + "\n"
+            if event["type"] == "verdict":
+                return
+
+    response = Response(generate(), mimetype=NDJSON_MIMETYPE)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Không buffer qua nginx
+    return response
+
 
 @judge_bp.route("/api/run", methods=["POST"])
+@rate_limited("run")
 def run_code():
-    """Run code against public test cases (for testing)"""
+    """
+    Run code against public test cases (for testing).
+    Header "Accept: application/x-ndjson" -> kết quả từng test case được stream
+    ngay khi chạy xong (xem _stream_run), ngược lại trả một JSON sau khi chạy hết.
+    """
     data = request.json
     code = data.get("code")
     problem_id = data.get("problem_id")
@@ -44,55 +132,46 @@ def run_code():
         code = wrap_user_code(code, wrapper_template, language)
 
     # Get test cases
-    test_cases = get_public_test_cases(problem_id)
+    test_cases = get_public_test_cases(problem_id, problem.get("pack_version"))
 
     if not test_cases:
         return jsonify(
             {"final_status": "Error", "message": "Chưa có test case nào cho bài này."}
         )
 
-    results = []
-    final_status = "Accepted"
-
-    for i, case in enumerate(test_cases):
-        # Run code using Piston API
-        res = run_code_external(code, language, case["input"])
-
-        result_item = {"case": i + 1, "status": "Passed"}
-
-        # Chuẩn hóa output để so sánh (xóa khoảng trắng thừa và đồng bộ xuống dòng)
-        actual_output = res.get("output", "").replace("\r\n", "\n").strip()
-        expected_output = case["expected_output"].replace("\r\n", "\n").strip()
-
-        # 1. Nếu code bị lỗi (Compile Error, Runtime Error, hoặc Timeout)
-        if not res["success"]:
-            # Lấy status từ utils trả về (VD: Runtime Error, Time Limit Exceeded)
-            status = res.get("status_label", "Runtime Error")
-
-            result_item["status"] = status
-            result_item["error"] = res["error"]
-            result_item["input"] = case["input"]
-            result_item["expected"] = expected_output
-            result_item["actual"] = actual_output if actual_output else "N/A"
-            final_status = status
-
-        # 2. Nếu code chạy xong nhưng ra kết quả sai
-        elif actual_output != expected_output:
-            status = "Wrong Answer"
-            result_item["status"] = status
-            result_item["input"] = case["input"]
-            result_item["expected"] = expected_output
-            result_item["actual"] = actual_output
-            final_status = status
-
-        results.append(result_item)
+    checker = checker_from_problem(problem)
+    # Đã đọc xong DB - trả connection về pool trước khi chấm (có thể mất vài giây)
+    close_db_connection()
+    # Judge scheduler chia lượt Run giữa các user (chưa đăng nhập: theo IP)
+    owner = session.get("user_id") or request.remote_addr
+    if NDJSON_MIMETYPE in request.headers.get("Accept", ""):
+        release_slot = acquire_execution_slot(
+            "run", RATE_LIMIT_CONFIG["max_inflight_runs"]
+        )
+        if release_slot is None:
+            return too_many_requests(
+                1, "Hệ thống đang chạy quá nhiều code, vui lòng thử lại sau"
+            )
+        return _stream_run(code, language, test_cases, checker, owner, release_slot)
+
+    # Chạy song song các test case trên judge worker pool, giới hạn số lần chạy
+    # đồng thời trên toàn hệ thống
+    with execution_slot("run", RATE_LIMIT_CONFIG["max_inflight_runs"]) as admitted:
+        if not admitted:
+            return too_many_requests(
+                1, "Hệ thống đang chạy quá nhiều code, vui lòng thử lại sau"
+            )
+        final_status, results = judge_run(
+            code, language, test_cases, checker=checker, owner=owner
+        )
 
     return jsonify({"final_status": final_status, "results": results})
 
 
 @judge_bp.route("/api/submit", methods=["POST"])
+@rate_limited("submit")
 def submit_code():
-    """Submit code for official judging and save to database"""
+    """Submit code for official judging - trả về submission_id ngay, chấm bất đồng bộ"""
     user_id = session.get("user_id")
 
     if not user_id:
@@ -135,12 +214,8 @@ def submit_code():
     if wrapper_template:
         executable_code = wrap_user_code(code, wrapper_template, language)
 
-    # Thêm buffer cho network latency (Piston API round-trip time)
-    # Actual check = time_limit + 2000ms buffer
-    actual_time_limit = time_limit_ms + 2000  # Thêm 2s cho network
-
     # Get all test cases
-    test_cases = get_all_test_cases(problem_id)
+    test_cases = get_all_test_cases(problem_id, problem.get("pack_version"))
 
     if not test_cases:
         return (
@@ -150,127 +225,60 @@ def submit_code():
             404,
         )
 
-    final_status = "Accepted"
-    failed_case_index = 0
-    failed_case_detail = None  # Lưu chi tiết test case fail đầu tiên
-    test_cases_passed = 0
-    total_test_cases = len(test_cases)
-
-    # Track execution time and memory (max value from all test cases)
-    max_execution_time = 0
-    max_code_execution_time = 0  # Thời gian code thực tế (đã trừ network)
-    max_memory_used = 0
-
-    for i, case in enumerate(test_cases):
-        # Run code using Piston API (use wrapped/executable code)
-        res = run_code_external(executable_code, language, case["input"])
-
-        actual_output = res.get("output", "").replace("\r\n", "\n").strip()
-        expected_output = case["expected_output"].replace("\r\n", "\n").strip()
-
-        # Track execution time (total time - dùng cho TLE check)
-        exec_time = res.get("execution_time")
-        if exec_time is not None:
-            max_execution_time = max(max_execution_time, exec_time)
-
-        # Track code execution time (đã trừ network - dùng cho display)
-        code_exec_time = res.get("code_execution_time")
-        if code_exec_time is not None:
-            max_code_execution_time = max(max_code_execution_time, code_exec_time)
-
-        memory = res.get("memory_used")
-        if memory is not None:
-            max_memory_used = max(max_memory_used, memory)
-
-        # Case lỗi Runtime/Compile - Break ngay vì code không chạy được
-        # NHƯNG nếu là timeout thì KHÔNG break, xử lý như TLE bên dưới
-        if not res["success"] and not res.get("is_timeout", False):
-            final_status = res.get("status_label", "Runtime Error")
-            if failed_case_index == 0:  # Lưu test case đầu tiên fail
-                failed_case_index = i + 1
-                failed_case_detail = {
-                    "input": case["input"],
-                    "expected_output": expected_output,
-                    "actual_output": actual_output if actual_output else "N/A",
-                    "error": res.get("error", "Unknown error"),
-                }
-            break  # Break vì code lỗi, không thể chạy tiếp
-
-        # Nếu là timeout, xử lý như TLE (không break, set status và tiếp tục)
-        if res.get("is_timeout", False):
-            if final_status == "Accepted":
-                final_status = "Time Limit Exceeded"
-            if failed_case_index == 0:
-                failed_case_index = i + 1
-                failed_case_detail = {
-                    "input": case["input"],
-                    "error": res.get("error", "Time Limit Exceeded"),
-                }
-            # Không break - tiếp tục chạy test case khác
-            continue
-
-        # Check Time Limit Exceeded (dùng code_execution_time thay vì total time)
-        # code_execution_time đã trừ network latency, chính xác hơn
-        if code_exec_time and code_exec_time > time_limit_ms:
-            if final_status == "Accepted":  # Chỉ đổi status nếu chưa có lỗi khác
-                final_status = "Time Limit Exceeded"
-            if failed_case_index == 0:
-                failed_case_index = i + 1
-                failed_case_detail = {
-                    "input": case["input"],
-                    "time_used": code_exec_time,
-                    "time_limit": time_limit_ms,
-                }
-            # Không break - tiếp tục chạy các test case khác
-
-        # Check Memory Limit Exceeded (convert MB to KB for comparison)
-        elif memory and memory > (memory_limit_mb * 1024):
-            if final_status == "Accepted":
-                final_status = "Memory Limit Exceeded"
-            if failed_case_index == 0:
-                failed_case_index = i + 1
-                failed_case_detail = {
-                    "input": case["input"],
-                    "memory_used": memory / 1024,  # Convert to MB
-                    "memory_limit": memory_limit_mb,
-                }
-            # Không break - tiếp tục chạy các test case khác
-
-        # Case sai kết quả
-        elif actual_output != expected_output:
-            if final_status == "Accepted":
-                final_status = "Wrong Answer"
-            if failed_case_index == 0:
-                failed_case_index = i + 1
-                failed_case_detail = {
-                    "input": case["input"],
-                    "expected_output": expected_output,
-                    "actual_output": actual_output,
+    # Code giống hệt đã được chấm với cùng test pack -> trả verdict cũ ngay,
+    # vẫn lưu một submission mới
+    cache_key = make_verdict_key(
+        problem_id, language, code, problem.get("pack_version")
+    )
+    cached = get_verdict_cache().get(cache_key, test_cases)
+    if cached:
+        save_success, submission_id = save_submission_to_db(
+            user_id=user_id,
+            problem_id=problem_id,
+            code=code,
+            language=language,
+            status=cached["final_status"],
+            test_cases_passed=cached["test_cases_passed"],
+            total_test_cases=cached["total_test_cases"],
+            execution_time=cached["execution_time"],
+            memory_used=cached["memory_used"],
+            test_case_results=test_case_results_to_save(
+                cached["final_status"], cached["failed_case_detail"]
+            ),
+            case_results=cached["case_results"],
+        )
+        if not save_success:
+            return (
+                jsonify({"status": "error", "message": "Lỗi khi lưu kết quả vào DB"}),
+                500,
+            )
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "submission_id": submission_id,
+                    "done": True,
+                    "cached": True,
+                    **{
+                        field: value
+                        for field, value in cached.items()
+                        if field not in ("case_results", "failed_case_index")
+                    },
                 }
-            # Không break - tiếp tục chạy các test case khác để đếm số test pass
-        else:
-            # Case đúng - tăng số test pass
-            test_cases_passed += 1
-
-    # Save to database (lưu total execution time)
-    # Lưu chỉ failed test case đầu tiên (dạng array 1 item)
-    test_case_results_to_save = None
-    if final_status == "Wrong Answer" and failed_case_detail:
-        test_case_results_to_save = [failed_case_detail]
+            ),
+            200,
+        )
 
+    # Tạo submission "Pending" ngay, việc chấm do judge queue worker xử lý
     save_success, submission_id = save_submission_to_db(
         user_id=user_id,
         problem_id=problem_id,
         code=code,
         language=language,
-        status=final_status,
-        test_cases_passed=test_cases_passed,
-        total_test_cases=total_test_cases,
-        execution_time=(
-            max_code_execution_time if max_code_execution_time > 0 else None
-        ),  # Lưu code time
-        memory_used=max_memory_used if max_memory_used > 0 else None,
-        test_case_results=test_case_results_to_save,
+        status=PENDING,
+        test_cases_passed=0,
+        total_test_cases=len(test_cases),
+        judge_worker=WORKER_ID,
     )
     if not save_success:
         return (
@@ -278,17 +286,61 @@ def submit_code():
             500,
         )
 
+    job = JudgeJob(
+        submission_id=submission_id,
+        user_id=user_id,
+        code=executable_code,
+        language=language,
+        test_cases=test_cases,
+        time_limit_ms=time_limit_ms,
+        memory_limit_mb=memory_limit_mb,
+        judge_mode=problem.get("judge_mode"),
+        cache_key=cache_key,
+        checker=checker_from_problem(problem),
+    )
+    if not enqueue_submission(job):
+        update_submission_status(submission_id, "System Error")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": "Hệ thống chấm đang quá tải, vui lòng thử lại sau",
+                }
+            ),
+            503,
+        )
+
+    return (
+        jsonify(
+            {
+                "status": "success",
+                "final_status": PENDING,
+                "submission_id": submission_id,
+                "total_test_cases": len(test_cases),
+            }
+        ),
+        202,
+    )
+
+
+@judge_bp.route("/api/judge/stats")
+@admin_required
+def judge_stats():
+    """Số liệu của judge: single-flight (hit rate), scheduler, judge queue, test pack cache (admin)"""
+    scheduler_stats = get_scheduler().stats()
     return jsonify(
         {
             "status": "success",
-            "final_status": final_status,
-            "failed_case_detail": failed_case_detail,  # Chi tiết case fail
-            "test_cases_passed": test_cases_passed,
-            "total_test_cases": total_test_cases,
-            "execution_time": (
-                max_code_execution_time if max_code_execution_time > 0 else None
-            ),  # Trả về code time
-            "memory_used": max_memory_used if max_memory_used > 0 else None,
-            "submission_id": submission_id,
+            "single_flight": get_single_flight().stats(),
+            "scheduler": {
+                name: scheduler_stats[priority]
+                for name, priority in (
+                    ("run", PRIORITY_RUN),
+                    ("submit", PRIORITY_SUBMIT),
+                    ("rejudge", PRIORITY_REJUDGE),
+                )
+            },
+            "queued_submissions": queue_length(),
+            "testpack_cache": get_testpack_cache().stats(),
         }
     )
@@ -19,10 +19,14 @@ from backend.services.problem_service import (
 from backend.services.tag_service import get_all_tags, get_tag_names, get_problem_tags
 from backend.services.testcase_service import (
     get_public_test_cases,
+    get_all_test_cases,
     save_test_cases,
     get_all_test_cases_with_flags,
 )
+from backend.services.judge_service import verify_special_judge
 from backend.validators import validate_problem_input
+from backend.checker import checker_from_problem
+from backend.constants import CHECKER_SPECIAL
 import json
 
 problem_bp = Blueprint("problem", __name__)
@@ -31,6 +35,16 @@ problem_bp = Blueprint("problem", __name__)
 PER_PAGE = 7
 
 
+def _verify_checker(normalized, test_cases):
+    """Special judge: chạy thử checker program với test case đầu tiên, trả về lỗi (nếu có)"""
+    if normalized.get("checker_mode") != CHECKER_SPECIAL or not test_cases:
+        return None
+    is_valid, error = verify_special_judge(
+        checker_from_problem(normalized), test_cases[0]
+    )
+    return None if is_valid else error
+
+
 @problem_bp.route("/problems")
 def list_problems():
     # Get filter params
@@ -102,6 +116,11 @@ def create():
         starter_code = request.form.get("starter_code") or None
         wrapper_template = request.form.get("wrapper_template") or None
         function_name = request.form.get("function_name") or None
+        judge_mode = request.form.get("judge_mode") or None
+        checker_mode = request.form.get("checker_mode") or None
+        checker_epsilon = request.form.get("checker_epsilon") or None
+        checker_code = request.form.get("checker_code") or None
+        checker_language = request.form.get("checker_language") or None
 
         # Check if it's an AJAX request
         is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
@@ -121,7 +140,18 @@ def create():
 
         # Validate input
         is_valid, errors, normalized = validate_problem_input(
-            title, slug, description, difficulty, test_cases, time_limit, memory_limit
+            title,
+            slug,
+            description,
+            difficulty,
+            test_cases,
+            time_limit,
+            memory_limit,
+            judge_mode,
+            checker_mode,
+            checker_epsilon,
+            checker_code,
+            checker_language,
         )
 
         if not is_valid:
@@ -129,6 +159,10 @@ def create():
             error_messages = "\n".join([f"• {msg}" for msg in errors.values()])
             return jsonify({"success": False, "message": error_messages}), 400
 
+        checker_error = _verify_checker(normalized, test_cases)
+        if checker_error:
+            return jsonify({"success": False, "message": checker_error}), 400
+
         # Use normalized values
         success, result = create_problem(
             normalized["title"],
@@ -141,6 +175,11 @@ def create():
             starter_code,
             wrapper_template,
             function_name,
+            normalized.get("judge_mode"),
+            normalized.get("checker_mode"),
+            normalized.get("checker_epsilon"),
+            normalized.get("checker_code"),
+            normalized.get("checker_language"),
         )
 
         if success:
@@ -149,9 +188,21 @@ def create():
             # Handle test cases if provided
             if test_cases:
                 try:
-                    save_test_cases(problem_id, test_cases)
+                    saved = save_test_cases(problem_id, test_cases)
                 except Exception as e:
                     print(f"Error saving test cases: {e}")
+                    saved = False
+                if saved is False:
+                    return (
+                        jsonify(
+                            {
+                                "success": False,
+                                "message": "Problem created but failed to save test cases",
+                                "problem_id": problem_id,
+                            }
+                        ),
+                        500,
+                    )
 
             return (
                 jsonify(
@@ -188,6 +239,11 @@ def edit(id):
         starter_code = request.form.get("starter_code") or None
         wrapper_template = request.form.get("wrapper_template") or None
         function_name = request.form.get("function_name") or None
+        judge_mode = request.form.get("judge_mode") or None
+        checker_mode = request.form.get("checker_mode") or None
+        checker_epsilon = request.form.get("checker_epsilon") or None
+        checker_code = request.form.get("checker_code") or None
+        checker_language = request.form.get("checker_language") or None
 
         # Check if it's an AJAX request
         is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
@@ -207,7 +263,18 @@ def edit(id):
 
         # Validate input
         is_valid, errors, normalized = validate_problem_input(
-            title, slug, description, difficulty, test_cases, time_limit, memory_limit
+            title,
+            slug,
+            description,
+            difficulty,
+            test_cases,
+            time_limit,
+            memory_limit,
+            judge_mode,
+            checker_mode,
+            checker_epsilon,
+            checker_code,
+            checker_language,
         )
 
         if not is_valid:
@@ -215,6 +282,12 @@ def edit(id):
             error_messages = "\n".join([f"• {msg}" for msg in errors.values()])
             return jsonify({"success": False, "message": error_messages}), 400
 
+        checker_error = _verify_checker(
+            normalized, test_cases or get_all_test_cases(id)
+        )
+        if checker_error:
+            return jsonify({"success": False, "message": checker_error}), 400
+
         # Use normalized values
         success = update_problem(
             id,
@@ -228,18 +301,42 @@ def edit(id):
             starter_code,
             wrapper_template,
             function_name,
+            normalized.get("judge_mode"),
+            normalized.get("checker_mode"),
+            normalized.get("checker_epsilon"),
+            normalized.get("checker_code"),
+            normalized.get("checker_language"),
         )
 
         if success:
             # Handle test cases if provided
+            test_case_changes = None
             if test_cases:
                 try:
-                    save_test_cases(id, test_cases)
+                    # Index test case thêm / sửa và id test case bị xóa
+                    test_case_changes = save_test_cases(id, test_cases)
                 except Exception as e:
                     print(f"Error saving test cases: {e}")
+                    test_case_changes = False
+                if test_case_changes is False:
+                    return (
+                        jsonify(
+                            {
+                                "success": False,
+                                "message": "Problem updated but failed to save test cases",
+                            }
+                        ),
+                        500,
+                    )
 
             return (
-                jsonify({"success": True, "message": "Problem updated successfully!"}),
+                jsonify(
+                    {
+                        "success": True,
+                        "message": "Problem updated successfully!",
+                        "test_case_changes": test_case_changes,
+                    }
+                ),
                 200,
             )
         else:
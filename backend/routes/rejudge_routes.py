@@ -0,0 +1,71 @@
+from flask import Blueprint, jsonify, request, session
+from backend.services.rejudge_service import (
+    create_rejudge_job,
+    get_rejudge_job,
+    get_problem_rejudge_jobs,
+    cancel_rejudge_job,
+)
+from backend.services.problem_service import get_problem_by_id
+from backend.utils import admin_required
+
+rejudge_bp = Blueprint("rejudge", __name__)
+
+
+@rejudge_bp.route("/api/problems/<int:problem_id>/rejudge", methods=["POST"])
+@admin_required
+def start_rejudge(problem_id):
+    """
+    Tạo rejudge job cho problem (chấm lại với test case / limit hiện tại).
+
+    Body (tùy chọn): {"statuses": [...], "language": "...", "submission_ids": [...]}
+    """
+    if not get_problem_by_id(problem_id):
+        return jsonify({"status": "error", "message": "Problem not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    filters = {}
+    if data.get("statuses"):
+        filters["statuses"] = [str(s) for s in data["statuses"]]
+    if data.get("language"):
+        filters["language"] = str(data["language"])
+    if data.get("submission_ids"):
+        try:
+            filters["submission_ids"] = [int(s) for s in data["submission_ids"]]
+        except (TypeError, ValueError):
+            return (
+                jsonify({"status": "error", "message": "Invalid submission_ids"}),
+                400,
+            )
+
+    job_id = create_rejudge_job(problem_id, session.get("user_id"), filters)
+    if job_id is None:
+        return jsonify({"status": "error", "message": "Cannot create rejudge job"}), 500
+    return jsonify({"status": "success", "job_id": job_id}), 202
+
+
+@rejudge_bp.route("/api/problems/<int:problem_id>/rejudge", methods=["GET"])
+@admin_required
+def list_rejudge_jobs(problem_id):
+    """Các rejudge job gần nhất của problem"""
+    return jsonify({"status": "success", "jobs": get_problem_rejudge_jobs(problem_id)})
+
+
+@rejudge_bp.route("/api/rejudge/<int:job_id>")
+@admin_required
+def rejudge_status(job_id):
+    """Tiến độ rejudge job: processed / total, percent, eta_seconds"""
+    job = get_rejudge_job(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Rejudge job not found"}), 404
+    return jsonify({"status": "success", "job": job})
+
+
+@rejudge_bp.route("/api/rejudge/<int:job_id>/cancel", methods=["POST"])
+@admin_required
+def cancel_rejudge(job_id):
+    if not cancel_rejudge_job(job_id):
+        return (
+            jsonify({"status": "error", "message": "Job not found or already finished"}),
+            409,
+        )
+    return jsonify({"status": "success"})
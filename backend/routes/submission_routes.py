@@ -1,13 +1,37 @@
-from flask import Blueprint, redirect, render_template, session, url_for, request
+from flask import (
+    Blueprint,
+    Response,
+    redirect,
+    render_template,
+    session,
+    url_for,
+    request,
+    jsonify,
+    stream_with_context,
+)
 from backend.services.submission_service import (
     get_user_submissions,
     get_submission_detail,
+    get_submission_status,
+    get_submission_case_results,
+    get_problem_case_stats,
 )
+from backend.services.judge_queue import get_job, get_job_status, PENDING, JUDGING
+from backend.constants import SUPER_ADMIN_USER_ID
+from backend.database import close_db_connection
 from backend.services.testcase_service import get_all_test_cases
+from backend.utils import admin_required
+import json
 import math
+import time
 
 submission_bp = Blueprint("submission", __name__)
 
+# Server-Sent Events: gửi comment giữ kết nối sau mỗi khoảng này (giây) khi chưa có
+# kết quả mới, và khoảng đọc lại DB khi submission do process khác chấm
+SSE_HEARTBEAT_SECONDS = 15
+SSE_DB_POLL_SECONDS = 1
+
 
 @submission_bp.route("/submissions")
 def list_submissions():
@@ -65,7 +89,162 @@ def view_submission(submission_id):
     from backend.services.testcase_service import get_sample_test_cases
 
     sample_cases = get_sample_test_cases(submission["problem_id"])
+    case_results = get_submission_case_results(submission_id) or []
 
     return render_template(
-        "submission_result.html", submission=submission, test_cases=sample_cases
+        "submission_result.html",
+        submission=submission,
+        test_cases=sample_cases,
+        case_results=case_results,
+    )
+
+
+@submission_bp.route("/api/submission/<int:submission_id>/status")
+def submission_status(submission_id):
+    """Trạng thái chấm của submission (client polling sau /api/submit)"""
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"status": "error", "message": "User not authenticated"}), 401
+
+    # Job đang chấm / vừa chấm xong trong process này -> có tiến độ và chi tiết
+    job_status = get_job_status(submission_id)
+    if job_status:
+        if job_status["user_id"] != user_id and user_id != SUPER_ADMIN_USER_ID:
+            return jsonify({"status": "error", "message": "Submission not found"}), 404
+        job_status.pop("user_id")
+        return jsonify({"status": "success", **job_status})
+
+    # Fallback: đọc từ DB (job do process khác chấm, hoặc đã hết result_ttl)
+    submission = get_submission_status(submission_id)
+    if not submission or (
+        submission["user_id"] != user_id and user_id != SUPER_ADMIN_USER_ID
+    ):
+        return jsonify({"status": "error", "message": "Submission not found"}), 404
+
+    return jsonify({"status": "success", **_status_from_db(submission)})
+
+
+def _status_from_db(submission):
+    """Trạng thái chấm dạng API từ row submissions (get_submission_status)"""
+    test_case_results = submission.get("test_case_results")
+    return {
+        "submission_id": submission["submission_id"],
+        "final_status": submission["status"],
+        "done": submission["status"] not in (PENDING, JUDGING),
+        "failed_case_detail": test_case_results[0] if test_case_results else None,
+        "test_cases_passed": submission["test_cases_passed"],
+        "total_test_cases": submission["total_test_cases"],
+        "execution_time": submission["execution_time"],
+        "memory_used": submission["memory_used"],
+    }
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _job_events(job):
+    """Case events từ JudgeJob trong memory cho đến verdict"""
+    offset = 0
+    while True:
+        events, result = job.wait_for_events(offset, SSE_HEARTBEAT_SECONDS)
+        for event in events:
+            yield _sse("case", event)
+        offset += len(events)
+        if result:
+            result.pop("user_id", None)
+            yield _sse("verdict", result)
+            return
+        if not events:
+            yield ": heartbeat\n\n"
+
+
+def _db_events(submission_id):
+    """
+    Submission không có trong memory của process này: chờ verdict trong DB,
+    sau đó gửi kết quả từng test case đã lưu và verdict.
+    Mỗi lần đọc dùng connection mới từ pool và trả lại ngay: không giữ connection
+    khi chờ, và không đọc lại snapshot cũ (REPEATABLE READ) của cùng transaction
+    """
+    waited = 0
+    while True:
+        submission = get_submission_status(submission_id)
+        close_db_connection()
+        if not submission:
+            yield _sse("status", {"status": "error", "message": "Submission not found"})
+            return
+        if submission["status"] not in (PENDING, JUDGING):
+            break
+        time.sleep(SSE_DB_POLL_SECONDS)
+        waited += SSE_DB_POLL_SECONDS
+        if waited % SSE_HEARTBEAT_SECONDS == 0:
+            yield ": heartbeat\n\n"
+
+    for event in get_submission_case_results(submission_id) or []:
+        yield _sse("case", event)
+    yield _sse("verdict", _status_from_db(submission))
+
+
+@submission_bp.route("/api/submission/<int:submission_id>/events")
+def submission_events(submission_id):
+    """
+    Tiến độ chấm dạng Server-Sent Events (thay cho polling /status):
+        event: case    - {case, status, time, memory} ngay khi test case chấm xong
+        event: verdict - giống response của /status khi done, rồi đóng stream
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"status": "error", "message": "User not authenticated"}), 401
+
+    job = get_job(submission_id)
+    owner_id = job.user_id if job else None
+    if not job:
+        submission = get_submission_status(submission_id)
+        owner_id = submission["user_id"] if submission else None
+    if owner_id is None or (owner_id != user_id and user_id != SUPER_ADMIN_USER_ID):
+        return jsonify({"status": "error", "message": "Submission not found"}), 404
+
+    # Stream có thể kéo dài cả phút: trả connection của request về pool trước
+    close_db_connection()
+    events = _job_events(job) if job else _db_events(submission_id)
+    response = Response(stream_with_context(events), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Không buffer qua nginx
+    return response
+
+
+@submission_bp.route("/api/submission/<int:submission_id>/cases")
+def submission_case_results(submission_id):
+    """Verdict / time / memory của từng test case (không kèm input / output)"""
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"status": "error", "message": "User not authenticated"}), 401
+
+    submission = get_submission_status(submission_id)
+    if not submission or (
+        submission["user_id"] != user_id and user_id != SUPER_ADMIN_USER_ID
+    ):
+        return jsonify({"status": "error", "message": "Submission not found"}), 404
+
+    case_results = get_submission_case_results(submission_id)
+    if case_results is None:
+        return jsonify({"status": "error", "message": "Database error"}), 500
+
+    return jsonify(
+        {
+            "status": "success",
+            "submission_id": submission_id,
+            "final_status": submission["status"],
+            "cases": case_results,
+        }
     )
+
+
+@submission_bp.route("/api/problems/<int:problem_id>/case-stats")
+@admin_required
+def problem_case_stats(problem_id):
+    """Thống kê pass / fail theo từng test case của problem (admin)"""
+    stats = get_problem_case_stats(problem_id)
+    if stats is None:
+        return jsonify({"status": "error", "message": "Database error"}), 500
+    return jsonify({"status": "success", "problem_id": problem_id, "cases": stats})
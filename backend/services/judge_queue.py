@@ -0,0 +1,300 @@
+"""
+Judge queue - chấm submission bất đồng bộ.
+
+/api/submit chỉ tạo submission "Pending", đưa job vào queue và trả về ngay
+submission_id. Một nhóm judge worker (background thread) lấy job từ queue, chấm
+bằng judge_service và lưu kết quả vào DB. Queue chia lượt giữa các user
+(BlockingFairQueue): user submit liên tục không làm các user khác phải chờ hết
+submission của mình. Client theo dõi tiến độ qua
+/api/submission/<id>/status (polling) hoặc /api/submission/<id>/events
+(Server-Sent Events: kết quả từng test case ngay khi chạy xong, rồi verdict).
+
+Queue chỉ nằm trong memory: mỗi submission ghi id của process giữ nó
+(judge_worker) và process cập nhật heartbeat định kỳ cho submission còn đang
+chờ / đang chấm. Submission Pending / Judging mà process giữ nó không cập nhật
+quá JUDGE_STALE_AFTER giây (process đã dừng) được đánh dấu System Error
+(recovery thread, chạy khi khởi động và định kỳ) để client không chờ mãi -
+admin có thể rejudge. Submission do process khác đang chấm không bị đụng tới.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from backend.services.judge_service import judge_submission
+from backend.services.judge_scheduler import BlockingFairQueue
+from backend.services.submission_service import (
+    fail_stale_submissions,
+    heartbeat_submissions,
+    update_submission_status,
+    update_submission_result,
+)
+from backend.services.verdict_cache import get_verdict_cache
+from config import JUDGE_CONFIG
+
+PENDING = "Pending"
+JUDGING = "Judging"
+
+# Id của process này (submissions.judge_worker của submission process giữ)
+WORKER_ID = uuid.uuid4().hex
+
+_queue = BlockingFairQueue(maxsize=JUDGE_CONFIG["queue_size"])
+_jobs = {}  # submission_id -> JudgeJob (đang chấm hoặc vừa chấm xong)
+_jobs_lock = threading.Lock()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+class JudgeJob:
+    """Một submission đang chờ / đang chấm"""
+
+    def __init__(
+        self,
+        submission_id,
+        user_id,
+        code,
+        language,
+        test_cases,
+        time_limit_ms,
+        memory_limit_mb,
+        judge_mode=None,
+        cache_key=None,
+        checker=None,
+    ):
+        self.submission_id = submission_id
+        self.user_id = user_id
+        self.code = code  # Code đã wrap (executable)
+        self.language = language
+        self.test_cases = test_cases
+        self.time_limit_ms = time_limit_ms
+        self.memory_limit_mb = memory_limit_mb
+        self.judge_mode = judge_mode  # problems.judge_mode (None = mặc định)
+        self.cache_key = cache_key  # Key của verdict cache (None = không cache)
+        self.checker = checker  # Cấu hình so sánh output (checker_from_problem)
+
+        self.status = PENDING
+        self.completed = 0
+        self.total = len(test_cases)
+        self.result = None
+        self.finished_at = None
+        self.case_events = []  # Kết quả từng test case theo thứ tự hoàn thành
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+
+    def add_progress(self, count):
+        with self._lock:
+            self.completed += count
+
+    def add_case_result(self, index, status, result):
+        """Callback on_case của judge_submission (gọi từ judge worker thread)"""
+        event = {
+            "case": index + 1,
+            "status": status,
+            "time": result.get("code_execution_time"),
+            "memory": result.get("memory_used"),
+        }
+        with self._updated:
+            self.case_events.append(event)
+            self._updated.notify_all()
+
+    def finish(self, status, result):
+        with self._updated:
+            self.status = status
+            self.result = result
+            self._updated.notify_all()
+
+    def wait_for_events(self, offset, timeout):
+        """
+        Chờ đến khi có kết quả test case mới (sau offset) hoặc job chấm xong.
+        Returns: (case events mới, snapshot nếu đã chấm xong / None)
+        """
+        with self._updated:
+            self._updated.wait_for(
+                lambda: len(self.case_events) > offset or self.result is not None,
+                timeout,
+            )
+            events = self.case_events[offset:]
+            done = self.result is not None
+        return events, self.snapshot() if done else None
+
+    def snapshot(self):
+        """Trạng thái hiện tại của job (dạng dict cho API)"""
+        with self._lock:
+            data = {
+                "submission_id": self.submission_id,
+                "user_id": self.user_id,
+                "final_status": self.status,
+                "completed_test_cases": self.completed,
+                "total_test_cases": self.total,
+                "done": self.result is not None,
+            }
+        if self.result is not None:
+            data.update(self.result)
+        return data
+
+
+def start_judge_workers():
+    """Khởi động judge worker và recovery thread (chỉ chạy một lần cho mỗi process)"""
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(JUDGE_CONFIG["queue_workers"]):
+            worker = threading.Thread(
+                target=_worker_loop, name=f"judge-queue-{i}", daemon=True
+            )
+            worker.start()
+            _workers.append(worker)
+        recovery = threading.Thread(
+            target=_recovery_loop, name="judge-queue-recovery", daemon=True
+        )
+        recovery.start()
+        _workers.append(recovery)
+
+
+def recover_stale_submissions():
+    """
+    Cập nhật heartbeat cho submission process này đang giữ, rồi đánh dấu System
+    Error các submission bị bỏ dở (Pending / Judging, process giữ không cập nhật
+    heartbeat quá stale_after giây). Returns: số submission, None nếu lỗi
+    """
+    with _jobs_lock:
+        own = [sid for sid, job in _jobs.items() if job.result is None]
+    heartbeat_submissions(WORKER_ID, own)
+    count = fail_stale_submissions(
+        (PENDING, JUDGING), JUDGE_CONFIG["stale_after"], worker=WORKER_ID
+    )
+    if count:
+        print(f"Marked {count} stale submissions as System Error")
+    return count
+
+
+def _recovery_loop():
+    while True:
+        recover_stale_submissions()
+        time.sleep(JUDGE_CONFIG["stale_check_interval"])
+
+
+def enqueue_submission(job):
+    """
+    Đưa submission vào queue chấm.
+    Returns: False nếu queue đã đầy (server quá tải)
+    """
+    start_judge_workers()
+    _prune_finished_jobs()
+
+    with _jobs_lock:
+        _jobs[job.submission_id] = job
+    try:
+        _queue.put_nowait(job, owner=job.user_id)
+        return True
+    except queue.Full:
+        with _jobs_lock:
+            _jobs.pop(job.submission_id, None)
+        return False
+
+
+def get_job(submission_id):
+    """JudgeJob trong memory, None nếu process này không giữ job đó"""
+    with _jobs_lock:
+        return _jobs.get(submission_id)
+
+
+def get_job_status(submission_id):
+    """Trạng thái của job trong memory, None nếu process này không giữ job đó"""
+    job = get_job(submission_id)
+    return job.snapshot() if job else None
+
+
+def queue_length():
+    return _queue.qsize()
+
+
+def _prune_finished_jobs():
+    """Xóa kết quả đã quá result_ttl (client lấy kết quả từ DB sau đó)"""
+    expire_before = time.time() - JUDGE_CONFIG["result_ttl"]
+    with _jobs_lock:
+        expired = [
+            sid
+            for sid, job in _jobs.items()
+            if job.finished_at is not None and job.finished_at < expire_before
+        ]
+        for sid in expired:
+            del _jobs[sid]
+
+
+def test_case_results_to_save(final_status, failed_case_detail):
+    """Chỉ lưu failed test case đầu tiên (dạng array 1 item) khi Wrong Answer"""
+    if final_status == "Wrong Answer" and failed_case_detail:
+        return [failed_case_detail]
+    return None
+
+
+def _worker_loop():
+    while True:
+        job = _queue.get()
+        try:
+            _judge(job)
+        except Exception as e:
+            print(f"Error judging submission {job.submission_id}: {e}")
+            update_submission_status(job.submission_id, "System Error")
+            job.finish(
+                "System Error",
+                {
+                    "final_status": "System Error",
+                    "failed_case_detail": None,
+                    "test_cases_passed": 0,
+                    "total_test_cases": job.total,
+                    "execution_time": None,
+                    "memory_used": None,
+                },
+            )
+        finally:
+            job.finished_at = time.time()
+            job.test_cases = None  # Giải phóng test data
+
+
+def _judge(job):
+    job.status = JUDGING
+    update_submission_status(job.submission_id, JUDGING)
+
+    verdict = judge_submission(
+        job.code,
+        job.language,
+        job.test_cases,
+        job.time_limit_ms,
+        job.memory_limit_mb,
+        on_progress=job.add_progress,
+        judge_mode=job.judge_mode,
+        checker=job.checker,
+        on_case=job.add_case_result,
+        owner=job.user_id,
+    )
+    final_status = verdict["final_status"]
+    failed_case_detail = verdict["failed_case_detail"]
+
+    saved = update_submission_result(
+        job.submission_id,
+        final_status,
+        test_cases_passed=verdict["test_cases_passed"],
+        total_test_cases=verdict["total_test_cases"],
+        execution_time=verdict["execution_time"],
+        memory_used=verdict["memory_used"],
+        test_case_results=test_case_results_to_save(final_status, failed_case_detail),
+        case_results=verdict["case_results"],
+    )
+    if not saved:
+        # _worker_loop ghi System Error - không trả / cache verdict mà DB không có
+        raise RuntimeError("cannot save verdict")
+    get_verdict_cache().put(job.cache_key, verdict)
+
+    job.finish(
+        final_status,
+        {
+            "final_status": final_status,
+            "failed_case_detail": failed_case_detail,
+            "test_cases_passed": verdict["test_cases_passed"],
+            "total_test_cases": verdict["total_test_cases"],
+            "execution_time": verdict["execution_time"],
+            "memory_used": verdict["memory_used"],
+        },
+    )
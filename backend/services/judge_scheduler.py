@@ -0,0 +1,229 @@
+"""
+Judge scheduler - thay ThreadPoolExecutor của judge_service: quyết định lần chạy
+code nào được gửi tới executor trước.
+
+    - Priority class: Run (/api/run) > Submit (/api/submit) > Rejudge
+    - Worker dành riêng cho Run: Submit / Rejudge chỉ dùng tối đa
+      max_workers - reserved_run_workers worker, nên Run chỉ phải chờ các Run
+      khác (không bao giờ chờ sau hàng nghìn test của một rejudge)
+    - Rejudge dùng tối đa rejudge_max_workers worker
+    - Trong cùng class, các owner (user, rejudge job) được chia đều worker theo
+      weight (start-time fair queuing): một user submit liên tục không chiếm hết
+      worker của người khác
+    - Chống starvation: task của class thấp chờ quá max_wait giây được chạy
+      trước các class cao hơn (vẫn không dùng worker dành riêng cho Run)
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from config import JUDGE_CONFIG
+
+# Priority class (số nhỏ = ưu tiên cao)
+PRIORITY_RUN = 0
+PRIORITY_SUBMIT = 1
+PRIORITY_REJUDGE = 2
+PRIORITIES = (PRIORITY_RUN, PRIORITY_SUBMIT, PRIORITY_REJUDGE)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class FairQueue:
+    """
+    Hàng đợi chia lượt giữa các owner theo weight (không thread-safe).
+    Mỗi owner có virtual time tăng 1/weight mỗi lần được lấy item; lấy item
+    của owner có virtual time nhỏ nhất. Owner mới (hoặc quay lại sau khi hết
+    item) bắt đầu từ virtual time hiện tại nên không được "bù" lượt đã bỏ lỡ.
+    """
+
+    def __init__(self):
+        self._items = {}  # owner -> deque[(enqueued_at, seq, weight, item)]
+        self._vtime = {}  # owner -> virtual time
+        self._clock = 0.0
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, item, owner=None, weight=1.0):
+        items = self._items.get(owner)
+        if items is None:
+            items = self._items[owner] = deque()
+            self._vtime[owner] = max(self._vtime.get(owner, 0.0), self._clock)
+        items.append((time.monotonic(), next(self._seq), max(weight, 0.01), item))
+        self._size += 1
+
+    def _next_owner(self):
+        return min(
+            self._items, key=lambda owner: (self._vtime[owner], self._items[owner][0][1])
+        )
+
+    def pop(self):
+        """Item tiếp theo, None nếu rỗng"""
+        if not self._size:
+            return None
+        owner = self._next_owner()
+        items = self._items[owner]
+        _, _, weight, item = items.popleft()
+        self._size -= 1
+        self._clock = self._vtime[owner]
+        self._vtime[owner] += 1.0 / weight
+        if not items:
+            del self._items[owner]
+            if self._vtime[owner] <= self._clock:
+                del self._vtime[owner]
+        # Dọn virtual time của owner không còn item và đã bị clock vượt qua
+        if len(self._vtime) > 4 * len(self._items) + 64:
+            self._vtime = {
+                o: v for o, v in self._vtime.items() if o in self._items or v > self._clock
+            }
+        return item
+
+    def oldest_wait(self):
+        """Thời gian (giây) item chờ lâu nhất đã chờ, 0 nếu rỗng"""
+        if not self._size:
+            return 0.0
+        oldest = min(items[0][0] for items in self._items.values())
+        return time.monotonic() - oldest
+
+
+class BlockingFairQueue:
+    """FairQueue thread-safe có giới hạn kích thước (thay queue.Queue của judge queue)"""
+
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self._queue = FairQueue()
+        self._cond = threading.Condition()
+
+    def put_nowait(self, item, owner=None, weight=1.0):
+        """Raises: queue.Full nếu đã đủ maxsize"""
+        with self._cond:
+            if self.maxsize > 0 and len(self._queue) >= self.maxsize:
+                raise queue.Full
+            self._queue.push(item, owner, weight)
+            self._cond.notify()
+
+    def get(self):
+        with self._cond:
+            while not len(self._queue):
+                self._cond.wait()
+            return self._queue.pop()
+
+    def qsize(self):
+        with self._cond:
+            return len(self._queue)
+
+
+class _Task:
+    __slots__ = ("future", "fn", "args")
+
+    def __init__(self, fn, args):
+        self.future = Future()
+        self.fn = fn
+        self.args = args
+
+
+class JudgeScheduler:
+    """Worker pool có priority class và fair share - interface submit() như ThreadPoolExecutor"""
+
+    def __init__(self, max_workers, reserved_run_workers, rejudge_max_workers, max_wait):
+        self.max_workers = max(1, max_workers)
+        # Luôn còn ít nhất một worker cho Submit / Rejudge
+        self.shared_workers = self.max_workers - max(
+            0, min(reserved_run_workers, self.max_workers - 1)
+        )
+        self.rejudge_max_workers = max(1, min(rejudge_max_workers, self.shared_workers))
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._queues = {priority: FairQueue() for priority in PRIORITIES}
+        self._running = {priority: 0 for priority in PRIORITIES}
+        for i in range(self.max_workers):
+            threading.Thread(target=self._worker, name=f"judge-{i}", daemon=True).start()
+
+    def submit(self, fn, *args, priority=PRIORITY_SUBMIT, owner=None, weight=1.0):
+        """
+        Đưa fn(*args) vào hàng đợi của priority class, chia lượt theo owner.
+        Returns: concurrent.futures.Future (cancel() được khi chưa chạy)
+        """
+        task = _Task(fn, args)
+        with self._cond:
+            self._queues[priority].push(task, owner, weight)
+            self._cond.notify()
+        return task.future
+
+    def _can_start(self, priority):
+        if priority == PRIORITY_RUN:
+            return True
+        shared_running = self._running[PRIORITY_SUBMIT] + self._running[PRIORITY_REJUDGE]
+        if shared_running >= self.shared_workers:
+            return False
+        return (
+            priority != PRIORITY_REJUDGE
+            or self._running[PRIORITY_REJUDGE] < self.rejudge_max_workers
+        )
+
+    def _pick(self):
+        """Class được chạy tiếp theo (gọi khi giữ _cond), None nếu chưa có task chạy được"""
+        ready = [p for p in PRIORITIES if len(self._queues[p]) and self._can_start(p)]
+        if not ready:
+            return None
+        # Chống starvation: class thấp có task chờ quá max_wait được chạy trước
+        starving = [
+            p for p in ready if p != ready[0] and self._queues[p].oldest_wait() > self.max_wait
+        ]
+        if starving:
+            return max(starving, key=lambda p: self._queues[p].oldest_wait())
+        return ready[0]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                priority = self._pick()
+                while priority is None:
+                    self._cond.wait()
+                    priority = self._pick()
+                task = self._queues[priority].pop()
+                self._running[priority] += 1
+
+            try:
+                if task.future.set_running_or_notify_cancel():
+                    try:
+                        task.future.set_result(task.fn(*task.args))
+                    except BaseException as e:
+                        task.future.set_exception(e)
+            finally:
+                task = None
+                with self._cond:
+                    self._running[priority] -= 1
+                    self._cond.notify_all()
+
+    def stats(self):
+        """Số task đang chờ / đang chạy theo priority class"""
+        with self._cond:
+            return {
+                priority: {
+                    "queued": len(self._queues[priority]),
+                    "running": self._running[priority],
+                }
+                for priority in PRIORITIES
+            }
+
+
+def get_scheduler():
+    """Scheduler dùng chung cho mọi request - giới hạn số lần gọi executor đồng thời"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = JudgeScheduler(
+                    JUDGE_CONFIG["max_workers"],
+                    JUDGE_CONFIG["reserved_run_workers"],
+                    JUDGE_CONFIG["rejudge_max_workers"],
+                    JUDGE_CONFIG["scheduler_max_wait"],
+                )
+    return _scheduler
@@ -0,0 +1,561 @@
+import threading
+from backend.utils import (
+    run_code_external,
+    run_code_batch_external,
+    supports_batch_execution,
+    batch_execution_limit,
+)
+from backend.checker import (
+    check_output,
+    matches_output_hash,
+    is_special_judge,
+    build_special_judge_input,
+    parse_special_judge_result,
+)
+from backend.constants import JUDGE_MODES, JUDGE_MODE_ICPC, VERDICT_CODES
+from backend.services.testdata_store import with_read_cache
+from backend.services.judge_scheduler import (
+    get_scheduler,
+    PRIORITY_RUN,
+    PRIORITY_SUBMIT,
+)
+from config import JUDGE_CONFIG
+
+# Kết quả của test case không được chạy (ICPC: đã có test fail trước đó)
+SKIPPED_RESULT = {
+    "success": False,
+    "error": "Skipped",
+    "status_label": "Skipped",
+    "skipped": True,
+}
+
+
+def execute_test_cases(
+    code,
+    language,
+    test_cases,
+    on_progress=None,
+    stop_on=None,
+    time_limit=None,
+    on_result=None,
+    priority=PRIORITY_SUBMIT,
+    owner=None,
+):
+    """
+    Chạy code với tất cả test case song song trên judge scheduler.
+    Nếu ngôn ngữ hỗ trợ batch, test case được chia thành các batch (mỗi batch
+    compile một lần, chạy nhiều input - không quá số input executor cho phép) và
+    các batch chạy song song với nhau. Input mà executor không chạy được trong
+    batch (kết quả None) được gửi lại lên scheduler thành job riêng từng test case.
+    Kết quả trả về theo đúng thứ tự test case (index i <-> test_cases[i]).
+
+    Args:
+        on_progress: callback(số test case vừa chạy xong / bị bỏ qua) - gọi từ
+            worker thread, tổng các lần gọi bằng len(test_cases)
+        on_result: callback(index, result) cho từng test case ngay khi chạy xong
+            hoặc bị bỏ qua (theo thứ tự hoàn thành, không theo index) - gọi từ
+            worker thread
+        stop_on: predicate(index, result) - True khi test case index bị fail (ICPC).
+            Các batch chưa chạy nằm hoàn toàn sau test fail sớm nhất sẽ bị hủy,
+            kết quả của chúng là SKIPPED_RESULT
+        time_limit: giới hạn thời gian (giây) mỗi lần chạy, None = mặc định của executor
+        priority, owner: priority class và owner (user / rejudge job) để scheduler
+            chia lượt - xem judge_scheduler
+    """
+    scheduler = get_scheduler()
+    results = [None] * len(test_cases)
+    jobs = []  # (future, index test case đầu tiên) đã gửi lên scheduler
+    # Số job chưa xong (kể cả job chạy lại từng test case), +1 cho tới khi gửi xong
+    outstanding = [1]
+    first_failure = [len(test_cases)]  # Index test fail sớm nhất đã biết
+    errors = []
+    state_lock = threading.Lock()
+    all_done = threading.Event()
+
+    def submit(fn, payload, start, size):
+        future = scheduler.submit(
+            fn, code, language, payload, time_limit, priority=priority, owner=owner
+        )
+        with state_lock:
+            jobs.append((future, start))
+            outstanding[0] += 1
+            skip = start > first_failure[0]
+        if skip:
+            future.cancel()
+        future.add_done_callback(lambda f: on_done(f, start, size))
+
+    def _cancel_after(index):
+        with state_lock:
+            if index >= first_failure[0]:
+                return
+            first_failure[0] = index
+            later = [future for future, start in jobs if start > index]
+        for future in later:
+            future.cancel()  # Chỉ hủy được job chưa bắt đầu chạy
+
+    def _finish_job():
+        with state_lock:
+            outstanding[0] -= 1
+            finished = outstanding[0] == 0
+        if finished:
+            all_done.set()
+
+    def on_done(future, start, size):
+        try:
+            _collect(future, start, size)
+        finally:
+            _finish_job()
+
+    def _collect(future, start, size):
+        if future.cancelled():
+            # Test case bị bỏ qua vẫn tính là xong - tiến độ lên đủ 100%
+            results[start : start + size] = [SKIPPED_RESULT] * size
+            if on_result:
+                for index in range(start, start + size):
+                    on_result(index, SKIPPED_RESULT)
+            if on_progress:
+                on_progress(size)
+            return
+        if future.exception() is not None:
+            errors.append(future.exception())
+            if on_progress:
+                on_progress(size)
+            return
+
+        retry = []
+        res = future.result()
+        stopped = stop_on is None
+        for offset, item in enumerate(res if isinstance(res, list) else [res]):
+            index = start + offset
+            if item is None:
+                retry.append(index)  # Executor chưa chạy được trong batch
+                continue
+            results[index] = item
+            if on_result:
+                on_result(index, item)
+            if not stopped and stop_on(index, item):
+                _cancel_after(index)
+                stopped = True  # Các test sau trong batch chỉ còn báo kết quả
+        if on_progress and size > len(retry):
+            on_progress(size - len(retry))
+
+        # Input executor trả lại được chạy riêng, song song trên scheduler
+        for index in retry:
+            submit(_run_single, test_cases[index], index, 1)
+
+    if supports_batch_execution(language, code):
+        batch_size = max(1, JUDGE_CONFIG["batch_size"])
+        # Executor có thể giới hạn số input mỗi lần gọi (VD: run_timeout của Piston)
+        limit = batch_execution_limit(language, time_limit)
+        if limit:
+            batch_size = min(batch_size, limit)
+        for i in range(0, len(test_cases), batch_size):
+            cases = test_cases[i : i + batch_size]
+            submit(_run_batch, cases, i, len(cases))
+    else:
+        for i, case in enumerate(test_cases):
+            submit(_run_single, case, i, 1)
+
+    _finish_job()
+    all_done.wait()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def _run_batch(code, language, cases, time_limit):
+    # Input chỉ được đọc (từ test data store) khi batch thực sự chạy
+    return run_code_batch_external(
+        code, language, [case["input"] for case in cases], time_limit
+    )
+
+
+def _run_single(code, language, case, time_limit):
+    return run_code_external(code, language, case["input"], time_limit)
+
+
+def run_special_judge(
+    checker, test_cases, executions, priority=PRIORITY_SUBMIT, owner=None
+):
+    """
+    Chạy checker program của problem cho các test case mà code chạy thành công.
+    Checker chạy trên cùng scheduler / executor như code của user (compile một
+    lần cho mỗi batch, artifact được cache), với time limit riêng của checker và
+    cùng priority / owner với lần chấm.
+
+    Returns: list (is_accepted, mismatch) theo index test case, None nếu không chạy checker
+    """
+    indexes = [
+        i
+        for i, res in enumerate(executions)
+        if res["success"] and not res.get("skipped", False)
+    ]
+    verdicts = [None] * len(executions)
+    if not indexes:
+        return verdicts
+
+    checker_cases = [
+        {
+            "input": build_special_judge_input(
+                test_cases[i]["input"],
+                test_cases[i]["expected_output"],
+                executions[i].get("output", ""),
+            )
+        }
+        for i in indexes
+    ]
+    results = execute_test_cases(
+        checker["code"],
+        checker["language"],
+        checker_cases,
+        time_limit=checker["time_limit"],
+        priority=priority,
+        owner=owner,
+    )
+    for i, result in zip(indexes, results):
+        verdicts[i] = parse_special_judge_result(result)
+    return verdicts
+
+
+def verify_special_judge(checker, test_case):
+    """
+    Chạy thử checker program với expected output làm actual output (lúc admin lưu
+    problem) - checker phải compile được và trả về AC.
+    Returns: (is_valid, error_message)
+    """
+    verdicts = run_special_judge(
+        checker,
+        [test_case],
+        [{"success": True, "output": test_case["expected_output"]}],
+        priority=PRIORITY_RUN,  # Admin đang chờ lưu problem
+    )
+    accepted, mismatch = verdicts[0]
+    if accepted:
+        return True, None
+    if accepted is None:
+        return False, mismatch["message"]
+    return False, f"Checker rejected the expected output: {mismatch['message']}"
+
+
+def _check_case(case, res, checker, special_verdict):
+    """
+    Output của test case có đúng không.
+    Returns: (is_accepted, mismatch) - is_accepted = None nếu checker program lỗi
+    """
+    if is_special_judge(checker):
+        return special_verdict or (True, None)
+    actual = res.get("output", "")
+    # Output giống hệt expected -> đúng, không cần đọc expected output (store / bản nén)
+    if matches_output_hash(actual, case.get("output_norm_hash"), checker):
+        return True, None
+    return check_output(actual, case["expected_output"], checker)
+
+
+def _normalize_output(text):
+    # Chuẩn hóa output để so sánh (xóa khoảng trắng thừa và đồng bộ xuống dòng)
+    return (text or "").replace("\r\n", "\n").strip()
+
+
+def case_detail_data(case):
+    """Phần failed_case_detail lấy từ test case (input, expected output đã chuẩn hóa)"""
+    return {
+        "input": case["input"],
+        "expected_output": _normalize_output(case["expected_output"]),
+    }
+
+
+def _run_result_item(index, case, res, checker, special_verdict=None):
+    """Kết quả Run Code của một test case (dạng dict cho API)"""
+    result_item = {"case": index + 1, "status": "Passed"}
+
+    # 1. Nếu code bị lỗi (Compile Error, Runtime Error, hoặc Timeout)
+    if not res["success"]:
+        # Lấy status từ utils trả về (VD: Runtime Error, Time Limit Exceeded)
+        result_item["status"] = res.get("status_label", "Runtime Error")
+        result_item["error"] = res["error"]
+        actual_output = _normalize_output(res.get("output", ""))
+        result_item["input"] = case["input"]
+        result_item["expected"] = _normalize_output(case["expected_output"])
+        result_item["actual"] = actual_output if actual_output else "N/A"
+
+    # 2. Nếu code chạy xong nhưng ra kết quả sai
+    else:
+        accepted, mismatch = _check_case(case, res, checker, special_verdict)
+        if not accepted:
+            result_item["status"] = (
+                "Wrong Answer" if accepted is False else "System Error"
+            )
+            result_item["input"] = case["input"]
+            result_item["expected"] = _normalize_output(case["expected_output"])
+            result_item["actual"] = _normalize_output(res.get("output", ""))
+            result_item["message"] = mismatch["message"]
+
+    return result_item
+
+
+def judge_run(code, language, test_cases, checker=None, on_case=None, owner=None):
+    """
+    Chạy thử code với public test cases (Run Code), priority class cao nhất.
+    checker: cấu hình so sánh output của problem (checker_from_problem), None = exact
+    on_case: callback(result_item) ngay khi một test case có kết quả (theo thứ tự
+        hoàn thành). Special judge: gọi sau khi checker program chạy xong
+    owner: user chạy code (chia lượt giữa các user trong judge scheduler)
+    Returns: (final_status, results) - results có một item cho mỗi test case
+    """
+    special_judge = is_special_judge(checker)
+    streamed = {}  # index -> result_item đã gửi qua on_case
+    test_cases = with_read_cache(test_cases)
+
+    def on_result(index, res):
+        streamed[index] = _run_result_item(index, test_cases[index], res, checker)
+        on_case(streamed[index])
+
+    executions = execute_test_cases(
+        code,
+        language,
+        test_cases,
+        on_result=on_result if on_case and not special_judge else None,
+        priority=PRIORITY_RUN,
+        owner=owner,
+    )
+    special_verdicts = (
+        run_special_judge(
+            checker, test_cases, executions, priority=PRIORITY_RUN, owner=owner
+        )
+        if special_judge
+        else [None] * len(executions)
+    )
+
+    results = []
+    final_status = "Accepted"
+
+    for i, (case, res) in enumerate(zip(test_cases, executions)):
+        result_item = streamed.get(i)
+        if result_item is None:
+            result_item = _run_result_item(i, case, res, checker, special_verdicts[i])
+            if on_case:
+                on_case(result_item)
+        if result_item["status"] != "Passed":
+            final_status = result_item["status"]
+        results.append(result_item)
+
+    return final_status, results
+
+
+def resolve_judge_mode(judge_mode):
+    """Chế độ chấm của problem, NULL / giá trị lạ -> JUDGE_CONFIG["default_mode"]"""
+    if judge_mode in JUDGE_MODES:
+        return judge_mode
+    default_mode = JUDGE_CONFIG["default_mode"]
+    return default_mode if default_mode in JUDGE_MODES else JUDGE_MODES[-1]
+
+
+def _evaluate_case(
+    case, res, time_limit_ms, memory_limit_mb, checker=None, special_verdict=None
+):
+    """
+    Verdict của một test case.
+    special_verdict: kết quả checker program (special judge), None = chưa chạy checker
+    Returns: (status, failed_case_detail) - ("Accepted", None) nếu pass
+    """
+    # Case lỗi Runtime/Compile
+    if not res["success"] and not res.get("is_timeout", False):
+        actual_output = _normalize_output(res.get("output", ""))
+        return res.get("status_label", "Runtime Error"), {
+            "input": case["input"],
+            "expected_output": _normalize_output(case["expected_output"]),
+            "actual_output": actual_output if actual_output else "N/A",
+            "error": res.get("error", "Unknown error"),
+        }
+
+    # Timeout (bị kill) - xử lý như TLE
+    if res.get("is_timeout", False):
+        return "Time Limit Exceeded", {
+            "input": case["input"],
+            "error": res.get("error", "Time Limit Exceeded"),
+        }
+
+    # Check Time Limit Exceeded (CPU time thực tế, không tính network)
+    code_exec_time = res.get("code_execution_time")
+    if code_exec_time and code_exec_time > time_limit_ms:
+        return "Time Limit Exceeded", {
+            "input": case["input"],
+            "time_used": code_exec_time,
+            "time_limit": time_limit_ms,
+        }
+
+    # Check Memory Limit Exceeded - peak RSS (convert MB to KB for comparison)
+    memory = res.get("memory_used")
+    if memory and memory > (memory_limit_mb * 1024):
+        return "Memory Limit Exceeded", {
+            "input": case["input"],
+            "memory_used": memory / 1024,  # Convert to MB
+            "memory_limit": memory_limit_mb,
+        }
+
+    # Case sai kết quả (chuẩn hóa output chỉ khi cần hiển thị)
+    accepted, mismatch = _check_case(case, res, checker, special_verdict)
+    if accepted is None:
+        return "System Error", {"input": case["input"], "error": mismatch["message"]}
+    if not accepted:
+        return "Wrong Answer", {
+            "input": case["input"],
+            "expected_output": _normalize_output(case["expected_output"]),
+            "actual_output": _normalize_output(res.get("output", "")),
+            "message": mismatch["message"],
+        }
+
+    return "Accepted", None
+
+
+def judge_submission(
+    code,
+    language,
+    test_cases,
+    time_limit_ms,
+    memory_limit_mb,
+    on_progress=None,
+    judge_mode=None,
+    checker=None,
+    on_case=None,
+    priority=PRIORITY_SUBMIT,
+    owner=None,
+):
+    """
+    Chấm điểm chính thức (Submit Code).
+    Các test case được chạy song song, sau đó gộp kết quả theo thứ tự index nên
+    verdict luôn giống như khi chạy tuần tự: test case fail đầu tiên, số test pass,
+    max time và max memory.
+
+    judge_mode (problems.judge_mode):
+        icpc    - dừng ở test fail đầu tiên, các test sau không được chạy
+        partial - chạy hết test để đếm test_cases_passed (lỗi Runtime/Compile
+                  vẫn dừng vì code không chạy được)
+    checker: cấu hình so sánh output của problem (checker_from_problem), None = exact
+    on_case: callback(index, status, result) ngay khi verdict của một test case có
+        (theo thứ tự hoàn thành). Special judge và test bị bỏ qua: gọi sau cùng
+    priority, owner: priority class (Submit / Rejudge) và owner trong judge scheduler
+    """
+    stop_on_failure = resolve_judge_mode(judge_mode) == JUDGE_MODE_ICPC
+    special_judge = is_special_judge(checker)
+    # Test fail được đọc lại (so sánh, detail) từ cache thay vì mở lại file / giải nén
+    test_cases = with_read_cache(test_cases)
+    # index -> status, mỗi test case chỉ đánh giá một lần. Chỉ giữ status: detail
+    # (kèm input / expected output) được tạo lại cho test fail đầu tiên
+    evaluated = {}
+
+    def evaluate(index, res, special_verdict=None):
+        if index not in evaluated:
+            evaluated[index] = _evaluate_case(
+                test_cases[index],
+                res,
+                time_limit_ms,
+                memory_limit_mb,
+                checker,
+                special_verdict,
+            )[0]
+        return evaluated[index]
+
+    def is_failure(index, res):
+        return evaluate(index, res) != "Accepted"
+
+    def on_result(index, res):
+        on_case(index, evaluate(index, res), res)
+
+    # Special judge: ICPC chỉ dừng sớm theo lỗi Runtime/TLE/MLE, output được
+    # checker program kiểm tra sau khi chạy xong
+    executions = execute_test_cases(
+        code,
+        language,
+        test_cases,
+        on_progress,
+        stop_on=is_failure if stop_on_failure else None,
+        on_result=on_result if on_case and not special_judge else None,
+        priority=priority,
+        owner=owner,
+    )
+    special_verdicts = [None] * len(executions)
+    if special_judge:
+        special_verdicts = run_special_judge(
+            checker, test_cases, executions, priority=priority, owner=owner
+        )
+        evaluated.clear()  # Verdict tạm (chưa có kết quả checker) không còn đúng
+
+    final_status = "Accepted"
+    failed_case_index = 0
+    failed_case_detail = None  # Lưu chi tiết test case fail đầu tiên
+    test_cases_passed = 0
+
+    # Track execution time and memory (max value from all test cases)
+    max_code_execution_time = 0  # CPU time (user + sys) do sandbox đo
+    max_memory_used = 0
+
+    # Verdict của từng test case đã chạy (lưu vào submission_case_results)
+    streamed = set() if special_judge else set(evaluated)
+    evaluations = [
+        evaluate(i, res, special_verdicts[i]) for i, res in enumerate(executions)
+    ]
+    if on_case:
+        for i, res in enumerate(executions):
+            if i not in streamed:
+                on_case(i, evaluations[i], res)
+    case_results = [
+        (
+            VERDICT_CODES.get(status, VERDICT_CODES["System Error"]),
+            res.get("code_execution_time"),
+            res.get("memory_used"),
+        )
+        for status, res in zip(evaluations, executions)
+    ]
+
+    for i, res in enumerate(executions):
+        # Track CPU time của code (dùng cho TLE check và display)
+        code_exec_time = res.get("code_execution_time")
+        if code_exec_time is not None:
+            max_code_execution_time = max(max_code_execution_time, code_exec_time)
+
+        memory = res.get("memory_used")
+        if memory is not None:
+            max_memory_used = max(max_memory_used, memory)
+
+        status = evaluations[i]
+        if status == "Accepted":
+            # Case đúng - tăng số test pass
+            test_cases_passed += 1
+            continue
+
+        if failed_case_index == 0:  # Lưu test case đầu tiên fail
+            failed_case_index = i + 1
+            failed_case_detail = _evaluate_case(
+                test_cases[i],
+                res,
+                time_limit_ms,
+                memory_limit_mb,
+                checker,
+                special_verdicts[i],
+            )[1]
+
+        # Case lỗi Runtime/Compile - dừng gộp kết quả vì code không chạy được
+        # NHƯNG nếu là timeout thì KHÔNG dừng, xử lý như TLE
+        if not res["success"] and not res.get("is_timeout", False):
+            final_status = status
+            break
+
+        if final_status == "Accepted":  # Chỉ đổi status nếu chưa có lỗi khác
+            final_status = status
+        if stop_on_failure:
+            break
+
+    return {
+        "final_status": final_status,
+        "failed_case_index": failed_case_index,
+        "failed_case_detail": failed_case_detail,
+        "test_cases_passed": test_cases_passed,
+        "total_test_cases": len(test_cases),
+        "execution_time": (
+            max_code_execution_time if max_code_execution_time > 0 else None
+        ),
+        "memory_used": max_memory_used if max_memory_used > 0 else None,
+        # [(verdict code, time ms, memory KB)] theo thứ tự test case - VERDICT_CODES
+        "case_results": case_results,
+    }
@@ -3,6 +3,7 @@ from backend.services.testcase_service import (
     get_sample_test_cases,
     get_public_test_cases,
 )
+from backend.services.verdict_cache import get_verdict_cache
 import markdown
 
 
@@ -32,8 +33,9 @@ def get_problem_detail_by_slug(slug):
             conn.close()
 
     # Get test cases using testcase_service (reuse existing functions)
-    sample_cases = get_sample_test_cases(problem_id)
-    test_cases = get_public_test_cases(problem_id)
+    pack_version = problem.get("pack_version")
+    sample_cases = get_sample_test_cases(problem_id, pack_version)
+    test_cases = get_public_test_cases(problem_id, pack_version)
 
     return problem, sample_cases, test_cases
 
@@ -151,6 +153,11 @@ def create_problem(
     starter_code=None,
     wrapper_template=None,
     function_name=None,
+    judge_mode=None,
+    checker_mode=None,
+    checker_epsilon=None,
+    checker_code=None,
+    checker_language=None,
 ):
     """Create a new problem with tags and code templates"""
     conn = get_db_connection()
@@ -161,8 +168,9 @@ def create_problem(
         cursor = conn.cursor()
         cursor.execute(
             """INSERT INTO problems (title, slug, description, difficulty, time_limit, memory_limit,
-                                     starter_code, wrapper_template, function_name) 
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                                     starter_code, wrapper_template, function_name, judge_mode,
+                                     checker_mode, checker_epsilon, checker_code, checker_language) 
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
             (
                 title,
                 slug,
@@ -173,6 +181,11 @@ def create_problem(
                 starter_code,
                 wrapper_template,
                 function_name,
+                judge_mode,
+                checker_mode,
+                checker_epsilon,
+                checker_code,
+                checker_language,
             ),
         )
         problem_id = cursor.lastrowid
@@ -207,6 +220,11 @@ def update_problem(
     starter_code=None,
     wrapper_template=None,
     function_name=None,
+    judge_mode=None,
+    checker_mode=None,
+    checker_epsilon=None,
+    checker_code=None,
+    checker_language=None,
 ):
     """Update existing problem with code templates"""
     conn = get_db_connection()
@@ -215,10 +233,33 @@ def update_problem(
 
     try:
         cursor = conn.cursor()
+
+        # Limit / wrapper template / judge mode / checker đổi thì verdict đã cache không còn đúng
+        cursor.execute(
+            """UPDATE problems SET pack_version = pack_version + 1
+               WHERE problem_id=%s AND NOT (time_limit <=> %s AND memory_limit <=> %s
+                   AND wrapper_template <=> %s AND judge_mode <=> %s
+                   AND checker_mode <=> %s AND checker_epsilon <=> %s
+                   AND checker_code <=> %s AND checker_language <=> %s)""",
+            (
+                problem_id,
+                time_limit,
+                memory_limit,
+                wrapper_template,
+                judge_mode,
+                checker_mode,
+                checker_epsilon,
+                checker_code,
+                checker_language,
+            ),
+        )
+        pack_changed = cursor.rowcount > 0
+
         cursor.execute(
             """UPDATE problems SET title=%s, slug=%s, description=%s, 
                difficulty=%s, time_limit=%s, memory_limit=%s,
-               starter_code=%s, wrapper_template=%s, function_name=%s
+               starter_code=%s, wrapper_template=%s, function_name=%s, judge_mode=%s,
+               checker_mode=%s, checker_epsilon=%s, checker_code=%s, checker_language=%s
                WHERE problem_id=%s""",
             (
                 title,
@@ -230,6 +271,11 @@ def update_problem(
                 starter_code,
                 wrapper_template,
                 function_name,
+                judge_mode,
+                checker_mode,
+                checker_epsilon,
+                checker_code,
+                checker_language,
                 problem_id,
             ),
         )
@@ -243,6 +289,8 @@ def update_problem(
             )
 
         conn.commit()
+        if pack_changed:
+            get_verdict_cache().invalidate_problem(problem_id)
         return True
     except Exception as e:
         conn.rollback()
@@ -0,0 +1,457 @@
+"""
+Rejudge - chấm lại các submission của một problem sau khi admin sửa test case
+hoặc time / memory limit.
+
+Job được lưu trong bảng rejudge_jobs (tiến độ / hủy job dùng chung giữa các
+worker process) và chạy trên một background thread của process nhận request:
+    - Đọc submission theo từng batch (keyset theo submission_id, không load hết)
+    - Chấm từng submission bằng judge_service với test pack hiện tại; code giống
+      hệt được chấm một lần nhờ verdict cache
+    - Độ ưu tiên thấp: test case chạy ở priority class Rejudge của judge
+      scheduler (sau Run / Submit, giới hạn số worker dùng cho rejudge)
+    - Ghi verdict mới của cả batch trong một transaction (executemany)
+    - Test pack thay đổi giữa chừng: mỗi batch kiểm tra lại pack_version và
+      chấm các batch sau với test pack mới
+    - Job bị bỏ dở khi process dừng được process khởi động sau chạy tiếp từ
+      batch cuối đã lưu (recover_rejudge_jobs)
+"""
+
+import json
+import queue
+import threading
+import uuid
+from backend.database import get_db_connection
+from backend.utils import wrap_user_code
+from backend.compression import read_text
+from backend.checker import checker_from_problem
+from backend.services.problem_service import get_problem_by_id
+from backend.services.testcase_service import get_all_test_cases
+from backend.services.submission_service import update_submission_results
+from backend.services.judge_service import judge_submission
+from backend.services.judge_queue import PENDING, JUDGING, test_case_results_to_save
+from backend.services.judge_scheduler import PRIORITY_REJUDGE
+from backend.services.verdict_cache import get_verdict_cache, make_verdict_key
+from config import JUDGE_CONFIG
+
+# Trạng thái của rejudge job (rejudge_jobs.status)
+REJUDGE_QUEUED = "queued"
+REJUDGE_RUNNING = "running"
+REJUDGE_DONE = "done"
+REJUDGE_FAILED = "failed"
+REJUDGE_CANCELLED = "cancelled"
+
+_runner_queue = queue.Queue()
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def create_rejudge_job(problem_id, requested_by, filters=None):
+    """
+    Tạo rejudge job cho problem và đưa vào hàng đợi chạy của process này.
+
+    filters (tùy chọn): {"statuses": [...], "language": "...", "submission_ids": [...]}
+    Returns: job_id, None nếu lỗi DB
+    """
+    filters = filters or {}
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        where, params = _submission_filter(problem_id, filters)
+        cursor.execute(f"SELECT COUNT(*) FROM submissions WHERE {where}", params)
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            """
+            INSERT INTO rejudge_jobs (problem_id, requested_by, filters, status, total)
+            VALUES (%s, %s, %s, %s, %s)
+        """,
+            (problem_id, requested_by, json.dumps(filters), REJUDGE_QUEUED, total),
+        )
+        conn.commit()
+        job_id = cursor.lastrowid
+    except Exception as e:
+        print(f"Error creating rejudge job: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+    _start_runner()
+    _runner_queue.put(job_id)
+    return job_id
+
+
+def get_rejudge_job(job_id):
+    """Tiến độ của rejudge job (kèm ETA giây khi đang chạy), None nếu không có"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT job_id, problem_id, requested_by, filters, status, total,
+                   processed, changed, error, created_at, started_at, finished_at,
+                   last_submission_id,
+                   TIMESTAMPDIFF(SECOND, started_at, COALESCE(finished_at, NOW())) AS elapsed
+            FROM rejudge_jobs
+            WHERE job_id = %s
+        """,
+            (job_id,),
+        )
+        job = cursor.fetchone()
+        if job:
+            _add_progress(job)
+        return job
+    except Exception as e:
+        print(f"Error fetching rejudge job: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_problem_rejudge_jobs(problem_id, limit=10):
+    """Các rejudge job gần nhất của problem"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT job_id, problem_id, requested_by, filters, status, total,
+                   processed, changed, error, created_at, started_at, finished_at,
+                   TIMESTAMPDIFF(SECOND, started_at, COALESCE(finished_at, NOW())) AS elapsed
+            FROM rejudge_jobs
+            WHERE problem_id = %s
+            ORDER BY job_id DESC
+            LIMIT %s
+        """,
+            (problem_id, limit),
+        )
+        jobs = cursor.fetchall()
+        for job in jobs:
+            _add_progress(job)
+        return jobs
+    except Exception as e:
+        print(f"Error fetching rejudge jobs: {e}")
+        return []
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def cancel_rejudge_job(job_id):
+    """Hủy job chưa xong (runner dừng sau batch hiện tại). Returns: True nếu đã hủy"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            UPDATE rejudge_jobs SET status = %s, finished_at = NOW()
+            WHERE job_id = %s AND status IN (%s, %s)
+        """,
+            (REJUDGE_CANCELLED, job_id, REJUDGE_QUEUED, REJUDGE_RUNNING),
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except Exception as e:
+        print(f"Error cancelling rejudge job: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _add_progress(job):
+    """Thêm percent và eta_seconds (ước lượng theo tốc độ từ lúc bắt đầu)"""
+    total, processed, elapsed = job["total"], job["processed"], job.pop("elapsed")
+    job["filters"] = json.loads(job["filters"]) if job.get("filters") else {}
+    job["percent"] = round(processed * 100 / total, 1) if total else 100.0
+    job["eta_seconds"] = None
+    if job["status"] == REJUDGE_RUNNING and processed and elapsed:
+        job["eta_seconds"] = round(elapsed / processed * (total - processed))
+
+
+def _submission_filter(problem_id, filters):
+    """WHERE clause chọn submission cần chấm lại (bỏ qua submission đang chấm)"""
+    where = ["problem_id = %s", "status NOT IN (%s, %s)"]
+    params = [problem_id, PENDING, JUDGING]
+    if filters.get("statuses"):
+        where.append(f"status IN ({', '.join(['%s'] * len(filters['statuses']))})")
+        params.extend(filters["statuses"])
+    if filters.get("language"):
+        where.append("language = %s")
+        params.append(filters["language"])
+    if filters.get("submission_ids"):
+        where.append(
+            f"submission_id IN ({', '.join(['%s'] * len(filters['submission_ids']))})"
+        )
+        params.extend(filters["submission_ids"])
+    return " AND ".join(where), params
+
+
+def recover_rejudge_jobs():
+    """
+    Chạy tiếp các rejudge job bị bỏ dở (process chạy job đã dừng): job running
+    không cập nhật tiến độ quá rejudge_stale_after giây được đưa về queued, rồi
+    các job queued quá hạn đó được đưa vào hàng đợi của process này. Mỗi job chỉ
+    một process chạy (_mark_running). Returns: số job, None nếu lỗi DB
+    """
+    stale_after = JUDGE_CONFIG["rejudge_stale_after"]
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            UPDATE rejudge_jobs SET status = %s, runner = NULL
+            WHERE status = %s
+              AND COALESCE(heartbeat_at, started_at, created_at)
+                  < NOW() - INTERVAL %s SECOND
+        """,
+            (REJUDGE_QUEUED, REJUDGE_RUNNING, stale_after),
+        )
+        cursor.execute(
+            """
+            SELECT job_id FROM rejudge_jobs
+            WHERE status = %s
+              AND COALESCE(heartbeat_at, created_at) < NOW() - INTERVAL %s SECOND
+            ORDER BY job_id
+        """,
+            (REJUDGE_QUEUED, stale_after),
+        )
+        job_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+    except Exception as e:
+        print(f"Error recovering rejudge jobs: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+    if job_ids:
+        _start_runner()
+        for job_id in job_ids:
+            _runner_queue.put(job_id)
+    return len(job_ids)
+
+
+# ==================== Runner ====================
+
+
+def _start_runner():
+    """Khởi động runner thread (một thread mỗi process, job chạy lần lượt)"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = threading.Thread(target=_runner_loop, name="rejudge", daemon=True)
+            _runner.start()
+
+
+def _runner_loop():
+    while True:
+        job_id = _runner_queue.get()
+        try:
+            _run_job(job_id)
+        except Exception as e:
+            print(f"Error running rejudge job {job_id}: {e}")
+            _finish_job(job_id, REJUDGE_FAILED, str(e))
+
+
+def _run_job(job_id):
+    job = get_rejudge_job(job_id)
+    if not job or job["status"] != REJUDGE_QUEUED:
+        return  # Đã bị hủy trước khi chạy
+
+    runner = uuid.uuid4().hex
+    if not _mark_running(job_id, runner):
+        return  # Process khác đã nhận job
+
+    where, params = _submission_filter(job["problem_id"], job["filters"])
+    problem = test_cases = checker = None
+    last_id = job["last_submission_id"]  # > 0 khi chạy tiếp job bị bỏ dở
+
+    while True:
+        batch = _fetch_batch(where, params, last_id)
+        if not batch:
+            break
+        if _is_cancelled(job_id):
+            return
+
+        # Test pack / limit đổi giữa chừng -> các batch sau chấm theo pack mới
+        latest = get_problem_by_id(job["problem_id"])
+        if not latest:
+            _finish_job(job_id, REJUDGE_FAILED, "Problem or test cases not found")
+            return
+        if problem is None or latest.get("pack_version") != problem.get("pack_version"):
+            problem = latest
+            test_cases = get_all_test_cases(
+                job["problem_id"], problem.get("pack_version")
+            )
+            checker = checker_from_problem(problem)
+        if not test_cases:
+            _finish_job(job_id, REJUDGE_FAILED, "Problem or test cases not found")
+            return
+
+        results = []
+        changed = 0
+        for submission in batch:
+            verdict = _judge(job_id, problem, test_cases, checker, submission)
+            results.append(
+                (
+                    submission["submission_id"],
+                    verdict,
+                    test_case_results_to_save(
+                        verdict["final_status"], verdict["failed_case_detail"]
+                    ),
+                )
+            )
+            if verdict["final_status"] != submission["status"]:
+                changed += 1
+
+        if not update_submission_results(results):
+            _finish_job(job_id, REJUDGE_FAILED, "Cannot save rejudge results")
+            return
+        last_id = batch[-1]["submission_id"]
+        if not _add_job_progress(job_id, runner, len(batch), changed, last_id):
+            return  # Đã bị hủy, hoặc job bị coi là bỏ dở và process khác đã nhận
+
+    _finish_job(job_id, REJUDGE_DONE)
+
+
+def _judge(job_id, problem, test_cases, checker, submission):
+    """Chấm một submission với test pack hiện tại (dùng lại verdict cache nếu có)"""
+    # Batch giữ bản nén, chỉ giải nén submission đang chấm
+    code = read_text(submission["code"], submission["code_compressed"])
+    language = submission["language"]
+    cache = get_verdict_cache()
+    cache_key = make_verdict_key(
+        problem["problem_id"], language, code, problem.get("pack_version")
+    )
+    verdict = cache.get(cache_key, test_cases)
+    if verdict:
+        return verdict
+
+    wrapper_template = problem.get("wrapper_template")
+    executable_code = (
+        wrap_user_code(code, wrapper_template, language) if wrapper_template else code
+    )
+    verdict = judge_submission(
+        executable_code,
+        language,
+        test_cases,
+        problem.get("time_limit", 1000),
+        problem.get("memory_limit", 256),
+        judge_mode=problem.get("judge_mode"),
+        checker=checker,
+        priority=PRIORITY_REJUDGE,
+        owner=f"rejudge:{job_id}",
+    )
+    cache.put(cache_key, verdict)
+    return verdict
+
+
+def _fetch_batch(where, params, last_id):
+    """Batch submission tiếp theo sau last_id (keyset pagination)"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"""
+            SELECT submission_id, code, code_compressed, language, status
+            FROM submissions
+            WHERE {where} AND submission_id > %s
+            ORDER BY submission_id
+            LIMIT %s
+        """,
+            (*params, last_id, JUDGE_CONFIG["rejudge_batch_size"]),
+        )
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching rejudge batch: {e}")
+        return []
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _execute_job_update(sql, params):
+    """Returns: số row được cập nhật, 0 nếu lỗi DB"""
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"Error updating rejudge job: {e}")
+        conn.rollback()
+        return 0
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _mark_running(job_id, runner):
+    """Nhận job queued cho lần chạy runner. Returns: False nếu job không còn queued"""
+    return bool(
+        _execute_job_update(
+            """
+            UPDATE rejudge_jobs
+            SET status = %s, runner = %s, heartbeat_at = NOW(),
+                started_at = COALESCE(started_at, NOW())
+            WHERE job_id = %s AND status = %s
+        """,
+            (REJUDGE_RUNNING, runner, job_id, REJUDGE_QUEUED),
+        )
+    )
+
+
+def _add_job_progress(job_id, runner, processed, changed, last_id):
+    """Ghi tiến độ của một batch. Returns: False nếu runner không còn giữ job"""
+    return bool(
+        _execute_job_update(
+            """
+            UPDATE rejudge_jobs
+            SET processed = processed + %s, changed = changed + %s,
+                last_submission_id = %s, heartbeat_at = NOW()
+            WHERE job_id = %s AND runner = %s AND status = %s
+        """,
+            (processed, changed, last_id, job_id, runner, REJUDGE_RUNNING),
+        )
+    )
+
+
+def _finish_job(job_id, status, error=None):
+    # Không ghi đè job đã bị hủy
+    _execute_job_update(
+        """
+        UPDATE rejudge_jobs SET status = %s, error = %s, finished_at = NOW()
+        WHERE job_id = %s AND status <> %s
+    """,
+        (status, error, job_id, REJUDGE_CANCELLED),
+    )
+
+
+def _is_cancelled(job_id):
+    job = get_rejudge_job(job_id)
+    return not job or job["status"] == REJUDGE_CANCELLED
@@ -1,7 +1,48 @@
 from backend.database import get_db_connection
+from backend.constants import VERDICT_CODES, VERDICT_LABELS
+from backend.compression import compress_text, read_text
 import json
 
 
+def _save_case_results(cursor, submission_id, case_results):
+    """
+    Ghi kết quả từng test case (judge_submission()["case_results"]) bằng một lệnh
+    executemany, trong transaction của caller. Kết quả cũ (nếu có) bị thay thế.
+    """
+    if case_results is None:
+        return
+    _replace_case_results(cursor, [(submission_id, case_results)])
+
+
+def _replace_case_results(cursor, items):
+    """items: [(submission_id, case_results)] - xóa kết quả cũ rồi insert bằng executemany"""
+    cursor.executemany(
+        "DELETE FROM submission_case_results WHERE submission_id = %s",
+        [(submission_id,) for submission_id, _ in items],
+    )
+    rows = [
+        (
+            submission_id,
+            index,
+            verdict,
+            int(time_ms) if time_ms is not None else None,
+            int(memory_kb) if memory_kb is not None else None,
+        )
+        for submission_id, case_results in items
+        for index, (verdict, time_ms, memory_kb) in enumerate(case_results)
+    ]
+    if not rows:
+        return
+    cursor.executemany(
+        """
+        INSERT INTO submission_case_results
+            (submission_id, case_index, verdict, time_ms, memory_kb)
+        VALUES (%s, %s, %s, %s, %s)
+    """,
+        rows,
+    )
+
+
 def save_submission_to_db(
     user_id,
     problem_id,
@@ -13,11 +54,16 @@ def save_submission_to_db(
     execution_time=None,
     memory_used=None,
     test_case_results=None,
+    case_results=None,
+    judge_worker=None,
 ):
-    """Save submission result to database"""
+    """
+    Save submission result to database.
+    judge_worker: id process sẽ chấm submission Pending (judge_queue.WORKER_ID)
+    """
     conn = get_db_connection()
     if not conn:
-        return False
+        return False, None
 
     cursor = conn.cursor()
     try:
@@ -26,20 +72,25 @@ def save_submission_to_db(
         if test_case_results:
             test_case_results_json = json.dumps(test_case_results)
 
+        # Code dài được nén (code = NULL, code_compressed = zlib)
+        code_text, code_compressed = compress_text(code)
+
         cursor.execute(
             """
             INSERT INTO submissions (
-                user_id, problem_id, code, language, status, 
+                user_id, problem_id, code, code_compressed, language, status, 
                 test_cases_passed, total_test_cases,
                 execution_time, memory_used, test_case_results,
-                submitted_at
+                judge_worker, judge_heartbeat_at, submitted_at
             ) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                    IF(%s IS NULL, NULL, NOW()), NOW())
         """,
             (
                 user_id,
                 problem_id,
-                code,
+                code_text,
+                code_compressed,
                 language,
                 status,
                 test_cases_passed,
@@ -47,10 +98,13 @@ def save_submission_to_db(
                 execution_time,
                 memory_used,
                 test_case_results_json,
+                judge_worker,
+                judge_worker,
             ),
         )
-        conn.commit()
         submission_id = cursor.lastrowid
+        _save_case_results(cursor, submission_id, case_results)
+        conn.commit()
         return True, submission_id
     except Exception as e:
         print(f"Error saving submission: {e}")
@@ -61,6 +115,335 @@ def save_submission_to_db(
         conn.close()
 
 
+def update_submission_status(submission_id, status):
+    """Cập nhật status của submission đang chấm (Pending -> Judging)"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE submissions SET status = %s WHERE submission_id = %s",
+            (status, submission_id),
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating submission status: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def heartbeat_submissions(worker, submission_ids):
+    """
+    Process worker vẫn giữ các submission (đang chờ / đang chấm): cập nhật
+    judge_heartbeat_at để process khác không coi là bị bỏ dở.
+    Returns: True nếu thành công
+    """
+    if not submission_ids:
+        return True
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            UPDATE submissions
+            SET judge_worker = %s, judge_heartbeat_at = NOW()
+            WHERE submission_id IN ({', '.join(['%s'] * len(submission_ids))})
+        """,
+            (worker, *submission_ids),
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating submission heartbeat: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def fail_stale_submissions(statuses, older_than_seconds, worker=None):
+    """
+    Đánh dấu System Error các submission kẹt ở status chấm (statuses) mà process
+    giữ submission không cập nhật heartbeat quá older_than_seconds giây (process đã
+    dừng). Submission chưa có heartbeat (tạo trước migration 013) tính từ lúc submit.
+    worker: id process hiện tại - không đánh dấu submission của chính process này
+    Returns: số submission đã đánh dấu, None nếu lỗi
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        where = [
+            f"status IN ({', '.join(['%s'] * len(statuses))})",
+            "COALESCE(judge_heartbeat_at, submitted_at) < NOW() - INTERVAL %s SECOND",
+        ]
+        params = [*statuses, older_than_seconds]
+        if worker:
+            where.append("(judge_worker IS NULL OR judge_worker <> %s)")
+            params.append(worker)
+        cursor.execute(
+            f"UPDATE submissions SET status = %s WHERE {' AND '.join(where)}",
+            ("System Error", *params),
+        )
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"Error failing stale submissions: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def update_submission_result(
+    submission_id,
+    status,
+    test_cases_passed=0,
+    total_test_cases=0,
+    execution_time=None,
+    memory_used=None,
+    test_case_results=None,
+    case_results=None,
+):
+    """
+    Lưu kết quả chấm vào submission đã tạo trước đó (judge queue worker).
+    case_results: kết quả từng test case, ghi cùng transaction với verdict
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        test_case_results_json = None
+        if test_case_results:
+            test_case_results_json = json.dumps(test_case_results)
+
+        cursor.execute(
+            """
+            UPDATE submissions
+            SET status = %s, test_cases_passed = %s, total_test_cases = %s,
+                execution_time = %s, memory_used = %s, test_case_results = %s
+            WHERE submission_id = %s
+        """,
+            (
+                status,
+                test_cases_passed,
+                total_test_cases,
+                execution_time,
+                memory_used,
+                test_case_results_json,
+                submission_id,
+            ),
+        )
+        _save_case_results(cursor, submission_id, case_results)
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating submission result: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def update_submission_results(results):
+    """
+    Lưu kết quả chấm lại của nhiều submission trong một transaction (rejudge).
+    results: [(submission_id, verdict, test_case_results)] - verdict là dict của
+    judge_submission, test_case_results như update_submission_result
+    """
+    if not results:
+        return True
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        rows = []
+        for submission_id, verdict, test_case_results in results:
+            rows.append(
+                (
+                    verdict["final_status"],
+                    verdict["test_cases_passed"],
+                    verdict["total_test_cases"],
+                    verdict["execution_time"],
+                    verdict["memory_used"],
+                    json.dumps(test_case_results) if test_case_results else None,
+                    submission_id,
+                )
+            )
+        cursor.executemany(
+            """
+            UPDATE submissions
+            SET status = %s, test_cases_passed = %s, total_test_cases = %s,
+                execution_time = %s, memory_used = %s, test_case_results = %s
+            WHERE submission_id = %s
+        """,
+            rows,
+        )
+        _replace_case_results(
+            cursor,
+            [
+                (submission_id, verdict["case_results"])
+                for submission_id, verdict, _ in results
+                if verdict.get("case_results") is not None
+            ],
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating submission results: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_submission_status(submission_id):
+    """Lấy status / kết quả chấm của submission (không kèm code)"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT submission_id, user_id, status, test_cases_passed, total_test_cases,
+                   execution_time, memory_used, test_case_results
+            FROM submissions
+            WHERE submission_id = %s
+        """,
+            (submission_id,),
+        )
+        result = cursor.fetchone()
+
+        if result and result.get("test_case_results"):
+            try:
+                result["test_case_results"] = json.loads(result["test_case_results"])
+            except (TypeError, ValueError):
+                result["test_case_results"] = None
+
+        return result
+    except Exception as e:
+        print(f"Error fetching submission status: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_submission_case_results(submission_id):
+    """
+    Kết quả từng test case của submission (theo thứ tự test case).
+    Returns: list [{"case", "status", "time", "memory"}], [] nếu chưa có, None nếu lỗi DB
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT case_index, verdict, time_ms, memory_kb
+            FROM submission_case_results
+            WHERE submission_id = %s
+            ORDER BY case_index
+        """,
+            (submission_id,),
+        )
+        return [
+            {
+                "case": case_index + 1,
+                "status": VERDICT_LABELS.get(verdict, "System Error"),
+                "time": time_ms,
+                "memory": memory_kb,
+            }
+            for case_index, verdict, time_ms, memory_kb in cursor.fetchall()
+        ]
+    except Exception as e:
+        print(f"Error fetching submission case results: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_problem_case_stats(problem_id):
+    """
+    Thống kê theo test case của problem từ submission_case_results (không cần rejudge):
+    số lần chạy, số lần pass, số lần fail theo từng verdict, time / memory lớn nhất.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT r.case_index, r.verdict, COUNT(*), MAX(r.time_ms), MAX(r.memory_kb)
+            FROM submission_case_results r
+            JOIN submissions s ON s.submission_id = r.submission_id
+            WHERE s.problem_id = %s
+            GROUP BY r.case_index, r.verdict
+            ORDER BY r.case_index
+        """,
+            (problem_id,),
+        )
+        stats = {}
+        for case_index, verdict, count, max_time, max_memory in cursor.fetchall():
+            case = stats.setdefault(
+                case_index,
+                {
+                    "case": case_index + 1,
+                    "runs": 0,
+                    "accepted": 0,
+                    "verdicts": {},
+                    "max_time": None,
+                    "max_memory": None,
+                },
+            )
+            if verdict == VERDICT_CODES["Skipped"]:
+                case["verdicts"]["Skipped"] = count
+                continue
+            case["runs"] += count
+            if verdict == VERDICT_CODES["Accepted"]:
+                case["accepted"] += count
+            else:
+                label = VERDICT_LABELS.get(verdict, "System Error")
+                case["verdicts"][label] = case["verdicts"].get(label, 0) + count
+            if max_time is not None:
+                case["max_time"] = max(case["max_time"] or 0, max_time)
+            if max_memory is not None:
+                case["max_memory"] = max(case["max_memory"] or 0, max_memory)
+        return list(stats.values())
+    except Exception as e:
+        print(f"Error fetching problem case stats: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
 def get_user_submissions(user_id, page=1, per_page=10):
     """Get paginated submissions for a specific user"""
     conn = get_db_connection()
@@ -87,8 +470,7 @@ def get_user_submissions(user_id, page=1, per_page=10):
                 p.title,
                 p.slug,
                 s.status,
-                s.submitted_at,
-                s.code
+                s.submitted_at
             FROM submissions s
             JOIN problems p ON s.problem_id = p.problem_id
             WHERE s.user_id = %s
@@ -122,6 +504,7 @@ def get_submission_detail(submission_id):
                 s.user_id,
                 s.problem_id,
                 s.code,
+                s.code_compressed,
                 s.status,
                 s.submitted_at,
                 s.test_cases_passed,
@@ -141,6 +524,9 @@ def get_submission_detail(submission_id):
         )
         result = cursor.fetchone()
 
+        if result:
+            result["code"] = read_text(result["code"], result.pop("code_compressed"))
+
         # Parse test_case_results JSON if present
         if result and result.get("test_case_results"):
             try:
@@ -1,128 +1,234 @@
+import bisect
+from collections import deque
 from backend.database import get_db_connection
+from backend.services.verdict_cache import get_verdict_cache
+from backend.services.testdata_store import content_hash, pack_value, test_case_from_row
+from backend.services.testpack_cache import get_testpack_cache
+from backend.checker import normalized_output_hash
 
+# Cột hash / size / bản nén của data (testdata_store.STORED_FIELDS, COMPRESSED_FIELDS)
+STORE_COLUMNS = (
+    "input_hash, input_size, output_hash, output_size, input_compressed, output_compressed, "
+    "output_norm_hash"
+)
 
-def get_sample_test_cases(problem_id):
+# Số test case công khai tối đa cho Run Code
+MAX_PUBLIC_TEST_CASES = 3
+
+
+def get_sample_test_cases(problem_id, pack_version=None):
     """Lấy sample test cases để hiển thị kết quả trong submission detail"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute(
-            """
-            SELECT test_case_id, input, expected_output, is_sample, is_hidden
-            FROM test_cases 
-            WHERE problem_id = %s AND is_sample = TRUE
-            ORDER BY test_case_id ASC
-        """,
-            (problem_id,),
-        )
-        return cursor.fetchall()
-    except Exception as e:
-        print(f"Error fetching sample test cases: {e}")
-        return []
-    finally:
-        cursor.close()
-        conn.close()
+    return [case for case in get_test_pack(problem_id, pack_version) if case["is_sample"]]
 
 
-def get_public_test_cases(problem_id):
+def get_public_test_cases(problem_id, pack_version=None):
     """Lấy test case công khai để người dùng chạy thử (Run Code) - không bao gồm sample cases
     Giới hạn tối đa 3 test cases để tránh lộ quá nhiều và tiết kiệm thời gian"""
+    public = [
+        case
+        for case in get_test_pack(problem_id, pack_version)
+        if not case["is_hidden"] and not case["is_sample"]
+    ]
+    return public[:MAX_PUBLIC_TEST_CASES]
+
+
+def get_all_test_cases(problem_id, pack_version=None):
+    """
+    Lấy toàn bộ test case để chấm điểm (Submit Code).
+    Data lớn nằm trong test data store chỉ được đọc khi judge truy cập (StoredTestCase)
+    """
+    return get_test_pack(problem_id, pack_version)
+
+
+def get_all_test_cases_with_flags(problem_id):
+    """Get all test cases with is_sample and is_hidden flags for editing"""
+    # Trang edit serialize JSON -> đọc hết data từ store
+    return [case.materialize() for case in get_test_pack(problem_id)]
+
+
+def get_test_pack(problem_id, pack_version=None):
+    """
+    Toàn bộ test case của problem (kèm is_sample / is_hidden) qua test pack cache.
+    Test case dùng chung giữa các request - chỉ đọc.
+
+    pack_version: problems.pack_version caller đã có (VD: từ get_problem_by_id),
+        None = query version hiện tại
+    """
+    if pack_version is None:
+        pack_version = _get_pack_version(problem_id)
+    cache = get_testpack_cache()
+    cases = cache.get(problem_id, pack_version)
+    if cases is not None:
+        return cases
+
+    cases = _load_test_pack(problem_id)
+    if cases is None:
+        return []
+    # Version được đọc trước test case nên pack không bao giờ cũ hơn version lưu kèm
+    cache.put(problem_id, pack_version, cases)
+    return list(cases)
+
+
+def _get_pack_version(problem_id):
+    """problems.pack_version hiện tại, None nếu lỗi (chưa migrate) -> không dùng cache"""
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    if not conn:
+        return None
+    cursor = conn.cursor()
     try:
         cursor.execute(
-            """
-            SELECT input, expected_output 
-            FROM test_cases 
-            WHERE problem_id = %s AND is_hidden = FALSE AND is_sample = FALSE
-            ORDER BY test_case_id ASC
-            LIMIT 3
-        """,
-            (problem_id,),
+            "SELECT pack_version FROM problems WHERE problem_id = %s", (problem_id,)
         )
-        return cursor.fetchall()
+        row = cursor.fetchone()
+        return row[0] if row else None
     except Exception as e:
-        print(f"Error fetching public test cases: {e}")
-        return []
+        print(f"Error fetching pack version: {e}")
+        return None
     finally:
         cursor.close()
         conn.close()
 
 
-def get_all_test_cases(problem_id):
-    """Lấy toàn bộ test case để chấm điểm (Submit Code)"""
+def _load_test_pack(problem_id):
+    """Query toàn bộ test case của problem, None nếu lỗi DB"""
     conn = get_db_connection()
+    if not conn:
+        return None
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute(
-            """
-            SELECT input, expected_output 
+            f"""
+            SELECT test_case_id, input, expected_output, is_sample, is_hidden,
+                   {STORE_COLUMNS}
             FROM test_cases 
             WHERE problem_id = %s 
             ORDER BY test_case_id ASC
         """,
             (problem_id,),
         )
-        return cursor.fetchall()
+        cases = [test_case_from_row(row) for row in cursor.fetchall()]
+        for case in cases:
+            # Test case lưu trước khi có output_norm_hash: tính khi load nếu data inline
+            expected = dict.get(case, "expected_output")
+            if case["output_norm_hash"] is None and isinstance(expected, str):
+                case["output_norm_hash"] = normalized_output_hash(expected)
+        return cases
     except Exception as e:
-        print(f"Error fetching all test cases: {e}")
-        return []
+        print(f"Error fetching test cases: {e}")
+        return None
     finally:
         cursor.close()
         conn.close()
 
 
-def get_all_test_cases_with_flags(problem_id):
-    """Get all test cases with is_sample and is_hidden flags for editing"""
+def save_test_cases(problem_id, test_cases):
+    """
+    Save test cases for a problem (replaces the whole pack).
+
+    Chỉ ghi phần khác với pack hiện tại, trong một transaction. Test case mới
+    được ghép với row hiện tại theo test_case_id (editor gửi kèm), nếu không có
+    thì theo hash nội dung (input, expected output) - thêm / xóa / đổi chỗ một
+    case không làm các case sau bị ghi lại. Thứ tự của pack là thứ tự
+    test_case_id, nên case nằm sai thứ tự được ghi vào row khác (_assign_rows).
+    Chỉ update row có nội dung / flag khác, insert phần thêm ở cuối, delete
+    row không còn dùng.
+
+    Returns: {"inserted": [index], "updated": [index], "deleted": [test_case_id]}
+        (index 0-based trong pack mới), False nếu lỗi. Chỉ dùng để báo lại cho
+        client (test_case_changes của API sửa problem) - pack có thay đổi thì
+        verdict cache / test pack cache của cả problem đều bị xóa, vì verdict phụ
+        thuộc toàn bộ pack
+    """
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    if not conn:
+        return False
+
     try:
+        cursor = conn.cursor(dictionary=True)
+
+        # Hash tính trong DB - không đọc data của test case về app
         cursor.execute(
             """
-            SELECT test_case_id, input, expected_output, is_sample, is_hidden
-            FROM test_cases 
-            WHERE problem_id = %s 
+            SELECT test_case_id, is_sample, is_hidden,
+                   COALESCE(input_hash, SHA2(input, 256)) AS input_digest,
+                   COALESCE(output_hash, SHA2(expected_output, 256)) AS output_digest
+            FROM test_cases
+            WHERE problem_id = %s
             ORDER BY test_case_id ASC
+            FOR UPDATE
         """,
             (problem_id,),
         )
-        return cursor.fetchall()
-    except Exception as e:
-        print(f"Error fetching test cases with flags: {e}")
-        return []
-    finally:
-        cursor.close()
-        conn.close()
+        existing = cursor.fetchall()
 
+        digests = [
+            (content_hash(tc.get("input", "")), content_hash(tc.get("expected_output", "")))
+            for tc in test_cases
+        ]
+        assigned = _assign_rows(existing, test_cases, digests)
 
-def save_test_cases(problem_id, test_cases):
-    """Save test cases for a problem (replaces all existing test cases)"""
-    conn = get_db_connection()
-    if not conn:
-        return False
+        changes = {"inserted": [], "updated": [], "deleted": []}
+        inserts, updates = [], []
+        for index, tc in enumerate(test_cases):
+            row = assigned[index]
+            if row is not None and _same_test_case(row, tc, digests[index]):
+                continue
+            # Data lớn được ghi vào test data store (DB chỉ lưu hash) hoặc nén
+            values = (
+                *_stored_values(tc.get("input", ""), tc.get("expected_output", "")),
+                bool(tc.get("is_sample", False)),
+                bool(tc.get("is_hidden", False)),
+            )
+            if row is None:
+                inserts.append((problem_id, *values))
+                changes["inserted"].append(index)
+            else:
+                updates.append((*values, row["test_case_id"]))
+                changes["updated"].append(index)
+        used = {row["test_case_id"] for row in assigned if row is not None}
+        changes["deleted"] = [
+            row["test_case_id"] for row in existing if row["test_case_id"] not in used
+        ]
 
-    try:
-        cursor = conn.cursor()
-
-        # Delete existing test cases
-        cursor.execute("DELETE FROM test_cases WHERE problem_id = %s", (problem_id,))
-
-        # Insert new test cases
-        for tc in test_cases:
-            cursor.execute(
-                """INSERT INTO test_cases (problem_id, input, expected_output, is_sample, is_hidden) 
-                   VALUES (%s, %s, %s, %s, %s)""",
-                (
-                    problem_id,
-                    tc.get("input", ""),
-                    tc.get("expected_output", ""),
-                    tc.get("is_sample", False),
-                    tc.get("is_hidden", False),
-                ),
+        if not any(changes.values()):
+            conn.rollback()  # Nhả lock, pack không đổi -> cache vẫn đúng
+            return changes
+
+        if changes["deleted"]:
+            cursor.executemany(
+                "DELETE FROM test_cases WHERE test_case_id = %s",
+                [(test_case_id,) for test_case_id in changes["deleted"]],
+            )
+        if updates:
+            cursor.executemany(
+                """UPDATE test_cases
+                   SET input = %s, input_compressed = %s, input_hash = %s, input_size = %s,
+                       expected_output = %s, output_compressed = %s, output_hash = %s,
+                       output_size = %s, output_norm_hash = %s,
+                       is_sample = %s, is_hidden = %s
+                   WHERE test_case_id = %s""",
+                updates,
+            )
+        if inserts:
+            cursor.executemany(
+                """INSERT INTO test_cases (problem_id, input, input_compressed, input_hash,
+                                           input_size, expected_output, output_compressed,
+                                           output_hash, output_size, output_norm_hash,
+                                           is_sample, is_hidden) 
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                inserts,
             )
 
+        # Test pack thay đổi -> verdict đã cache của problem không còn đúng
+        cursor.execute(
+            "UPDATE problems SET pack_version = pack_version + 1 WHERE problem_id = %s",
+            (problem_id,),
+        )
+
         conn.commit()
-        return True
+        get_verdict_cache().invalidate_problem(problem_id)
+        get_testpack_cache().invalidate(problem_id)
+        return changes
     except Exception as e:
         conn.rollback()
         print(f"Error saving test cases: {e}")
@@ -130,3 +236,114 @@ def save_test_cases(problem_id, test_cases):
     finally:
         cursor.close()
         conn.close()
+
+
+def _assign_rows(existing, test_cases, digests):
+    """
+    Row hiện tại dùng cho từng test case mới (None = insert), test_case_id tăng
+    dần theo thứ tự test case mới.
+
+    1. Ghép theo test_case_id (chỉ id của problem này), còn lại theo hash nội dung
+    2. Giữ các cặp đã ghép có id tăng dần dài nhất (case bị đổi chỗ bị bỏ ghép)
+    3. Case chưa có row: dùng row chưa dùng có id nhỏ nhất nằm giữa hai cặp giữ
+       lại xung quanh; không có thì bỏ cặp giữ lại phía sau, hết row thì insert
+    """
+    rows_by_id = {row["test_case_id"]: row for row in existing}
+    matched = [None] * len(test_cases)
+    claimed = set()
+    for index, tc in enumerate(test_cases):
+        try:
+            row = rows_by_id.get(int(tc.get("test_case_id")))
+        except (TypeError, ValueError):
+            row = None
+        if row is not None and row["test_case_id"] not in claimed:
+            matched[index] = row
+            claimed.add(row["test_case_id"])
+
+    by_content = {}
+    for row in existing:
+        if row["test_case_id"] not in claimed:
+            key = (row["input_digest"], row["output_digest"])
+            by_content.setdefault(key, deque()).append(row)
+    for index, digest in enumerate(digests):
+        if matched[index] is None and by_content.get(digest):
+            matched[index] = by_content[digest].popleft()
+
+    kept = _longest_increasing(
+        [(index, row["test_case_id"]) for index, row in enumerate(matched) if row]
+    )
+    kept_ids = {matched[index]["test_case_id"] for index in kept}
+    free = sorted(
+        row["test_case_id"] for row in existing if row["test_case_id"] not in kept_ids
+    )
+
+    assigned = [None] * len(test_cases)
+    previous = 0
+    following = 0  # kept[following]: cặp giữ lại đầu tiên từ index hiện tại trở đi
+    for index in range(len(test_cases)):
+        if following < len(kept) and kept[following] == index:
+            assigned[index] = matched[index]
+            previous = matched[index]["test_case_id"]
+            following += 1
+            continue
+        while True:
+            has_upper = following < len(kept)
+            upper = matched[kept[following]]["test_case_id"] if has_upper else float("inf")
+            position = bisect.bisect_right(free, previous)
+            if position < len(free) and free[position] < upper:
+                row_id = free.pop(position)
+                assigned[index] = rows_by_id[row_id]
+                previous = row_id
+                break
+            if not has_upper:
+                previous = float("inf")  # Insert: id mới lớn hơn mọi row hiện tại
+                break
+            # Không còn id nằm giữa -> bỏ cặp giữ lại phía sau, dùng lại row của nó
+            following += 1
+            bisect.insort(free, upper)
+    return assigned
+
+
+def _longest_increasing(pairs):
+    """pairs [(index, id)] theo index -> index (tăng dần) của dãy con dài nhất có id tăng dần"""
+    tails = []  # tails[k]: id cuối nhỏ nhất của dãy con dài k + 1
+    tail_pairs = []  # vị trí trong pairs của tails[k]
+    parents = []
+    for position, (_, row_id) in enumerate(pairs):
+        k = bisect.bisect_left(tails, row_id)
+        if k == len(tails):
+            tails.append(row_id)
+            tail_pairs.append(position)
+        else:
+            tails[k] = row_id
+            tail_pairs[k] = position
+        parents.append(tail_pairs[k - 1] if k else None)
+
+    kept = []
+    position = tail_pairs[-1] if tail_pairs else None
+    while position is not None:
+        kept.append(pairs[position][0])
+        position = parents[position]
+    kept.reverse()
+    return kept
+
+
+def _same_test_case(row, tc, digest):
+    """Row hiện tại (kèm input_digest / output_digest) có giống test case mới không"""
+    return (
+        (row["input_digest"], row["output_digest"]) == digest
+        and bool(row["is_sample"]) == bool(tc.get("is_sample", False))
+        and bool(row["is_hidden"]) == bool(tc.get("is_hidden", False))
+    )
+
+
+def _stored_values(input_text, expected_output):
+    """
+    (input, input_compressed, input_hash, input_size, expected_output,
+     output_compressed, output_hash, output_size, output_norm_hash) để ghi DB
+    """
+    return (
+        *pack_value(input_text),
+        *pack_value(expected_output),
+        normalized_output_hash(expected_output),
+    )
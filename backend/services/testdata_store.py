@@ -0,0 +1,214 @@
+"""
+Test data store - input / expected output lớn của test case được lưu thành file
+theo nội dung (content-addressed) thay vì text column trong MySQL.
+
+    - File: <dir>/<sha256[:2]>/<sha256>, nội dung UTF-8; test case / problem có
+      data giống hệt dùng chung một file, ghi atomic (file tạm + rename)
+    - DB chỉ lưu hash và kích thước (test_cases.input_hash / input_size,
+      output_hash / output_size); data nhỏ hơn inline_max_kb vẫn lưu inline,
+      được nén (input_compressed / output_compressed) nếu đủ lớn - xem
+      backend/compression.py
+    - Test case đọc từ DB là StoredTestCase: data trong store chỉ được đọc
+      khi truy cập case["input"] / case["expected_output"] - judge đọc input khi
+      batch bắt đầu chạy, expected output khi so sánh, nên một submission không
+      giữ cả test pack trong RAM
+    - Trong một lần chấm, data đã đọc được giữ trong ReadCache (LRU giới hạn
+      theo bytes, TESTDATA_READ_CACHE_MB): test fail được đọc lại khi so sánh,
+      tạo failed_case_detail... mà không mở lại file / giải nén lại
+
+Nhiều worker / máy chấm phải dùng chung thư mục store (TESTDATA_DIR).
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from config import TESTDATA_CONFIG
+from backend.compression import CompressedText, compress_text
+
+# Cột data -> (cột hash, cột kích thước) trong bảng test_cases
+STORED_FIELDS = {
+    "input": ("input_hash", "input_size"),
+    "expected_output": ("output_hash", "output_size"),
+}
+
+# Cột data -> cột BLOB chứa bản nén zlib (NULL nếu không nén)
+COMPRESSED_FIELDS = {
+    "input": "input_compressed",
+    "expected_output": "output_compressed",
+}
+
+
+class BlobRef:
+    """Tham chiếu tới data trong store (chưa đọc)"""
+
+    __slots__ = ("digest", "size")
+
+    def __init__(self, digest, size):
+        self.digest = digest
+        self.size = size
+
+    def read(self):
+        return read_blob(self.digest)
+
+    def __repr__(self):
+        return f"BlobRef({self.digest[:12]}, {self.size} bytes)"
+
+
+def blob_path(digest):
+    return os.path.join(TESTDATA_CONFIG["dir"], digest[:2], digest)
+
+
+def content_hash(text):
+    """sha256 hex của text (UTF-8) - tên file trong store, dùng để so sánh nội dung"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def put_blob(text):
+    """
+    Lưu text vào store (bỏ qua nếu đã có file cùng nội dung).
+    Returns: (sha256 hex, kích thước bytes)
+    """
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return digest, len(data)
+
+
+def read_blob(digest):
+    """
+    Đọc data trong store. str được decode thẳng từ mmap của file (một bản copy,
+    không qua bytes trung gian như f.read().decode())
+    """
+    with open(blob_path(digest), "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return str(data, "utf-8")
+
+
+def pack_value(text):
+    """
+    Cách lưu một giá trị input / expected output.
+    Returns: (text inline hoặc None, bản nén hoặc None, hash hoặc None, kích thước hoặc None)
+        - inline: (text, None, None, None)
+        - nén trong DB: (None, bytes, hash, kích thước gốc) - hash để so sánh nội dung
+        - trong store: (None, None, hash, kích thước)
+    """
+    text = text or ""
+    if len(text) <= TESTDATA_CONFIG["inline_max_kb"] * 1024 // 4:
+        # Chắc chắn <= inline_max_kb khi encode (tối đa 4 bytes / ký tự)
+        return _pack_inline(text)
+    size = len(text.encode("utf-8"))
+    if size <= TESTDATA_CONFIG["inline_max_kb"] * 1024:
+        return _pack_inline(text)
+    digest, size = put_blob(text)
+    return None, None, digest, size
+
+
+def _pack_inline(text):
+    inline, compressed = compress_text(text)
+    if compressed is None:
+        return text, None, None, None
+    return None, compressed, content_hash(text), len(text.encode("utf-8"))
+
+
+class ReadCache:
+    """
+    Data đã đọc từ store / giải nén trong một lần chấm, LRU giới hạn tổng số
+    bytes (ước lượng theo số ký tự). Dùng chung giữa các thread của lần chấm.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # BlobRef digest / CompressedText -> text
+        self._size = 0
+
+    def read(self, value):
+        key = value.digest if isinstance(value, BlobRef) else value
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                return text
+        text = value.read()
+        if len(text) > self.max_bytes:
+            return text
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = text
+                self._size += len(text)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return text
+
+
+class StoredTestCase(dict):
+    """
+    Test case dict: giá trị là BlobRef / CompressedText được đọc từ store hoặc
+    giải nén khi truy cập (case["input"], case.get("expected_output"), template
+    Jinja...) - mỗi lần truy cập, hoặc qua ReadCache của lần chấm (with_read_cache).
+    """
+
+    _read_cache = None
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if not isinstance(value, (BlobRef, CompressedText)):
+            return value
+        if self._read_cache is not None:
+            return self._read_cache.read(value)
+        return value.read()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def materialize(self):
+        """Bản dict thường đã đọc hết data (VD: để serialize JSON)"""
+        return {key: self[key] for key in self}
+
+
+def with_read_cache(test_cases):
+    """
+    Bản test case đọc data qua một ReadCache mới - dùng cho một lần chấm (test
+    pack trong cache vẫn không giữ data đã đọc)
+    """
+    cache = ReadCache(TESTDATA_CONFIG["read_cache_mb"] * 1024 * 1024)
+    cached = []
+    for case in test_cases:
+        if isinstance(case, StoredTestCase):
+            case = StoredTestCase(dict.items(case))  # Giữ BlobRef, không đọc data
+            case._read_cache = cache
+        cached.append(case)
+    return cached
+
+
+def test_case_from_row(row):
+    """Row test_cases (kèm các cột hash / size / bản nén) -> StoredTestCase"""
+    case = StoredTestCase()
+    hidden_columns = {column for pair in STORED_FIELDS.values() for column in pair}
+    hidden_columns.update(COMPRESSED_FIELDS.values())
+    for key, value in row.items():
+        if key not in hidden_columns:
+            case[key] = value
+    for field, (hash_column, size_column) in STORED_FIELDS.items():
+        if row.get(COMPRESSED_FIELDS[field]) is not None:
+            case[field] = CompressedText(row[COMPRESSED_FIELDS[field]])
+        elif row.get(hash_column):
+            case[field] = BlobRef(row[hash_column], row.get(size_column))
+    return case
@@ -0,0 +1,109 @@
+"""
+Test pack cache - test case của các problem đang được chấm nhiều (contest) được
+giữ trong memory thay vì query bảng test_cases ở mỗi /api/run và /api/submit.
+
+    - Mỗi problem một entry: (pack_version, danh sách test case đầy đủ kèm
+      is_sample / is_hidden). Các view sample / public / all được lọc từ cùng
+      một bản, không lưu riêng
+    - pack_version (problems.pack_version) tăng mỗi khi test pack thay đổi, nên
+      entry của process khác tự hết hiệu lực: caller so version hiện tại (lấy từ
+      problem đã load, hoặc một query theo primary key) với version của entry
+    - Giới hạn memory (max_bytes) theo kích thước data inline (bản nén nếu có),
+      LRU; data nằm trong test data store chỉ tốn một BlobRef
+    - Test case trả về dùng chung giữa các request - chỉ đọc, không sửa
+"""
+
+import threading
+from collections import OrderedDict
+from config import TESTDATA_CONFIG
+from backend.compression import CompressedText
+from backend.services.testdata_store import STORED_FIELDS
+
+# Ước lượng overhead của một test case dict (key, flag, object) - bytes
+CASE_OVERHEAD_BYTES = 256
+
+
+def estimate_pack_size(cases):
+    """Kích thước ước lượng (bytes) của test pack trong memory"""
+    size = 0
+    for case in cases:
+        size += CASE_OVERHEAD_BYTES
+        for field in STORED_FIELDS:
+            value = dict.get(case, field)
+            if isinstance(value, str):
+                size += len(value)
+            elif isinstance(value, CompressedText):
+                size += len(value.data)
+    return size
+
+
+class TestPackCache:
+    """LRU cache test pack theo problem, giới hạn tổng kích thước"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # problem_id -> (pack_version, cases, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, problem_id, pack_version):
+        """Test pack (list mới, test case dùng chung) nếu entry đúng version, None nếu miss"""
+        if pack_version is None or self.max_bytes <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(problem_id)
+            if entry is None or entry[0] != pack_version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(problem_id)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, problem_id, pack_version, cases):
+        if pack_version is None or self.max_bytes <= 0:
+            return
+        size = estimate_pack_size(cases)
+        with self._lock:
+            current = self._entries.get(problem_id)
+            # Không ghi đè version mới hơn đã được request khác load
+            if current is not None and current[0] > pack_version:
+                return
+            self._remove(problem_id)
+            if size > self.max_bytes:
+                return  # Pack lớn hơn cả budget - không cache
+            self._entries[problem_id] = (pack_version, list(cases), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def invalidate(self, problem_id):
+        """Xóa test pack của problem (giải phóng memory ngay khi pack thay đổi)"""
+        with self._lock:
+            self._remove(problem_id)
+
+    def _remove(self, problem_id):
+        entry = self._entries.pop(problem_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "problems": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            }
+
+
+_cache = TestPackCache(TESTDATA_CONFIG["pack_cache_mb"] * 1024 * 1024)
+
+
+def get_testpack_cache():
+    return _cache
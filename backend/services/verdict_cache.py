@@ -0,0 +1,142 @@
+"""
+Verdict cache - ghi nhớ kết quả chấm của các submission giống hệt nhau.
+
+key = (problem_id, language, sha256(source đã chuẩn hóa), problems.pack_version)
+
+pack_version tăng mỗi khi test case, time/memory limit, wrapper template hoặc
+judge mode của problem thay đổi, nên entry cũ tự động không còn được dùng - kể cả
+ở các worker process khác (mỗi process giữ cache riêng trong memory).
+
+Entry không giữ input / expected output của test fail (chỉ giữ failed_case_index),
+hai phần này được lấy lại từ test pack khi dùng verdict - memory của cache không
+phụ thuộc kích thước test data.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from backend.constants import VERDICT_CODES
+from backend.services.judge_service import case_detail_data
+from config import JUDGE_CONFIG
+
+# Verdict không được cache: lỗi hệ thống (executor down...) không phải do code,
+# TLE / MLE phụ thuộc tải của máy chấm lúc chạy
+UNCACHEABLE_STATUSES = (
+    "System Error",
+    "Time Limit Exceeded",
+    "Memory Limit Exceeded",
+)
+_UNCACHEABLE_CODES = {VERDICT_CODES[status] for status in UNCACHEABLE_STATUSES}
+
+# Phần failed_case_detail không lưu trong cache (lấy lại từ test pack, case_detail_data)
+CASE_DATA_FIELDS = ("input", "expected_output")
+
+# Output của user trong failed_case_detail lớn hơn giới hạn này -> không cache
+MAX_CACHED_OUTPUT_CHARS = 64 * 1024
+
+VERDICT_FIELDS = (
+    "final_status",
+    "failed_case_index",
+    "failed_case_detail",
+    "test_cases_passed",
+    "total_test_cases",
+    "execution_time",
+    "memory_used",
+    "case_results",
+)
+
+
+def normalize_source(code):
+    """Chuẩn hóa source trước khi hash: đồng bộ xuống dòng, bỏ khoảng trắng cuối file"""
+    return (code or "").replace("\r\n", "\n").rstrip()
+
+
+def make_verdict_key(problem_id, language, code, pack_version):
+    """Key của verdict cache, None nếu problem chưa có pack_version (chưa migrate)"""
+    if pack_version is None:
+        return None
+    digest = hashlib.sha256(normalize_source(code).encode("utf-8")).hexdigest()
+    return (problem_id, (language or "").lower(), digest, pack_version)
+
+
+class VerdictCache:
+    """LRU cache verdict trong memory, giới hạn số entry và thời gian sống"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (thời điểm lưu, verdict, field của detail đã bỏ ra)
+        self._entries = OrderedDict()
+
+    def get(self, key, test_cases):
+        """
+        Verdict đã lưu (bản copy), None nếu miss hoặc đã hết hạn.
+        test_cases: test pack ứng với key (để lấy lại input / expected output)
+        """
+        if key is None or self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, verdict, stripped = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        verdict = dict(verdict)
+        if stripped:
+            index = verdict["failed_case_index"] - 1
+            if not 0 <= index < len(test_cases):
+                return None
+            data = case_detail_data(test_cases[index])
+            verdict["failed_case_detail"] = {
+                **verdict["failed_case_detail"],
+                **{field: data[field] for field in stripped},
+            }
+        return verdict
+
+    def put(self, key, verdict):
+        if key is None or self.max_entries <= 0:
+            return
+        if verdict.get("final_status") in UNCACHEABLE_STATUSES:
+            return
+        # Partial mode: verdict cuối có thể là WA nhưng test sau bị TLE / MLE
+        case_results = verdict.get("case_results") or ()
+        if any(code in _UNCACHEABLE_CODES for code, *_ in case_results):
+            return
+        verdict = {field: verdict.get(field) for field in VERDICT_FIELDS}
+        detail = verdict["failed_case_detail"]
+        stripped = ()
+        if detail:
+            if len(detail.get("actual_output") or "") > MAX_CACHED_OUTPUT_CHARS:
+                return
+            if not verdict["failed_case_index"]:
+                return
+            stripped = tuple(field for field in CASE_DATA_FIELDS if field in detail)
+            verdict["failed_case_detail"] = {
+                field: value for field, value in detail.items() if field not in stripped
+            }
+        entry = (time.time(), verdict, stripped)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_problem(self, problem_id):
+        """Xóa mọi verdict của problem (giải phóng memory ngay khi pack thay đổi)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == problem_id]:
+                del self._entries[key]
+
+
+_cache = VerdictCache(
+    JUDGE_CONFIG["verdict_cache_size"], JUDGE_CONFIG["verdict_cache_ttl"]
+)
+
+
+def get_verdict_cache():
+    return _cache
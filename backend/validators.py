@@ -3,6 +3,12 @@ Input validation utilities for user authentication
 """
 
 import re
+from backend.constants import (
+    JUDGE_MODES,
+    CHECKER_MODES,
+    CHECKER_FLOAT,
+    CHECKER_SPECIAL,
+)
 
 
 # Validation regex patterns
@@ -523,6 +529,80 @@ def validate_memory_limit(memory_limit):
         return False, "Memory limit must be a valid number", None
 
 
+def validate_judge_mode(judge_mode):
+    """
+    Validate problem judging mode
+
+    Rules:
+    - Empty means "use the global default" (JUDGE_DEFAULT_MODE)
+    - Otherwise must be one of: icpc, partial
+
+    Args:
+        judge_mode (str): Judging mode
+
+    Returns:
+        tuple: (is_valid, error_message, normalized_value)
+    """
+    if not judge_mode or not judge_mode.strip():
+        return True, None, None
+
+    mode = judge_mode.strip().lower()
+    if mode not in JUDGE_MODES:
+        return False, f"Judge mode must be one of: {', '.join(JUDGE_MODES)}", None
+
+    return True, None, mode
+
+
+def validate_checker(
+    checker_mode, checker_epsilon, checker_code=None, checker_language=None
+):
+    """
+    Validate output checker settings
+
+    Rules:
+    - Mode: empty (exact) or one of: exact, whitespace, lines, float, special
+    - Epsilon: only used by float mode, must be a number between 0 and 1
+    - Special mode requires checker program code in a supported language
+
+    Args:
+        checker_mode (str): Checker mode
+        checker_epsilon: Absolute / relative tolerance for float mode
+        checker_code (str): Checker program source (special mode)
+        checker_language (str): Checker program language (special mode)
+
+    Returns:
+        tuple: (is_valid, error_message, (mode, epsilon, code, language))
+    """
+    mode = (checker_mode or "").strip().lower() or None
+    if mode is not None and mode not in CHECKER_MODES:
+        return (
+            False,
+            f"Checker mode must be one of: {', '.join(CHECKER_MODES)}",
+            None,
+        )
+
+    if mode == CHECKER_SPECIAL:
+        is_valid, error = validate_code(checker_code)
+        if not is_valid:
+            return False, f"Checker program: {error}", None
+        is_valid, error, language = validate_language(checker_language or "cpp")
+        if not is_valid:
+            return False, f"Checker program: {error}", None
+        return True, None, (mode, None, checker_code, language)
+
+    if mode != CHECKER_FLOAT or checker_epsilon in (None, ""):
+        return True, None, (mode, None, None, None)
+
+    try:
+        epsilon = float(checker_epsilon)
+    except (ValueError, TypeError):
+        return False, "Checker epsilon must be a valid number", None
+    if not 0 < epsilon < 1:
+        return False, "Checker epsilon must be between 0 and 1", None
+
+    return True, None, (mode, epsilon, None, None)
+
+
 def validate_test_cases(test_cases_list):
     """
     Validate test cases
@@ -568,6 +648,11 @@ def validate_problem_input(
     test_cases=None,
     time_limit=None,
     memory_limit=None,
+    judge_mode=None,
+    checker_mode=None,
+    checker_epsilon=None,
+    checker_code=None,
+    checker_language=None,
 ):
     """
     Validate all problem input data at once
@@ -580,6 +665,11 @@ def validate_problem_input(
         test_cases (list): List of test cases
         time_limit: Time limit (optional)
         memory_limit: Memory limit (optional)
+        judge_mode: Judging mode (optional, empty = global default)
+        checker_mode: Output checker mode (optional, empty = exact)
+        checker_epsilon: Tolerance for the float checker (optional)
+        checker_code: Checker program source for special judge (optional)
+        checker_language: Checker program language (optional, default cpp)
 
     Returns:
         tuple: (is_valid, dict of errors, dict of normalized values)
@@ -637,4 +727,25 @@ def validate_problem_input(
         else:
             normalized["memory_limit"] = normalized_limit
 
+    # Validate judge mode
+    is_valid, error, normalized_mode = validate_judge_mode(judge_mode)
+    if not is_valid:
+        errors["judge_mode"] = error
+    else:
+        normalized["judge_mode"] = normalized_mode
+
+    # Validate output checker
+    is_valid, error, normalized_checker = validate_checker(
+        checker_mode, checker_epsilon, checker_code, checker_language
+    )
+    if not is_valid:
+        errors["checker"] = error
+    else:
+        (
+            normalized["checker_mode"],
+            normalized["checker_epsilon"],
+            normalized["checker_code"],
+            normalized["checker_language"],
+        ) = normalized_checker
+
     return len(errors) == 0, errors, normalized
@@ -0,0 +1,207 @@
+"""
+Nén các row cũ của test_cases và submissions (xem migrations/010_compression.sql).
+
+Chạy nền được khi app đang chạy: đọc từng batch theo primary key, mỗi batch
+ghi trong một transaction ngắn rồi nghỉ --sleep giây để không chiếm DB. Chạy
+lại an toàn - row đã nén hoặc nén không đáng sẽ được bỏ qua.
+
+    python compress_data.py [--table test_cases|submissions] [--batch-size 200] [--sleep 0.5]
+"""
+
+import argparse
+import time
+from backend.database import get_db_connection
+from backend.compression import compress_text
+from backend.checker import normalized_output_hash
+from backend.services.testdata_store import pack_value
+from config import COMPRESSION_CONFIG
+
+
+def _fetch(sql, params):
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching rows: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _update(sql, rows):
+    conn = get_db_connection()
+    if not conn:
+        return False
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(sql, rows)
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating rows: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def compress_test_cases(batch_size, sleep):
+    """Test case inline chưa nén -> nén trong DB (hoặc chuyển vào test data store nếu lớn)"""
+    last_id, compressed = 0, 0
+    while True:
+        result = _compress_test_case_batch(last_id, batch_size)
+        if result is None:
+            return False
+        rows, updated = result
+        if not rows:
+            break
+        compressed += updated
+        last_id = rows[-1]["test_case_id"]
+        print(f"test_cases: {compressed} rows compressed (last id {last_id})")
+        time.sleep(sleep)
+    return True
+
+
+def _compress_test_case_batch(last_id, batch_size):
+    """
+    Một batch: đọc (khóa row) và ghi trong cùng transaction để không ghi đè
+    test case vừa được sửa. Returns: (rows đã đọc, số row đã ghi), None nếu lỗi
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT test_case_id, input, input_compressed, input_hash, input_size,
+                   expected_output, output_compressed, output_hash, output_size
+            FROM test_cases
+            WHERE test_case_id > %s
+              AND (LENGTH(input) >= %s OR LENGTH(expected_output) >= %s)
+            ORDER BY test_case_id
+            LIMIT %s
+            FOR UPDATE
+        """,
+            (
+                last_id,
+                COMPRESSION_CONFIG["min_bytes"],
+                COMPRESSION_CONFIG["min_bytes"],
+                batch_size,
+            ),
+        )
+        rows = cursor.fetchall()
+
+        updates = []
+        for row in rows:
+            values = []
+            changed = False
+            for field, prefix in (("input", "input"), ("expected_output", "output")):
+                if row[field] is None:
+                    # Đã nén / nằm trong store - giữ nguyên
+                    values.extend(
+                        (
+                            None,
+                            row[f"{prefix}_compressed"],
+                            row[f"{prefix}_hash"],
+                            row[f"{prefix}_size"],
+                        )
+                    )
+                    continue
+                packed = pack_value(row[field])
+                changed = changed or packed[0] is None
+                values.extend(packed)
+            if changed:
+                # Expected output sắp không còn inline -> lưu luôn hash cho fast path
+                norm_hash = (
+                    normalized_output_hash(row["expected_output"])
+                    if row["expected_output"] is not None
+                    else None
+                )
+                updates.append((*values, norm_hash, row["test_case_id"]))
+
+        if updates:
+            cursor.executemany(
+                """
+                UPDATE test_cases
+                SET input = %s, input_compressed = %s, input_hash = %s, input_size = %s,
+                    expected_output = %s, output_compressed = %s, output_hash = %s,
+                    output_size = %s, output_norm_hash = COALESCE(output_norm_hash, %s)
+                WHERE test_case_id = %s
+            """,
+                updates,
+            )
+        conn.commit()
+        return rows, len(updates)
+    except Exception as e:
+        print(f"Error compressing test cases: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def compress_submissions(batch_size, sleep):
+    """submissions.code dài chưa nén -> code_compressed"""
+    last_id, compressed = 0, 0
+    while True:
+        rows = _fetch(
+            """
+            SELECT submission_id, code
+            FROM submissions
+            WHERE submission_id > %s AND LENGTH(code) >= %s
+            ORDER BY submission_id
+            LIMIT %s
+        """,
+            (last_id, COMPRESSION_CONFIG["min_bytes"], batch_size),
+        )
+        if rows is None:
+            return False
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            _, code_compressed = compress_text(row["code"])
+            if code_compressed is not None:
+                updates.append((code_compressed, row["submission_id"]))
+        if updates and not _update(
+            """
+            UPDATE submissions SET code = NULL, code_compressed = %s
+            WHERE submission_id = %s AND code_compressed IS NULL
+        """,
+            updates,
+        ):
+            return False
+
+        compressed += len(updates)
+        last_id = rows[-1]["submission_id"]
+        print(f"submissions: {compressed} rows compressed (last id {last_id})")
+        time.sleep(sleep)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compress existing test data and submission code"
+    )
+    parser.add_argument("--table", choices=("test_cases", "submissions"))
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--sleep", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if not COMPRESSION_CONFIG["enabled"]:
+        raise SystemExit("DB_COMPRESSION is disabled")
+    ok = True
+    if args.table in (None, "test_cases"):
+        ok = compress_test_cases(args.batch_size, args.sleep) and ok
+    if args.table in (None, "submissions"):
+        ok = compress_submissions(args.batch_size, args.sleep) and ok
+    raise SystemExit(0 if ok else 1)
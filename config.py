@@ -1,5 +1,6 @@
 # config.py
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -11,3 +12,182 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD", "YourStrong@Passw0rd"),
     "database": os.getenv("DB_NAME", "coding_practice_system"),
 }
+
+# Connection pool dùng chung cho toàn bộ service (xem backend/database.py)
+DB_POOL_CONFIG = {
+    "pool_name": os.getenv("DB_POOL_NAME", "litecode_pool"),
+    # Nên >= JUDGE_QUEUE_WORKERS + RATE_LIMIT_MAX_INFLIGHT_RUNS (kiểm tra khi khởi động)
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "24")),
+    # Thời gian tối đa (giây) chờ một connection rảnh khi pool đã hết
+    "acquire_timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+}
+
+# Test data store: input / expected output lớn hơn inline_max_kb được lưu thành file
+# theo hash trong dir (dùng chung giữa các worker) - backend/services/testdata_store.py
+TESTDATA_CONFIG = {
+    "dir": os.getenv(
+        "TESTDATA_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "testdata"),
+    ),
+    "inline_max_kb": int(os.getenv("TESTDATA_INLINE_MAX_KB", "64")),
+    # Memory (MB) của test pack cache mỗi process - backend/services/testpack_cache.py (0 = tắt)
+    "pack_cache_mb": int(os.getenv("TESTPACK_CACHE_MB", "64")),
+    # Memory (MB) tối đa giữ data test case đã đọc trong một lần chấm
+    # (backend/services/testdata_store.py ReadCache)
+    "read_cache_mb": int(os.getenv("TESTDATA_READ_CACHE_MB", "16")),
+}
+
+# Nén zlib text lớn lưu trong DB (test case, code của submission) - backend/compression.py
+COMPRESSION_CONFIG = {
+    "enabled": os.getenv("DB_COMPRESSION", "True").lower() == "true",
+    "min_bytes": int(os.getenv("DB_COMPRESSION_MIN_BYTES", "1024")),
+    "level": int(os.getenv("DB_COMPRESSION_LEVEL", "6")),
+    # Chỉ lưu bản nén nếu nhỏ hơn max_ratio * kích thước gốc
+    "max_ratio": 0.9,
+}
+
+# Judge engine: số test case tối đa chạy song song (dùng chung cho /api/run và /api/submit)
+JUDGE_CONFIG = {
+    "max_workers": int(os.getenv("JUDGE_MAX_WORKERS", "8")),
+    # Số input tối đa gửi trong một lần gọi batch (compile một lần, chạy nhiều input)
+    "batch_size": int(os.getenv("JUDGE_BATCH_SIZE", "16")),
+    # Judge queue: số submission được chấm đồng thời và số submission tối đa chờ chấm
+    "queue_workers": int(os.getenv("JUDGE_QUEUE_WORKERS", "4")),
+    "queue_size": int(os.getenv("JUDGE_QUEUE_SIZE", "1000")),
+    # Thời gian (giây) giữ kết quả chi tiết trong memory cho client polling
+    "result_ttl": int(os.getenv("JUDGE_RESULT_TTL", "600")),
+    # Submission Pending / Judging mà process giữ nó không cập nhật heartbeat quá
+    # stale_after giây (process chấm đã dừng) được đánh dấu System Error - heartbeat
+    # và kiểm tra khi khởi động và mỗi stale_check_interval giây (< stale_after)
+    "stale_after": int(os.getenv("JUDGE_STALE_AFTER", "900")),
+    "stale_check_interval": 60,
+    # Chế độ chấm mặc định cho problem chưa chọn: "partial" hoặc "icpc"
+    "default_mode": os.getenv("JUDGE_DEFAULT_MODE", "partial").lower(),
+    # Verdict cache cho submission giống hệt (số entry tối đa, 0 = tắt; TTL giây)
+    "verdict_cache_size": int(os.getenv("JUDGE_VERDICT_CACHE_SIZE", "5000")),
+    "verdict_cache_ttl": int(os.getenv("JUDGE_VERDICT_CACHE_TTL", "86400")),
+    # Time limit (giây) cho mỗi lần chạy checker program (special judge)
+    "checker_time_limit": int(os.getenv("JUDGE_CHECKER_TIME_LIMIT", "5")),
+    # Rejudge: số submission đọc từ DB và ghi verdict trong một batch
+    "rejudge_batch_size": int(os.getenv("JUDGE_REJUDGE_BATCH_SIZE", "50")),
+    # Rejudge job running không cập nhật tiến độ quá rejudge_stale_after giây
+    # (process chạy job đã dừng) được process khởi động sau chạy tiếp
+    "rejudge_stale_after": int(os.getenv("JUDGE_REJUDGE_STALE_AFTER", "1800")),
+    # Judge scheduler (backend/services/judge_scheduler.py): số worker trong
+    # max_workers chỉ dành cho /api/run, số worker tối đa cho rejudge, và thời
+    # gian chờ (giây) tối đa của Submit / Rejudge trước khi được chạy trước Run
+    "reserved_run_workers": int(os.getenv("JUDGE_RESERVED_RUN_WORKERS", "2")),
+    "rejudge_max_workers": int(os.getenv("JUDGE_REJUDGE_MAX_WORKERS", "2")),
+    "scheduler_max_wait": float(os.getenv("JUDGE_SCHEDULER_MAX_WAIT", "10")),
+}
+
+# Rate limit cho /api/run và /api/submit (backend/rate_limit.py)
+RATE_LIMIT_CONFIG = {
+    "enabled": os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true",
+    # "memory" (một process) hoặc "database" (dùng chung giữa các worker process)
+    "backend": os.getenv("RATE_LIMIT_BACKEND", "memory").lower(),
+    # Token bucket: (burst, số request mỗi phút) theo IP và theo user / session
+    "budgets": {
+        "run": {
+            "ip": (
+                int(os.getenv("RATE_LIMIT_RUN_IP_BURST", "20")),
+                int(os.getenv("RATE_LIMIT_RUN_IP_PER_MINUTE", "60")),
+            ),
+            "user": (
+                int(os.getenv("RATE_LIMIT_RUN_BURST", "5")),
+                int(os.getenv("RATE_LIMIT_RUN_PER_MINUTE", "20")),
+            ),
+        },
+        "submit": {
+            "ip": (
+                int(os.getenv("RATE_LIMIT_SUBMIT_IP_BURST", "10")),
+                int(os.getenv("RATE_LIMIT_SUBMIT_IP_PER_MINUTE", "30")),
+            ),
+            "user": (
+                int(os.getenv("RATE_LIMIT_SUBMIT_BURST", "3")),
+                int(os.getenv("RATE_LIMIT_SUBMIT_PER_MINUTE", "10")),
+            ),
+        },
+    },
+    # Số lần /api/run được chạy đồng thời trên toàn hệ thống (0 = không giới hạn)
+    "max_inflight_runs": int(os.getenv("RATE_LIMIT_MAX_INFLIGHT_RUNS", "16")),
+}
+
+
+def _parse_uid_range(text):
+    """ "60000-60063" -> [60000, ..., 60063], rỗng -> []"""
+    if not text.strip():
+        return []
+    first, _, last = text.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+# Backend chạy code: "piston" (PISTON_API_URL) hoặc "local" (subprocess sandbox trên máy chấm)
+EXECUTOR_CONFIG = {
+    "backend": os.getenv("EXECUTOR_BACKEND", "piston").lower(),
+    # Thư mục chứa workspace tạm của local executor
+    "work_dir": os.getenv(
+        "EXECUTOR_WORK_DIR", os.path.join(tempfile.gettempdir(), "litecode-judge")
+    ),
+    # Giới hạn tài nguyên cho mỗi lần chạy (local executor)
+    "cpu_time_limit": int(os.getenv("EXECUTOR_CPU_TIME_LIMIT", "3")),  # seconds
+    "wall_time_limit": float(os.getenv("EXECUTOR_WALL_TIME_LIMIT", "6")),  # seconds
+    "compile_time_limit": float(os.getenv("EXECUTOR_COMPILE_TIME_LIMIT", "20")),
+    "address_space_mb": int(os.getenv("EXECUTOR_ADDRESS_SPACE_MB", "1024")),
+    "output_limit_kb": int(os.getenv("EXECUTOR_OUTPUT_LIMIT_KB", "65536")),
+    # Số process / thread tối đa - chỉ áp dụng khi code chạy bằng UID sandbox riêng
+    # (RLIMIT_NPROC đếm mọi process của UID, kể cả thread của app server)
+    "max_processes": int(os.getenv("EXECUTOR_MAX_PROCESSES", "64")),
+    # Dải UID chạy code của user, VD "60000-60063" (cần app chạy bằng root).
+    # Mỗi process chạy code / interpreter khởi động sẵn giữ một UID, nên dải cần
+    # >= JUDGE_MAX_WORKERS + tổng EXECUTOR_WARM_POOL_*. Rỗng = chạy bằng UID của app
+    "sandbox_uids": _parse_uid_range(os.getenv("EXECUTOR_SANDBOX_UIDS", "")),
+    # Chạy code trong mount namespace riêng: thư mục của app bị che, chỉ thấy thư
+    # mục của lần chạy. Tắt khi máy chấm không tạo được namespace (VD: container
+    # không có CAP_SYS_ADMIN / user namespace)
+    "sandbox_isolate": os.getenv("EXECUTOR_SANDBOX_ISOLATE", "True").lower() == "true",
+    # Thư mục bị che thêm khi cô lập (phân cách bằng dấu phẩy), mặc định thư mục
+    # app (chứa .env). Work dir, test data và artifact cache luôn bị che
+    "sandbox_hide": [
+        path.strip()
+        for path in os.getenv(
+            "EXECUTOR_SANDBOX_HIDE", os.path.dirname(os.path.abspath(__file__))
+        ).split(",")
+        if path.strip()
+    ],
+    # Cache binary / class files đã compile (C++/Java) theo hash của source
+    "artifact_cache_dir": os.getenv(
+        "EXECUTOR_ARTIFACT_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "litecode-judge", "artifacts"),
+    ),
+    "artifact_cache_mb": int(os.getenv("EXECUTOR_ARTIFACT_CACHE_MB", "512")),
+    # Số interpreter khởi động sẵn cho từng ngôn ngữ (0 = tắt warm pool)
+    "warm_pool_size": {
+        "python": int(os.getenv("EXECUTOR_WARM_POOL_PYTHON", "2")),
+        "javascript": int(os.getenv("EXECUTOR_WARM_POOL_JAVASCRIPT", "2")),
+    },
+    # Gộp các lần chạy giống hệt nhau (code, input, time limit) đang diễn ra đồng thời
+    "single_flight": os.getenv("EXECUTOR_SINGLE_FLIGHT", "True").lower() == "true",
+}
+
+# HTTP client gọi Piston: connection pool, retry lỗi tạm thời và circuit breaker
+PISTON_CLIENT_CONFIG = {
+    # Số connection keep-alive tối đa tới Piston (nên >= JUDGE_MAX_WORKERS)
+    "pool_size": int(os.getenv("PISTON_POOL_SIZE", "16")),
+    # Số lần retry tối đa khi lỗi kết nối / 429 / 502 / 503 / 504
+    "max_retries": int(os.getenv("PISTON_MAX_RETRIES", "2")),
+    "backoff_base": float(os.getenv("PISTON_BACKOFF_BASE", "0.2")),  # seconds
+    "backoff_max": float(os.getenv("PISTON_BACKOFF_MAX", "2")),  # seconds
+    # Số lỗi liên tiếp trước khi ngắt Piston, và thời gian ngắt trước khi thử lại
+    "breaker_failure_threshold": int(os.getenv("PISTON_BREAKER_THRESHOLD", "5")),
+    "breaker_reset_timeout": float(os.getenv("PISTON_BREAKER_RESET", "30")),  # seconds
+    # Danh sách Piston endpoint, phân cách bằng dấu phẩy (rỗng = PISTON_API_URL)
+    "endpoints": [
+        url.strip() for url in os.getenv("PISTON_API_URLS", "").split(",") if url.strip()
+    ],
+    # Số request đồng thời tối đa tới mỗi endpoint
+    "endpoint_max_concurrency": int(os.getenv("PISTON_ENDPOINT_MAX_CONCURRENCY", "16")),
+    # Health check định kỳ khi có nhiều endpoint (0 = tắt)
+    "health_check_interval": float(os.getenv("PISTON_HEALTH_CHECK_INTERVAL", "10")),
+    "health_check_timeout": float(os.getenv("PISTON_HEALTH_CHECK_TIMEOUT", "3")),
+}
@@ -0,0 +1,4 @@
+-- Judge queue: submission được tạo với status 'Pending', chuyển sang 'Judging'
+-- khi worker bắt đầu chấm, sau đó là verdict cuối cùng.
+ALTER TABLE submissions
+    MODIFY status VARCHAR(50) NOT NULL DEFAULT 'Pending';
@@ -0,0 +1,4 @@
+-- Chế độ chấm của từng problem: 'icpc' (dừng ở test fail đầu tiên) hoặc
+-- 'partial' (chạy hết test để đếm số test pass). NULL = dùng JUDGE_DEFAULT_MODE.
+ALTER TABLE problems
+    ADD COLUMN judge_mode VARCHAR(20) NULL DEFAULT NULL;
@@ -0,0 +1,4 @@
+-- Version của test pack: tăng mỗi khi test case, limit, wrapper template hoặc
+-- judge mode của problem thay đổi. Dùng làm một phần key của verdict cache.
+ALTER TABLE problems
+    ADD COLUMN pack_version INT NOT NULL DEFAULT 1;
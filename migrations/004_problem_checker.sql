@@ -0,0 +1,6 @@
+-- Cách so sánh output của từng problem (xem backend/checker.py):
+-- 'exact' | 'whitespace' | 'lines' | 'float'. NULL = exact.
+-- checker_epsilon: sai số tuyệt đối / tương đối cho chế độ 'float' (NULL = 1e-6).
+ALTER TABLE problems
+    ADD COLUMN checker_mode VARCHAR(20) NULL DEFAULT NULL,
+    ADD COLUMN checker_epsilon DOUBLE NULL DEFAULT NULL;
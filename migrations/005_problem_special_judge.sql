@@ -0,0 +1,5 @@
+-- Special judge: checker program do admin viết cho problem có nhiều đáp án đúng
+-- (dùng khi checker_mode = 'special', xem backend/checker.py).
+ALTER TABLE problems
+    ADD COLUMN checker_code TEXT NULL DEFAULT NULL,
+    ADD COLUMN checker_language VARCHAR(20) NULL DEFAULT NULL;
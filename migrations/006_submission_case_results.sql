@@ -0,0 +1,13 @@
+-- Kết quả từng test case của submission (verdict code, CPU time, peak memory),
+-- ghi bằng một lệnh executemany cùng transaction với verdict của submission.
+-- verdict: xem VERDICT_CODES trong backend/constants.py
+CREATE TABLE IF NOT EXISTS submission_case_results (
+    submission_id INT NOT NULL,
+    case_index SMALLINT UNSIGNED NOT NULL,
+    verdict TINYINT UNSIGNED NOT NULL,
+    time_ms INT NULL DEFAULT NULL,
+    memory_kb INT NULL DEFAULT NULL,
+    PRIMARY KEY (submission_id, case_index),
+    CONSTRAINT fk_case_results_submission FOREIGN KEY (submission_id)
+        REFERENCES submissions (submission_id) ON DELETE CASCADE
+);
@@ -0,0 +1,15 @@
+-- Rate limit dùng chung giữa các worker process (RATE_LIMIT_BACKEND=database):
+-- token bucket theo user / session / IP và lease của các lần chạy code đang thực thi.
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket_key VARCHAR(191) NOT NULL PRIMARY KEY,
+    tokens DOUBLE NOT NULL,
+    updated_at DOUBLE NOT NULL,
+    INDEX idx_rate_limit_buckets_updated (updated_at)
+);
+
+CREATE TABLE IF NOT EXISTS rate_limit_leases (
+    lease_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    scope VARCHAR(50) NOT NULL,
+    expires_at DOUBLE NOT NULL,
+    INDEX idx_rate_limit_leases_scope (scope, expires_at)
+);
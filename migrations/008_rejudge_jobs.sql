@@ -0,0 +1,19 @@
+-- Rejudge job của admin: chấm lại submission của một problem sau khi sửa
+-- test case / time limit / memory limit (backend/services/rejudge_service.py).
+-- status: queued | running | done | failed | cancelled
+-- filters: JSON {"statuses": [...], "language": "...", "submission_ids": [...]}
+CREATE TABLE IF NOT EXISTS rejudge_jobs (
+    job_id INT AUTO_INCREMENT PRIMARY KEY,
+    problem_id INT NOT NULL,
+    requested_by INT NULL DEFAULT NULL,
+    filters TEXT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    total INT NOT NULL DEFAULT 0,
+    processed INT NOT NULL DEFAULT 0,
+    changed INT NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL DEFAULT NULL,
+    finished_at DATETIME NULL DEFAULT NULL,
+    INDEX idx_rejudge_jobs_problem (problem_id)
+);
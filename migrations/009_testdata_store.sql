@@ -0,0 +1,11 @@
+-- Test data store: input / expected output lớn hơn TESTDATA_INLINE_MAX_KB được
+-- lưu thành file theo sha256 trong TESTDATA_DIR (backend/services/testdata_store.py).
+-- Test case lưu trong store: input / expected_output = NULL, *_hash = sha256 hex,
+-- *_size = kích thước bytes. Test case nhỏ vẫn lưu inline (*_hash = NULL).
+ALTER TABLE test_cases
+    MODIFY COLUMN input LONGTEXT NULL,
+    MODIFY COLUMN expected_output LONGTEXT NULL,
+    ADD COLUMN input_hash CHAR(64) NULL DEFAULT NULL,
+    ADD COLUMN input_size INT NULL DEFAULT NULL,
+    ADD COLUMN output_hash CHAR(64) NULL DEFAULT NULL,
+    ADD COLUMN output_size INT NULL DEFAULT NULL;
@@ -0,0 +1,11 @@
+-- Nén zlib text lớn trong DB (backend/compression.py): giá trị đã nén nằm trong
+-- cột *_compressed, cột text tương ứng = NULL. Với test case đã nén, *_hash /
+-- *_size vẫn là sha256 / kích thước của data gốc (dùng để so sánh khi lưu).
+-- Nén các row cũ: python compress_data.py
+ALTER TABLE test_cases
+    ADD COLUMN input_compressed LONGBLOB NULL DEFAULT NULL,
+    ADD COLUMN output_compressed LONGBLOB NULL DEFAULT NULL;
+
+ALTER TABLE submissions
+    MODIFY COLUMN code LONGTEXT NULL,
+    ADD COLUMN code_compressed LONGBLOB NULL DEFAULT NULL;
@@ -0,0 +1,7 @@
+-- sha256 của expected output đã chuẩn hóa (backend/checker.py canonical_output),
+-- tính khi lưu test case. Judge hash output của code và so với cột này: giống
+-- nhau -> Accepted mà không cần đọc expected output, khác -> so sánh đầy đủ.
+-- Row cũ (NULL): được tính khi load nếu expected output lưu inline, hoặc khi
+-- chạy compress_data.py / lưu lại test case.
+ALTER TABLE test_cases
+    ADD COLUMN output_norm_hash CHAR(64) NULL DEFAULT NULL;
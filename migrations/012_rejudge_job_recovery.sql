@@ -0,0 +1,10 @@
+-- Khôi phục rejudge job khi process chạy job dừng giữa chừng
+-- (backend/services/rejudge_service.py recover_rejudge_jobs):
+--   runner             - token của lần chạy đang giữ job (mỗi job một process chạy)
+--   heartbeat_at       - cập nhật sau mỗi batch, job running quá
+--                        JUDGE_REJUDGE_STALE_AFTER giây không cập nhật bị coi là bỏ dở
+--   last_submission_id - vị trí keyset đã chấm xong, job tiếp tục từ đó
+ALTER TABLE rejudge_jobs
+    ADD COLUMN runner CHAR(32) NULL DEFAULT NULL,
+    ADD COLUMN heartbeat_at DATETIME NULL DEFAULT NULL,
+    ADD COLUMN last_submission_id INT NOT NULL DEFAULT 0;
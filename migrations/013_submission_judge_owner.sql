@@ -0,0 +1,9 @@
+-- Recovery submission bị bỏ dở khi chạy nhiều process (backend/services/judge_queue.py
+-- recover_stale_submissions):
+--   judge_worker       - id của process đang giữ submission trong judge queue
+--   judge_heartbeat_at - process giữ submission cập nhật định kỳ, submission Pending /
+--                        Judging quá JUDGE_STALE_AFTER giây không cập nhật mới bị coi
+--                        là bỏ dở (không đánh dấu submission process khác đang chấm)
+ALTER TABLE submissions
+    ADD COLUMN judge_worker CHAR(32) NULL DEFAULT NULL,
+    ADD COLUMN judge_heartbeat_at DATETIME NULL DEFAULT NULL;
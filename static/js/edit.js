@@ -11,6 +11,7 @@ function loadTestCasesIntoEditor() {
   const jsonEditor = getJsonEditor();
   if (!jsonEditor) return;
   const cleanTestCases = testCases.map(tc => ({
+    test_case_id: tc.test_case_id,  // Server ghép case theo id khi lưu
     input: tc.input || '',
     expected_output: tc.expected_output || '',
     is_sample: tc.is_sample || false,
@@ -277,6 +278,7 @@ document.addEventListener('DOMContentLoaded', function() {
       const jsonText = jsonEditor.value.trim();
       const parsed = JSON.parse(jsonText);
       const cleanTestCases = parsed.map(tc => ({
+        test_case_id: tc.test_case_id,
         input: tc.input || '',
         expected_output: tc.expected_output || '',
         is_sample: tc.is_sample === true,
@@ -339,3 +341,110 @@ document.addEventListener('DOMContentLoaded', function() {
   }
 });
 
+
+// ==================== Rejudge ====================
+
+let rejudgeJobId = null;
+let rejudgeTimer = null;
+
+function getRejudgeProblemId() {
+  const card = document.getElementById('rejudge-card');
+  return card ? card.dataset.problemId : null;
+}
+
+function formatEta(seconds) {
+  if (seconds === null || seconds === undefined) return '';
+  if (seconds < 60) return `~${seconds}s left`;
+  return `~${Math.floor(seconds / 60)}m ${seconds % 60}s left`;
+}
+
+function renderRejudgeJob(job) {
+  document.getElementById('rejudge-progress').style.display = 'block';
+  const bar = document.getElementById('rejudge-progress-bar');
+  bar.style.width = `${job.percent}%`;
+  bar.textContent = `${job.percent}%`;
+
+  let text = `Job #${job.job_id} - ${job.status}: ${job.processed}/${job.total} submissions, ${job.changed} verdict(s) changed`;
+  if (job.status === 'running' && job.eta_seconds !== null) {
+    text += ` (${formatEta(job.eta_seconds)})`;
+  }
+  if (job.error) {
+    text += ` - ${job.error}`;
+  }
+  document.getElementById('rejudge-progress-text').textContent = text;
+
+  const active = job.status === 'queued' || job.status === 'running';
+  document.getElementById('rejudge-start-btn').disabled = active;
+  document.getElementById('rejudge-cancel-btn').style.display = active ? 'inline-block' : 'none';
+  return active;
+}
+
+async function pollRejudge() {
+  if (!rejudgeJobId) return;
+  try {
+    const response = await fetch(`/api/rejudge/${rejudgeJobId}`);
+    const data = await response.json();
+    if (response.ok && data.job && renderRejudgeJob(data.job)) {
+      rejudgeTimer = setTimeout(pollRejudge, 2000);
+    }
+  } catch (error) {
+    rejudgeTimer = setTimeout(pollRejudge, 5000);
+  }
+}
+
+async function startRejudge() {
+  const problemId = getRejudgeProblemId();
+  const status = document.getElementById('rejudge-status-filter').value;
+
+  const confirmed = await Swal.fire({
+    icon: 'question',
+    title: 'Rejudge submissions?',
+    text: 'Verdicts of existing submissions will be updated in place.',
+    showCancelButton: true,
+    confirmButtonText: 'Rejudge'
+  });
+  if (!confirmed.isConfirmed) return;
+
+  try {
+    const response = await fetch(`/api/problems/${problemId}/rejudge`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(status ? { statuses: [status] } : {})
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      Swal.fire({ icon: 'error', title: 'Error', text: data.message || 'Cannot start rejudge' });
+      return;
+    }
+    rejudgeJobId = data.job_id;
+    clearTimeout(rejudgeTimer);
+    pollRejudge();
+  } catch (error) {
+    Swal.fire({ icon: 'error', title: 'Error', text: `An error occurred: ${error.message}` });
+  }
+}
+
+async function cancelRejudge() {
+  if (!rejudgeJobId) return;
+  await fetch(`/api/rejudge/${rejudgeJobId}/cancel`, { method: 'POST' });
+  clearTimeout(rejudgeTimer);
+  pollRejudge();
+}
+
+// Hiển thị job đang chạy (nếu có) khi mở trang
+document.addEventListener('DOMContentLoaded', async function() {
+  const problemId = getRejudgeProblemId();
+  if (!problemId) return;
+  try {
+    const response = await fetch(`/api/problems/${problemId}/rejudge`);
+    const data = await response.json();
+    if (response.ok && data.jobs && data.jobs.length > 0) {
+      rejudgeJobId = data.jobs[0].job_id;
+      if (renderRejudgeJob(data.jobs[0])) {
+        rejudgeTimer = setTimeout(pollRejudge, 2000);
+      }
+    }
+  } catch (error) {
+    console.error('Error loading rejudge jobs:', error);
+  }
+});
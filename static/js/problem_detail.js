@@ -23,6 +23,104 @@ function showCase(index) {
     document.getElementById('case-content-' + index).classList.remove('d-none');
 }
 
+// Polling /api/submission/<id>/status cho đến khi chấm xong
+async function waitForJudging(submissionId, onProgress) {
+    while (true) {
+        const res = await fetch(`/api/submission/${submissionId}/status`);
+        const status = await res.json();
+        if (status.status !== 'success') {
+            throw new Error(status.message || 'Cannot get submission status');
+        }
+        if (status.done) {
+            return status;
+        }
+        onProgress(status);
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+// Server-Sent Events /api/submission/<id>/events: onCase(case) cho từng test case
+// chấm xong, trả về verdict. Trình duyệt không hỗ trợ / mất kết nối -> polling
+function waitForVerdict(submissionId, onCase, onProgress) {
+    if (!window.EventSource) {
+        return waitForJudging(submissionId, onProgress);
+    }
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/api/submission/${submissionId}/events`);
+        source.addEventListener('case', e => onCase(JSON.parse(e.data)));
+        source.addEventListener('verdict', e => {
+            source.close();
+            resolve(JSON.parse(e.data));
+        });
+        source.addEventListener('status', e => {
+            source.close();
+            reject(new Error(JSON.parse(e.data).message || 'Cannot get submission status'));
+        });
+        source.onerror = () => {
+            source.close();
+            waitForJudging(submissionId, onProgress).then(resolve, reject);
+        };
+    });
+}
+
+// Đọc response NDJSON (một JSON object mỗi dòng), gọi onEvent cho từng dòng
+async function readNdjson(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+        if (done) break;
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+function runStatusHtml(finalStatus) {
+    if (finalStatus === 'Accepted') {
+        return `<div class="alert alert-success d-flex align-items-center py-2 mb-3">
+                    <i class="fas fa-check-circle me-2 fs-4"></i><strong>Accepted</strong>
+                 </div>`;
+    }
+    return `<div class="alert alert-danger d-flex align-items-center py-2 mb-3">
+                <i class="fas fa-times-circle me-2 fs-4"></i><strong>${finalStatus}</strong>
+             </div>`;
+}
+
+function runCaseHtml(r) {
+    const isPass = r.status === 'Passed';
+    const cardClass = isPass ? 'pass' : 'fail';
+    const icon = isPass ? 'check' : 'times';
+
+    let html = `<div class="result-card ${cardClass}">
+                <div class="result-header">
+                    <span><i class="fas fa-${icon} me-2"></i> Case ${r.case}</span>
+                    <span>${r.status}</span>
+                </div>`;
+    if (!isPass) {
+        html += `<div class="result-detail">
+                    <div class="mb-1"><span class="label-text">Input:</span> ${r.input || 'N/A'}</div>
+                    <div class="mb-1"><span class="label-text">Expect:</span> <span class="text-success">${r.expected || 'N/A'}</span></div>
+                    <div><span class="label-text">Actual:</span> <span class="text-danger">${r.actual || r.error || 'Error'}</span></div>
+                    ${r.message ? `<div class="mt-1 text-muted">${r.message}</div>` : ''}
+                 </div>`;
+    }
+    html += `</div>`;
+    return html;
+}
+
+// Kết quả từng test case khi đang chấm submission (badge theo thứ tự test case)
+function judgingCasesHtml(cases) {
+    return cases.map(c => {
+        const color = c.status === 'Accepted' ? 'success' : (c.status === 'Skipped' ? 'secondary' : 'danger');
+        const time = c.time !== null && c.time !== undefined ? ` ${c.time}ms` : '';
+        return `<span class="badge bg-${color} me-1 mb-1">#${c.case} ${c.status}${time}</span>`;
+    }).join('');
+}
+
 // Initialize Monaco Editor and setup event listeners
 function initProblemDetail() {
     const problemIdEl = document.getElementById('problem-data');
@@ -153,44 +251,40 @@ function initProblemDetail() {
             try {
                 const res = await fetch('/api/run', {
                     method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
+                    headers: {'Content-Type': 'application/json', 'Accept': 'application/x-ndjson'},
                     body: JSON.stringify({ code: code, problem_id: problemId, language: language })
                 });
-                const data = await res.json();
 
-                let html = '';
-                if (data.final_status === 'Accepted') {
-                    html += `<div class="alert alert-success d-flex align-items-center py-2 mb-3">
-                                <i class="fas fa-check-circle me-2 fs-4"></i><strong>Accepted</strong>
-                             </div>`;
-                } else {
-                    html += `<div class="alert alert-danger d-flex align-items-center py-2 mb-3">
-                                <i class="fas fa-times-circle me-2 fs-4"></i><strong>${data.final_status}</strong>
-                             </div>`;
+                // Lỗi (validate, rate limit...) vẫn trả về một JSON
+                if (!(res.headers.get('Content-Type') || '').includes('application/x-ndjson') || !res.body) {
+                    const data = await res.json();
+                    let html = runStatusHtml(data.final_status);
+                    if (data.message && !data.results) {
+                        html += `<div class="text-muted">${data.message}</div>`;
+                    }
+                    (data.results || []).forEach(r => { html += runCaseHtml(r); });
+                    outputDiv.innerHTML = html;
+                    return;
                 }
 
-                if (data.results) {
-                    data.results.forEach(r => {
-                        const isPass = r.status === 'Passed';
-                        const cardClass = isPass ? 'pass' : 'fail';
-                        const icon = isPass ? 'check' : 'times';
-
-                        html += `<div class="result-card ${cardClass}">
-                                    <div class="result-header">
-                                        <span><i class="fas fa-${icon} me-2"></i> Case ${r.case}</span>
-                                        <span>${r.status}</span>
-                                    </div>`;
-                        if (!isPass) {
-                            html += `<div class="result-detail">
-                                        <div class="mb-1"><span class="label-text">Input:</span> ${r.input || 'N/A'}</div>
-                                        <div class="mb-1"><span class="label-text">Expect:</span> <span class="text-success">${r.expected || 'N/A'}</span></div>
-                                        <div><span class="label-text">Actual:</span> <span class="text-danger">${r.actual || r.error || 'Error'}</span></div>
-                                     </div>`;
-                        }
-                        html += `</div>`;
-                    });
-                }
-                outputDiv.innerHTML = html;
+                // Stream: hiển thị từng test case ngay khi chạy xong
+                const cases = [];
+                let verdict = null;
+                await readNdjson(res, event => {
+                    if (event.type === 'case') {
+                        cases.push(event);
+                        cases.sort((a, b) => a.case - b.case);
+                    } else if (event.type === 'verdict') {
+                        verdict = event;
+                    }
+                    let html = verdict
+                        ? runStatusHtml(verdict.final_status)
+                        : `<div class="text-primary mb-3"><div class="spinner-border spinner-border-sm me-2"></div>Running... (${cases.length} done)</div>`;
+                    if (verdict && verdict.message) {
+                        html += `<div class="text-muted">${verdict.message}</div>`;
+                    }
+                    outputDiv.innerHTML = html + cases.map(runCaseHtml).join('');
+                });
             } catch (e) { 
                 outputDiv.innerHTML = `<div class="alert alert-danger">Error: ${e.message}</div>`; 
             }
@@ -209,7 +303,34 @@ function initProblemDetail() {
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify({ code: code, problem_id: problemId, language: language })
                 });
-                const data = await res.json();
+                let data = await res.json();
+
+                if (data.status !== 'success') {
+                    outputDiv.innerHTML = `<div class="alert alert-danger">${data.message || 'Submit failed'}</div>`;
+                    return;
+                }
+
+                // Submission được chấm bất đồng bộ - nhận kết quả từng test case qua
+                // Server-Sent Events cho đến khi có verdict
+                // (done = true ngay nếu code giống hệt đã được chấm trước đó)
+                if (!data.done) {
+                    const total = data.total_test_cases;
+                    const cases = [];
+                    const renderJudging = (label, completed) => {
+                        const progress = total ? ` (${completed}/${total})` : '';
+                        outputDiv.innerHTML = `<div class="text-center mt-4 text-warning"><div class="spinner-border spinner-border-sm me-2"></div>${label}...${progress}</div>
+                            <div class="text-center mt-3">${judgingCasesHtml(cases)}</div>`;
+                    };
+                    data = await waitForVerdict(
+                        data.submission_id,
+                        (c) => {
+                            cases.push(c);
+                            cases.sort((a, b) => a.case - b.case);
+                            renderJudging('Judging', cases.length);
+                        },
+                        (status) => renderJudging(status.final_status, status.completed_test_cases || 0)
+                    );
+                }
 
                 let html = `<div class="d-flex flex-column align-items-center justify-content-center h-100">`;
                 if (data.final_status === 'Accepted') {
@@ -234,6 +355,9 @@ function initProblemDetail() {
                             html += `<div class="mb-2"><span class="label-text fw-bold">Expected:</span> <span class="text-success"><pre class="d-inline mb-0">${data.failed_case_detail.expected_output}</pre></span></div>`;
                             html += `<div class="mb-2"><span class="label-text fw-bold">Actual:</span> <span class="text-danger"><pre class="d-inline mb-0">${data.failed_case_detail.actual_output || 'N/A'}</pre></span></div>`;
                         }
+                        if(data.failed_case_detail.message !== undefined) {
+                            html += `<div class="mb-2 text-muted">${data.failed_case_detail.message}</div>`;
+                        }
                         if(data.failed_case_detail.error !== undefined) {
                             html += `<div class="mb-2"><span class="label-text fw-bold">Error:</span> <span class="text-danger">${data.failed_case_detail.error}</span></div>`;
                         }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Chạy pytest từ thư mục gốc của repo mà không cần cài package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
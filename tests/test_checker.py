@@ -0,0 +1,75 @@
+"""backend/checker.py - các chế độ so sánh và vị trí sai đầu tiên"""
+
+import pytest
+from backend.checker import check_output
+
+EXACT = {"mode": "exact"}
+WHITESPACE = {"mode": "whitespace"}
+LINES = {"mode": "lines"}
+FLOAT = {"mode": "float", "epsilon": 1e-6}
+
+
+@pytest.mark.parametrize(
+    "actual",
+    ["1 2\n3", "1 2\r\n3\r\n", "  1 2\n3  \n\n", "\xa01 2\n3　", "\t1 2\n3\x0b"],
+)
+def test_exact_ignores_outer_whitespace_and_crlf(actual):
+    assert check_output(actual, "1 2\n3\n", EXACT) == (True, None)
+
+
+def test_exact_reports_line_and_column():
+    accepted, mismatch = check_output("ab\ncdX\n", "ab\ncde\n", EXACT)
+    assert not accepted
+    assert (mismatch["line"], mismatch["column"]) == (2, 3)
+    assert (mismatch["expected"], mismatch["actual"]) == ("e", "X")
+
+
+def test_exact_keeps_inner_whitespace():
+    accepted, mismatch = check_output("1  2", "1 2", EXACT)
+    assert not accepted
+    assert (mismatch["line"], mismatch["column"]) == (1, 3)
+
+
+def test_exact_short_and_extra_output():
+    accepted, mismatch = check_output("1\n2", "1\n2\n3", EXACT)
+    assert not accepted and mismatch["line"] == 3
+    assert "ended too early" in mismatch["message"]
+
+    accepted, mismatch = check_output("1\n2\n3", "1\n2", EXACT)
+    assert not accepted and mismatch["line"] == 3
+    assert "unexpected extra output" in mismatch["message"]
+
+
+def test_lines_ignores_trailing_spaces_per_line():
+    assert check_output("1 \n2\xa0\n", "1\n2", LINES) == (True, None)
+    assert check_output("1 \n2\n", "1\n2", EXACT)[0] is False
+
+
+def test_whitespace_compares_tokens():
+    assert check_output("1\n2   3\n", "1 2 3", WHITESPACE) == (True, None)
+
+    accepted, mismatch = check_output("1 2\n4", "1 2 3", WHITESPACE)
+    assert not accepted
+    assert (mismatch["token"], mismatch["line"]) == (3, 2)
+    assert (mismatch["expected"], mismatch["actual"]) == ("3", "4")
+
+
+def test_float_uses_absolute_or_relative_epsilon():
+    assert check_output("0.3333334", "0.333333", FLOAT)[0]
+    assert check_output("1000000.5", "1000000", FLOAT)[0]
+    assert not check_output("0.34", "0.333333", FLOAT)[0]
+    assert not check_output("abc", "1.0", FLOAT)[0]
+    assert check_output("nan inf", "nan inf", FLOAT)[0]
+
+
+def test_long_lines_report_first_difference():
+    expected = "x" * 10000
+    actual = expected[:9000] + "y" + expected[9001:]
+    accepted, mismatch = check_output(actual, expected, EXACT)
+    assert not accepted
+    assert mismatch["column"] == 9001
+
+
+def test_special_mode_is_rejected():
+    with pytest.raises(ValueError):
+        check_output("1", "1", {"mode": "special"})
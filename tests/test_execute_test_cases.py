@@ -0,0 +1,98 @@
+"""backend/services/judge_service.py - execute_test_cases chia batch và chạy lại input"""
+
+import threading
+import pytest
+from backend.services import judge_service
+from backend.services.judge_scheduler import JudgeScheduler
+
+
+class FakeExecutor:
+    """Batch chỉ chạy được `batch_runs` input đầu, các input sau trả về None"""
+
+    def __init__(self, limit=None, batch_runs=None):
+        self.limit = limit
+        self.batch_runs = batch_runs
+        self.batches = []
+        self.singles = []
+        self.lock = threading.Lock()
+
+    def run_batch(self, code, language, inputs, time_limit=None):
+        with self.lock:
+            self.batches.append(list(inputs))
+        runs = len(inputs) if self.batch_runs is None else self.batch_runs
+        return [
+            _result(data) if i < runs else None for i, data in enumerate(inputs)
+        ]
+
+    def run(self, code, language, input_data, time_limit=None):
+        with self.lock:
+            self.singles.append(input_data)
+        return _result(input_data)
+
+
+def _result(data):
+    return {"success": True, "output": data, "status_label": "Accepted"}
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    fake = FakeExecutor()
+    scheduler = JudgeScheduler(4, 0, 4, 60)
+    monkeypatch.setattr(judge_service, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(judge_service, "supports_batch_execution", lambda *a: True)
+    monkeypatch.setattr(
+        judge_service, "batch_execution_limit", lambda *a: fake.limit
+    )
+    monkeypatch.setattr(judge_service, "run_code_batch_external", fake.run_batch)
+    monkeypatch.setattr(judge_service, "run_code_external", fake.run)
+    monkeypatch.setitem(judge_service.JUDGE_CONFIG, "batch_size", 16)
+    return fake
+
+
+def _cases(count):
+    return [{"input": str(i)} for i in range(count)]
+
+
+def test_batch_size_follows_executor_limit(executor):
+    executor.limit = 3
+
+    results = judge_service.execute_test_cases("code", "python", _cases(8))
+
+    assert sorted(len(batch) for batch in executor.batches) == [2, 3, 3]
+    assert [r["output"] for r in results] == [str(i) for i in range(8)]
+
+
+def test_inputs_left_by_batch_run_as_single_jobs(executor):
+    executor.limit = 4
+    executor.batch_runs = 1
+    progress = []
+
+    results = judge_service.execute_test_cases(
+        "code", "python", _cases(8), on_progress=progress.append
+    )
+
+    assert [r["output"] for r in results] == [str(i) for i in range(8)]
+    assert sorted(executor.singles) == ["1", "2", "3", "5", "6", "7"]
+    assert sum(progress) == 8
+
+
+def test_cancelled_batches_still_report_progress(executor, monkeypatch):
+    # Một worker: các batch chạy lần lượt, batch sau test fail bị hủy trước khi chạy
+    scheduler = JudgeScheduler(1, 0, 1, 60)
+    monkeypatch.setattr(judge_service, "get_scheduler", lambda: scheduler)
+    executor.limit = 2
+    progress, reported = [], []
+
+    results = judge_service.execute_test_cases(
+        "code",
+        "python",
+        _cases(8),
+        on_progress=progress.append,
+        stop_on=lambda index, result: index == 1,
+        on_result=lambda index, result: reported.append(index),
+    )
+
+    assert len(executor.batches) == 1
+    assert [r.get("skipped", False) for r in results] == [False] * 2 + [True] * 6
+    assert sum(progress) == 8
+    assert sorted(reported) == list(range(8))
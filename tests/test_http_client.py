@@ -0,0 +1,85 @@
+"""backend/executors/http_client.py - 429 backoff không mở circuit breaker"""
+
+import time
+import pytest
+from config import PISTON_CLIENT_CONFIG
+from backend.executors.http_client import (
+    CircuitBreaker,
+    EndpointPool,
+    ExecutorHTTPError,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+
+    def json(self):
+        return {"run": {"stdout": "ok"}}
+
+
+class FakeSession:
+    """Trả lần lượt các status code trong `statuses`, sau đó luôn 200"""
+
+    def __init__(self, statuses=(), retry_after=None):
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append(time.monotonic())
+        status = self.statuses.pop(0) if self.statuses else 200
+        return FakeResponse(status, self.retry_after if status == 429 else None)
+
+
+@pytest.fixture(autouse=True)
+def client_config(monkeypatch):
+    monkeypatch.setitem(PISTON_CLIENT_CONFIG, "health_check_interval", 0)
+    monkeypatch.setitem(PISTON_CLIENT_CONFIG, "max_retries", 2)
+    monkeypatch.setitem(PISTON_CLIENT_CONFIG, "backoff_base", 0.01)
+    monkeypatch.setitem(PISTON_CLIENT_CONFIG, "backoff_max", 2)
+    monkeypatch.setitem(PISTON_CLIENT_CONFIG, "breaker_failure_threshold", 3)
+
+
+def _pool(*sessions):
+    pool = EndpointPool([f"http://piston-{i}/execute" for i in range(len(sessions))])
+    for endpoint, session in zip(pool.endpoints, sessions):
+        endpoint.client.session = session
+    return pool
+
+
+def test_throttled_requests_do_not_open_breaker():
+    session = FakeSession([429] * 9, retry_after=0)
+    pool = _pool(session)
+
+    for _ in range(3):
+        with pytest.raises(ExecutorHTTPError):
+            pool.post_json({}, 5)
+
+    assert len(session.posts) == 9
+    assert pool.endpoints[0].client.breaker.state == CircuitBreaker.CLOSED
+    assert pool.post_json({}, 5)[0]["run"]["stdout"] == "ok"
+
+
+def test_single_endpoint_waits_for_retry_after():
+    session = FakeSession([429], retry_after=0.3)
+    pool = _pool(session)
+
+    pool.post_json({}, 5)
+
+    assert session.posts[1] - session.posts[0] >= 0.29
+
+
+def test_throttled_endpoint_skipped_while_others_available():
+    throttled = FakeSession([429], retry_after=2)
+    other = FakeSession()
+    pool = _pool(throttled, other)
+
+    for _ in range(4):
+        pool.post_json({}, 5)
+
+    # Request đầu bị 429 rồi chuyển sang endpoint kia, các request sau không
+    # gửi tới endpoint đang bị hoãn
+    assert len(throttled.posts) == 1
+    assert len(other.posts) == 4
@@ -0,0 +1,80 @@
+"""backend/executors/local.py - code của user chạy cô lập qua sandbox launcher"""
+
+import os
+import shutil
+import subprocess
+import pytest
+from config import EXECUTOR_CONFIG, TESTDATA_CONFIG
+from backend.constants import LOCAL_RUNTIME_CONFIG
+from backend.executors import local
+from backend.executors.local import LocalExecutor
+from backend.executors.sandbox_launcher import SandboxUids
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("cc") is None
+    or shutil.which("g++") is None
+    or subprocess.run(["unshare", "-rm", "true"], capture_output=True).returncode != 0,
+    reason="cần cc, g++ và mount namespace",
+)
+
+LIST_DIRS = """#include <cstdio>
+#include <dirent.h>
+int main(int argc, char** argv) {
+    const char* dirs[] = {%s};
+    for (const char* dir : dirs) {
+        DIR* d = opendir(dir);
+        int count = 0;
+        while (d && readdir(d)) count++;
+        printf("%%d ", d ? count - 2 : -1);  // Bỏ . và ..
+    }
+}
+"""
+
+
+@pytest.fixture
+def executor(monkeypatch, tmp_path):
+    monkeypatch.setitem(EXECUTOR_CONFIG, "work_dir", str(tmp_path / "work"))
+    monkeypatch.setitem(EXECUTOR_CONFIG, "sandbox_isolate", True)
+    monkeypatch.setitem(TESTDATA_CONFIG, "dir", str(tmp_path / "testdata"))
+    os.makedirs(TESTDATA_CONFIG["dir"])
+    (tmp_path / "testdata" / "input.txt").write_text("1 2\n")
+    return LocalExecutor()
+
+
+def test_nproc_limit_only_with_sandbox_uids(monkeypatch):
+    runtime = LOCAL_RUNTIME_CONFIG["cpp"]
+
+    monkeypatch.setattr(local, "get_sandbox_uids", lambda: SandboxUids([]))
+    assert "nproc" not in [name for name, _, _ in local._resource_limits(runtime, 1)]
+
+    monkeypatch.setattr(local, "get_sandbox_uids", lambda: SandboxUids([60000]))
+    assert "nproc" in [name for name, _, _ in local._resource_limits(runtime, 1)]
+
+
+def test_run_cannot_see_app_directories(executor):
+    hidden = [
+        EXECUTOR_CONFIG["work_dir"],
+        TESTDATA_CONFIG["dir"],
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ]
+    code = LIST_DIRS % ", ".join(f'"{path}"' for path in hidden)
+
+    result = executor.run(code, "cpp", "")
+
+    assert result["status_label"] == "Accepted"
+    # Thư mục bị che bằng tmpfs rỗng (hoặc không tồn tại nếu nằm trong thư mục
+    # bị che) - trừ work dir chỉ còn thư mục của chính lần chạy
+    counts = [int(x) for x in result["output"].split()]
+    assert counts[0] == 1
+    assert counts[1] == 0
+    assert counts[2] <= 0
+
+
+def test_run_keeps_own_directory_and_report(executor):
+    code = "#include <cstdio>\nint main() { int a, b; scanf(\"%d %d\", &a, &b); printf(\"%d\", a + b); }\n"
+
+    result = executor.run(code, "cpp", "2 40\n")
+
+    assert result["status_label"] == "Accepted"
+    assert result["output"] == "42"
+    assert result["memory_used"] > 0
@@ -0,0 +1,40 @@
+"""Fast path normalized_output_hash (test_cases.output_norm_hash)"""
+
+import random
+from backend.checker import (
+    check_output,
+    matches_output_hash,
+    normalized_output_hash,
+)
+
+ALPHABET = ["a", "1", " ", "\n", "\r", "\t", "\r\n", "\xa0", "　", "\x0b"]
+
+
+def _random_text(rng):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 8)))
+
+
+def test_hash_match_is_exact_mode():
+    rng = random.Random(1)
+    for _ in range(5000):
+        actual, expected = _random_text(rng), _random_text(rng)
+        fast = matches_output_hash(actual, normalized_output_hash(expected))
+        assert fast == check_output(actual, expected)[0], (actual, expected)
+
+
+def test_hash_match_implies_accepted_in_every_mode():
+    rng = random.Random(2)
+    for _ in range(2000):
+        actual, expected = _random_text(rng), _random_text(rng)
+        expected_hash = normalized_output_hash(expected)
+        for mode in ("exact", "lines", "whitespace", "float"):
+            checker = {"mode": mode, "epsilon": 1e-6}
+            if matches_output_hash(actual, expected_hash, checker):
+                assert check_output(actual, expected, checker)[0], (mode, actual, expected)
+
+
+def test_no_fast_path_without_hash_or_for_special_judge():
+    expected_hash = normalized_output_hash("42")
+    assert not matches_output_hash("42", None)
+    assert not matches_output_hash("42", expected_hash, {"mode": "special"})
+    assert matches_output_hash("42\r\n", expected_hash, {"mode": "exact"})
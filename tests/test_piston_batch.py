@@ -0,0 +1,110 @@
+"""backend/executors/piston.py - batch harness C++ chạy code của user không sửa đổi"""
+
+import os
+import shutil
+import subprocess
+import pytest
+from backend.executors.piston import PistonExecutor
+
+pytestmark = pytest.mark.skipif(shutil.which("g++") is None, reason="cần g++")
+
+# a+b không có `return 0;` - main() vẫn phải trả về 0
+NO_RETURN = """#include <bits/stdc++.h>
+using namespace std;
+int main() {
+    long long a, b;
+    cin >> a >> b;
+    cout << a + b << endl;
+}
+"""
+
+
+class FakePiston:
+    """Giả lập Piston: compile bằng g++ rồi chạy binary với stdin của request"""
+
+    def __init__(self, work_dir, flags):
+        self.work_dir = work_dir
+        self.flags = flags
+        self.payloads = []
+
+    def post_json(self, payload, timeout):
+        self.payloads.append(payload)
+        source = os.path.join(self.work_dir, "main.cpp")
+        binary = os.path.join(self.work_dir, "a.out")
+        with open(source, "w") as f:
+            f.write(payload["files"][0]["content"])
+        compiled = subprocess.run(
+            ["g++", "-std=c++17", *self.flags, "-o", binary, source],
+            capture_output=True,
+            text=True,
+        )
+        result = {"compile": {"code": compiled.returncode, "stderr": compiled.stderr}}
+        if compiled.returncode != 0:
+            return result, 1
+
+        try:
+            ran = subprocess.run(
+                [binary],
+                cwd=self.work_dir,
+                input=payload["stdin"],
+                capture_output=True,
+                text=True,
+                timeout=payload["run_timeout"] / 1000,
+            )
+        except subprocess.TimeoutExpired as e:
+            # Piston kill cả chương trình khi hết run_timeout của request
+            result["run"] = {
+                "stdout": (e.stdout or b"").decode(),
+                "stderr": "",
+                "code": None,
+                "signal": "SIGKILL",
+            }
+            return result, 1
+
+        result["run"] = {
+            "stdout": ran.stdout,
+            "stderr": ran.stderr,
+            "code": ran.returncode if ran.returncode >= 0 else None,
+            "signal": None,
+        }
+        return result, 1
+
+
+@pytest.mark.parametrize("flags", [["-O0"], ["-O2"]])
+def test_cpp_batch_keeps_implicit_return_from_main(tmp_path, flags):
+    executor = PistonExecutor.__new__(PistonExecutor)
+    executor.client = FakePiston(str(tmp_path), flags)
+
+    results = executor.run_batch(NO_RETURN, "cpp", ["1 2\n", "40 2\n"], time_limit=1)
+
+    assert len(executor.client.payloads) == 1  # Cả 2 input trong một request
+    assert [r["status_label"] for r in results] == ["Accepted", "Accepted"]
+    assert [r["output"] for r in results] == ["3", "42"]
+
+
+def test_cpp_batch_runs_main_with_arguments(tmp_path):
+    executor = PistonExecutor.__new__(PistonExecutor)
+    executor.client = FakePiston(str(tmp_path), ["-O2"])
+    code = '#include <cstdio>\nint main(int argc, char** argv) { puts(argc == 1 ? "ok" : "bad"); }\n'
+
+    results = executor.run_batch(code, "cpp", ["", ""], time_limit=1)
+
+    assert [r["output"] for r in results] == ["ok", "ok"]
+
+
+def test_batch_fits_run_timeout_and_returns_unfinished_inputs(tmp_path):
+    executor = PistonExecutor.__new__(PistonExecutor)
+    executor.client = FakePiston(str(tmp_path), ["-O2"])
+    assert executor.max_batch_inputs("cpp", 1) == 3
+    assert executor.max_batch_inputs("cpp", 5) == 1
+
+    # 3 input đầu chạy hết time limit -> input cuối không kịp chạy trước khi
+    # Piston kill cả batch, kết quả None để judge_service chạy lại riêng
+    code = (
+        "#include <cstdio>\n"
+        "int main() { int x; scanf(\"%d\", &x); volatile int y = x; while (y) {} puts(\"0\"); }\n"
+    )
+    results = executor.run_batch(code, "cpp", ["1", "1", "1", "0"], time_limit=1)
+
+    assert results[0]["status_label"] == "Time Limit Exceeded"
+    assert results[3] is None
@@ -0,0 +1,97 @@
+"""backend/rate_limit.py - token bucket và slot chạy đồng thời (memory backend)"""
+
+import pytest
+from flask import Flask
+from backend import rate_limit
+from backend.rate_limit import MemoryBackend, check_rate_limit, too_many_requests
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", fake)
+    return fake
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    backend = MemoryBackend()
+    # 3 token, hồi 1 token mỗi 2 giây
+    assert [backend.take("k", 3, 0.5) for _ in range(3)] == [0, 0, 0]
+    assert backend.take("k", 3, 0.5) == pytest.approx(2.0)
+
+    clock.now += 1
+    assert backend.take("k", 3, 0.5) == pytest.approx(1.0)
+    clock.now += 1
+    assert backend.take("k", 3, 0.5) == 0
+
+    # Không tích quá capacity dù nghỉ lâu
+    clock.now += 3600
+    assert [backend.take("k", 3, 0.5) for _ in range(4)][-1] > 0
+
+
+def test_buckets_are_independent(clock):
+    backend = MemoryBackend()
+    assert backend.take("a", 1, 1) == 0
+    assert backend.take("a", 1, 1) > 0
+    assert backend.take("b", 1, 1) == 0
+
+
+def test_refund_never_exceeds_capacity(clock):
+    backend = MemoryBackend()
+    backend.take("k", 2, 1)
+    backend.refund("k", 2)
+    backend.refund("k", 2)
+    assert [backend.take("k", 2, 1) for _ in range(3)][:2] == [0, 0]
+
+
+def test_execution_slots_are_limited_and_released(clock):
+    backend = MemoryBackend()
+    first = backend.acquire_slot("run", 2)
+    assert backend.acquire_slot("run", 2) is not None
+    assert backend.acquire_slot("run", 2) is None
+
+    backend.release_slot("run", first)
+    assert backend.acquire_slot("run", 2) is not None
+
+
+def test_expired_lease_frees_its_slot(clock):
+    backend = MemoryBackend()
+    assert backend.acquire_slot("run", 1) is not None
+    assert backend.acquire_slot("run", 1) is None
+    clock.now += rate_limit.LEASE_SECONDS + 1
+    assert backend.acquire_slot("run", 1) is not None
+
+
+def test_rejected_request_refunds_other_buckets(clock, monkeypatch):
+    backend = MemoryBackend()
+    monkeypatch.setattr(rate_limit, "_backend", backend)
+    monkeypatch.setitem(
+        rate_limit.RATE_LIMIT_CONFIG["budgets"], "run", {"ip": (5, 60), "user": (1, 60)}
+    )
+    app = Flask(__name__)
+    app.secret_key = "test"
+
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        rate_limit.session["user_id"] = 7
+        assert check_rate_limit("run") == 0
+        # Bucket của user hết token -> token đã lấy từ bucket IP được trả lại
+        assert check_rate_limit("run") == pytest.approx(1.0)
+    # Còn 4 token: chỉ request đầu tiên được tính vào bucket IP
+    takes = [backend.take("run:ip:10.0.0.1", 5, 1) for _ in range(5)]
+    assert takes[:4] == [0, 0, 0, 0] and takes[4] > 0
+
+
+def test_too_many_requests_rounds_retry_after_up():
+    app = Flask(__name__)
+    with app.app_context():
+        response = too_many_requests(1.2)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
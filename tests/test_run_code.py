@@ -0,0 +1,54 @@
+"""/api/run - trả connection của request trước khi chấm, kiểm tra kích thước pool"""
+
+import pytest
+from flask import Flask
+from backend import database
+from backend.routes import judge_routes
+
+PROBLEM = {"problem_id": 1, "wrapper_template": None, "pack_version": 1}
+TEST_CASES = [{"input": "1\n", "expected_output": "1\n"}]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Thứ tự các lần trả connection và chấm code của route"""
+    calls = []
+    monkeypatch.setattr(judge_routes, "get_problem_by_id", lambda pid: PROBLEM)
+    monkeypatch.setattr(
+        judge_routes, "get_public_test_cases", lambda pid, version=None: TEST_CASES
+    )
+    monkeypatch.setattr(
+        judge_routes, "close_db_connection", lambda: calls.append("release")
+    )
+
+    def judge_run(code, language, test_cases, checker=None, owner=None, **kwargs):
+        calls.append("judge")
+        return "Accepted", []
+
+    monkeypatch.setattr(judge_routes, "judge_run", judge_run)
+    return calls
+
+
+def test_run_releases_connection_before_judging(calls):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(judge_routes.judge_bp)
+
+    response = app.test_client().post(
+        "/api/run", json={"code": "print(1)", "problem_id": 1, "language": "python"}
+    )
+
+    assert response.get_json()["final_status"] == "Accepted"
+    assert calls == ["release", "judge"]
+
+
+def test_pool_size_check(monkeypatch):
+    monkeypatch.setitem(database.JUDGE_CONFIG, "queue_workers", 4)
+    monkeypatch.setitem(database.RATE_LIMIT_CONFIG, "max_inflight_runs", 16)
+
+    monkeypatch.setitem(database.DB_POOL_CONFIG, "pool_size", 20)
+    assert database.check_pool_size()
+    monkeypatch.setitem(database.DB_POOL_CONFIG, "pool_size", 10)
+    assert not database.check_pool_size()
+    monkeypatch.setitem(database.RATE_LIMIT_CONFIG, "max_inflight_runs", 0)
+    assert database.check_pool_size()
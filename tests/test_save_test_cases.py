@@ -0,0 +1,142 @@
+"""testcase_service.save_test_cases - chỉ ghi phần khác với pack đã lưu"""
+
+import pytest
+from backend.services import testcase_service
+from backend.services.testdata_store import content_hash
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        self.db.statements.append((sql.split()[0], [params]))
+
+    def executemany(self, sql, rows):
+        self.db.statements.append((sql.split()[0], list(rows)))
+
+    def fetchall(self):
+        return self.db.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.committed = False
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def written(self, verb):
+        """Params của mọi row được ghi bằng các câu lệnh verb (INSERT / UPDATE...)"""
+        return [row for name, rows in self.statements if name == verb for row in rows]
+
+
+def _case(i, **changes):
+    return {"input": f"in{i}", "expected_output": f"out{i}", "is_hidden": True, **changes}
+
+
+def _row(test_case_id, i):
+    return {
+        "test_case_id": test_case_id,
+        "is_sample": 0,
+        "is_hidden": 1,
+        "input_digest": content_hash(f"in{i}"),
+        "output_digest": content_hash(f"out{i}"),
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # Pack đã lưu: case 0..3 ở test_case_id 10..13
+    conn = FakeConnection([_row(10 + i, i) for i in range(4)])
+    monkeypatch.setattr(testcase_service, "get_db_connection", lambda: conn)
+    return conn
+
+
+def _updated_ids(db):
+    # Bỏ câu lệnh tăng problems.pack_version (chỉ có problem_id)
+    return [row[-1] for row in db.written("UPDATE") if len(row) > 1]
+
+
+def test_unchanged_pack_writes_nothing(db):
+    changes = testcase_service.save_test_cases(1, [_case(i) for i in range(4)])
+    assert changes == {"inserted": [], "updated": [], "deleted": []}
+    assert not db.committed
+
+
+def test_deleting_first_case_keeps_the_rest(db):
+    changes = testcase_service.save_test_cases(1, [_case(i) for i in range(1, 4)])
+    assert changes == {"inserted": [], "updated": [], "deleted": [10]}
+    assert db.committed
+    assert _updated_ids(db) == [] and db.written("INSERT") == []
+
+
+def test_appending_inserts_only_new_case(db):
+    changes = testcase_service.save_test_cases(1, [_case(i) for i in range(5)])
+    assert changes == {"inserted": [4], "updated": [], "deleted": []}
+
+
+def test_edit_by_id_updates_that_row_only(db):
+    cases = [_case(i, test_case_id=10 + i) for i in range(4)]
+    cases[2]["expected_output"] = "fixed"
+    changes = testcase_service.save_test_cases(1, cases)
+    assert changes == {"inserted": [], "updated": [2], "deleted": []}
+    assert _updated_ids(db) == [12]
+
+
+def test_flag_change_is_an_update(db):
+    cases = [_case(i) for i in range(4)]
+    cases[1]["is_sample"] = True
+    assert testcase_service.save_test_cases(1, cases)["updated"] == [1]
+
+
+def test_insert_in_middle_keeps_order_by_id(db):
+    cases = [_case(0), _case(1), _case(9), _case(2), _case(3)]
+    changes = testcase_service.save_test_cases(1, cases)
+    # Thứ tự pack theo test_case_id: case sau chỗ chèn được dời xuống row kế tiếp
+    assert changes == {"inserted": [4], "updated": [2, 3], "deleted": []}
+    assert _updated_ids(db) == [12, 13]
+
+
+def test_foreign_and_repeated_ids_are_ignored(db):
+    cases = [
+        _case(0, test_case_id=999),
+        _case(1, test_case_id=11),
+        _case(2, test_case_id=11),
+        _case(3),
+    ]
+    changes = testcase_service.save_test_cases(1, cases)
+    assert changes == {"inserted": [], "updated": [], "deleted": []}
+
+
+def test_large_pack_with_swapped_cases(monkeypatch):
+    count = 5000
+    conn = FakeConnection([_row(10 + i, i) for i in range(count)])
+    monkeypatch.setattr(testcase_service, "get_db_connection", lambda: conn)
+    cases = [_case(i) for i in range(count)]
+    cases[100], cases[4000] = cases[4000], cases[100]
+
+    changes = testcase_service.save_test_cases(1, cases)
+
+    # Chỉ hai case đổi chỗ bị ghi lại vào row của nhau
+    assert changes == {"inserted": [], "updated": [100, 4000], "deleted": []}
+    assert _updated_ids(conn) == [110, 4010]
+
+
+def test_database_error_returns_false(monkeypatch):
+    monkeypatch.setattr(testcase_service, "get_db_connection", lambda: None)
+    assert testcase_service.save_test_cases(1, [_case(0)]) is False
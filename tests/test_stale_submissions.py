@@ -0,0 +1,68 @@
+"""judge_queue.recover_stale_submissions - chỉ đánh dấu submission của process đã dừng"""
+
+import pytest
+from backend.services import judge_queue, submission_service
+from backend.services.judge_queue import JudgeJob
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.db.statements.append((" ".join(sql.split()), list(params or ())))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(submission_service, "get_db_connection", lambda: conn)
+    monkeypatch.setattr(judge_queue, "_jobs", {})
+    return conn
+
+
+def _job(submission_id):
+    return JudgeJob(submission_id, 1, "code", "python", [], 1000, 256)
+
+
+def test_recovery_heartbeats_own_jobs_and_spares_them(db):
+    judge_queue._jobs.update({1: _job(1), 2: _job(2), 3: _job(3)})
+    judge_queue._jobs[3].finish("Accepted", {})  # Đã chấm xong - không giữ nữa
+
+    judge_queue.recover_stale_submissions()
+
+    (heartbeat, heartbeat_params), (fail, fail_params) = db.statements
+    assert heartbeat.startswith("UPDATE submissions SET judge_worker = %s")
+    assert heartbeat_params == [judge_queue.WORKER_ID, 1, 2]
+    # Stale tính theo heartbeat của process giữ submission, bỏ qua process này
+    assert "COALESCE(judge_heartbeat_at, submitted_at)" in fail
+    assert "judge_worker <> %s" in fail
+    assert fail_params[-1] == judge_queue.WORKER_ID
+
+
+def test_recovery_without_own_jobs_only_fails_stale(db):
+    judge_queue.recover_stale_submissions()
+
+    assert len(db.statements) == 1
+    assert "System Error" in db.statements[0][1]
@@ -0,0 +1,123 @@
+"""/api/submission/<id>/events - stream SSE kết thúc sau verdict"""
+
+import json
+import pytest
+from flask import Flask
+from backend.routes import submission_routes
+from backend.services.judge_queue import JudgeJob
+
+SUBMISSION_ID = 42
+USER_ID = 7
+
+
+def _row(status):
+    return {
+        "submission_id": SUBMISSION_ID,
+        "user_id": USER_ID,
+        "status": status,
+        "test_case_results": None,
+        "test_cases_passed": 2 if status == "Accepted" else 0,
+        "total_test_cases": 2,
+        "execution_time": 15,
+        "memory_used": 9000,
+    }
+
+
+def _events(body):
+    """[(event, data)] của response SSE (bỏ comment heartbeat)"""
+    events = []
+    for block in body.split("\n\n"):
+        lines = dict(
+            line.split(": ", 1)
+            for line in block.splitlines()
+            if not line.startswith(":")
+        )
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(submission_routes.submission_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = USER_ID
+    return client
+
+
+@pytest.fixture
+def released(monkeypatch):
+    """Số lần route trả connection của request về pool"""
+    calls = []
+    monkeypatch.setattr(
+        submission_routes, "close_db_connection", lambda: calls.append(1)
+    )
+    monkeypatch.setattr(submission_routes, "SSE_DB_POLL_SECONDS", 0)
+    return calls
+
+
+def test_db_fallback_polls_until_verdict_then_closes(client, monkeypatch, released):
+    statuses = iter(["Pending", "Judging", "Judging", "Accepted"])
+    monkeypatch.setattr(submission_routes, "get_job", lambda sid: None)
+    monkeypatch.setattr(
+        submission_routes, "get_submission_status", lambda sid: _row(next(statuses))
+    )
+    monkeypatch.setattr(
+        submission_routes,
+        "get_submission_case_results",
+        lambda sid: [{"case": 1, "status": "Accepted", "time": 15, "memory": 9000}],
+    )
+
+    response = client.get(f"/api/submission/{SUBMISSION_ID}/events")
+    events = _events(response.get_data(as_text=True))
+
+    assert response.mimetype == "text/event-stream"
+    assert [event for event, _ in events] == ["case", "verdict"]
+    assert events[-1][1]["final_status"] == "Accepted" and events[-1][1]["done"]
+    # Trước khi stream + sau mỗi lần đọc DB: không giữ connection khi chờ
+    assert len(released) == 1 + 3
+
+
+def test_db_fallback_stops_when_submission_disappears(client, monkeypatch, released):
+    rows = iter([_row("Pending"), _row("Pending"), None])
+    monkeypatch.setattr(submission_routes, "get_job", lambda sid: None)
+    monkeypatch.setattr(
+        submission_routes, "get_submission_status", lambda sid: next(rows)
+    )
+
+    response = client.get(f"/api/submission/{SUBMISSION_ID}/events")
+    events = _events(response.get_data(as_text=True))
+    assert events == [
+        ("status", {"status": "error", "message": "Submission not found"})
+    ]
+
+
+def test_job_stream_sends_cases_then_verdict(client, monkeypatch, released):
+    job = JudgeJob(SUBMISSION_ID, USER_ID, "print(1)", "python", [{}, {}], 1000, 256)
+    usage = {"code_execution_time": 5, "memory_used": 100}
+    job.add_case_result(1, "Accepted", usage)
+    job.add_case_result(0, "Wrong Answer", usage)
+    job.finish("Wrong Answer", {"final_status": "Wrong Answer", "test_cases_passed": 1})
+    monkeypatch.setattr(submission_routes, "get_job", lambda sid: job)
+
+    response = client.get(f"/api/submission/{SUBMISSION_ID}/events")
+    events = _events(response.get_data(as_text=True))
+
+    assert [(event, data.get("case")) for event, data in events] == [
+        ("case", 2),
+        ("case", 1),
+        ("verdict", None),
+    ]
+    assert events[-1][1]["final_status"] == "Wrong Answer"
+    assert "user_id" not in events[-1][1]
+    assert released == [1]
+
+
+def test_other_users_submission_is_hidden(client, monkeypatch, released):
+    monkeypatch.setattr(submission_routes, "get_job", lambda sid: None)
+    row = dict(_row("Pending"), user_id=99)
+    monkeypatch.setattr(submission_routes, "get_submission_status", lambda sid: row)
+    assert client.get(f"/api/submission/{SUBMISSION_ID}/events").status_code == 404
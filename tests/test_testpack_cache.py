@@ -0,0 +1,59 @@
+"""backend/services/testpack_cache.py - pack theo pack_version, giới hạn memory"""
+
+from backend.services import testpack_cache
+from backend.services.testpack_cache import estimate_pack_size
+
+
+def _pack(size):
+    return [{"input": "x" * size, "expected_output": "", "is_sample": False}]
+
+
+def test_hit_only_for_same_version():
+    cache = testpack_cache.TestPackCache(1 << 20)
+    cache.put(1, 3, _pack(10))
+    assert cache.get(1, 3) == _pack(10)
+    assert cache.get(1, 4) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_older_version_does_not_replace_newer():
+    cache = testpack_cache.TestPackCache(1 << 20)
+    cache.put(1, 5, _pack(1))
+    cache.put(1, 4, _pack(2))
+    assert cache.get(1, 5) == _pack(1)
+    assert cache.get(1, 4) is None
+
+
+def test_invalidate_frees_memory():
+    cache = testpack_cache.TestPackCache(1 << 20)
+    cache.put(1, 1, _pack(100))
+    cache.invalidate(1)
+    assert cache.get(1, 1) is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_evicts_least_recently_used_within_budget():
+    pack_size = estimate_pack_size(_pack(1000))
+    cache = testpack_cache.TestPackCache(pack_size * 2)
+    cache.put(1, 1, _pack(1000))
+    cache.put(2, 1, _pack(1000))
+    cache.get(1, 1)
+    cache.put(3, 1, _pack(1000))
+
+    assert cache.get(2, 1) is None
+    assert cache.get(1, 1) is not None and cache.get(3, 1) is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_pack_larger_than_budget_is_not_cached():
+    cache = testpack_cache.TestPackCache(100)
+    cache.put(1, 1, _pack(1000))
+    assert cache.get(1, 1) is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_returned_list_is_a_copy():
+    cache = testpack_cache.TestPackCache(1 << 20)
+    cache.put(1, 1, _pack(1))
+    cache.get(1, 1).clear()
+    assert cache.get(1, 1) == _pack(1)
@@ -0,0 +1,98 @@
+"""backend/services/verdict_cache.py - key theo pack_version, verdict không cache"""
+
+import pytest
+from backend.constants import VERDICT_CODES
+from backend.services.verdict_cache import VerdictCache, make_verdict_key
+
+TEST_CASES = [
+    {"input": "1\n", "expected_output": "2\n"},
+    {"input": "5\n", "expected_output": "10\r\n"},
+]
+
+
+def _verdict(final_status="Accepted", failed_case_index=0, detail=None, codes=(0, 0)):
+    return {
+        "final_status": final_status,
+        "failed_case_index": failed_case_index,
+        "failed_case_detail": detail,
+        "test_cases_passed": codes.count(0),
+        "total_test_cases": len(codes),
+        "execution_time": 12,
+        "memory_used": 9000,
+        "case_results": [(code, 12, 9000) for code in codes],
+    }
+
+
+def test_key_ignores_line_endings_and_changes_with_pack_version():
+    key = make_verdict_key(1, "Python", "print(1)\r\n\n", 3)
+    assert key == make_verdict_key(1, "python", "print(1)", 3)
+    assert key != make_verdict_key(1, "python", "print(1)", 4)
+    assert make_verdict_key(1, "python", "print(1)", None) is None
+
+
+def test_hit_returns_a_copy():
+    cache = VerdictCache(10, 60)
+    cache.put("key", _verdict())
+    hit = cache.get("key", TEST_CASES)
+    assert hit["final_status"] == "Accepted"
+    hit["final_status"] = "changed"
+    assert cache.get("key", TEST_CASES)["final_status"] == "Accepted"
+
+
+def test_failed_case_data_is_rebuilt_from_test_pack():
+    cache = VerdictCache(10, 60)
+    detail = {
+        "input": "5\n",
+        "expected_output": "10",
+        "actual_output": "11",
+        "message": "Line 1, column 2: output differs",
+    }
+    cache.put("key", _verdict("Wrong Answer", 2, detail, codes=(0, 1)))
+
+    stored = cache._entries["key"][1]["failed_case_detail"]
+    assert "input" not in stored and "expected_output" not in stored
+    assert cache.get("key", TEST_CASES)["failed_case_detail"] == detail
+
+
+@pytest.mark.parametrize(
+    "final_status", ["System Error", "Time Limit Exceeded", "Memory Limit Exceeded"]
+)
+def test_uncacheable_final_status(final_status):
+    cache = VerdictCache(10, 60)
+    cache.put("key", _verdict(final_status, 1, {"input": "1\n"}, codes=(2, 0)))
+    assert cache.get("key", TEST_CASES) is None
+
+
+def test_partial_verdict_with_timeout_case_is_not_cached():
+    cache = VerdictCache(10, 60)
+    codes = (1, VERDICT_CODES["Time Limit Exceeded"])
+    cache.put("key", _verdict("Wrong Answer", 1, {"input": "1\n"}, codes=codes))
+    assert cache.get("key", TEST_CASES) is None
+
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    from backend.services import verdict_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(verdict_cache.time, "time", lambda: now[0])
+    cache = VerdictCache(2, 60)
+    cache.put("a", _verdict())
+    cache.put("b", _verdict())
+    cache.get("a", TEST_CASES)  # a mới dùng -> b bị loại trước
+    cache.put("c", _verdict())
+    assert cache.get("b", TEST_CASES) is None
+    assert cache.get("a", TEST_CASES) is not None
+
+    now[0] += 61
+    assert cache.get("a", TEST_CASES) is None
+
+
+def test_invalidate_problem_drops_only_that_problem():
+    cache = VerdictCache(10, 60)
+    first = make_verdict_key(1, "python", "a", 1)
+    other = make_verdict_key(2, "python", "a", 1)
+    cache.put(first, _verdict())
+    cache.put(other, _verdict())
+    cache.invalidate_problem(1)
+    assert cache.get(first, TEST_CASES) is None
+    assert cache.get(other, TEST_CASES) is not None